@@ -0,0 +1,86 @@
+from django.db.models import Count, Q, Sum
+
+from master.models import Employee
+from .models import AttendanceSummary
+
+# Status buckets counted for every attendance overview
+STATUS_FILTERS = {
+    'present_days': {'status': 'present'},
+    'absent_days': {'status': 'absent'},
+    'half_days': {'status': 'half_day'},
+    'leave_days': {'status': 'leave'},
+    'late_days': {'late_by__gt': 0},
+}
+
+
+def summary_aggregates(prefix='', base_filter=None):
+    """Build the Count/Sum expressions over AttendanceSummary, optionally through a relation"""
+    base_filter = base_filter or {}
+
+    def condition(lookups):
+        lookups = {**base_filter, **lookups}
+        return Q(**{f'{prefix}{key}': value for key, value in lookups.items()}) if lookups else None
+
+    aggregates = {'total_days': Count(f'{prefix}summary_id', filter=condition({}))}
+    for name, lookups in STATUS_FILTERS.items():
+        aggregates[name] = Count(f'{prefix}summary_id', filter=condition(lookups))
+    aggregates['total_hours'] = Sum(f'{prefix}total_hours', filter=condition({}))
+    return aggregates
+
+
+def attendance_percentage(present_days, half_days, total_days):
+    """Half days count as half a present day"""
+    if not total_days:
+        return 0
+    return round((present_days + half_days * 0.5) / total_days * 100, 2)
+
+
+def annotate_attendance(employees, start_date, end_date):
+    """Annotate an Employee queryset with its attendance counts for the date range.
+
+    Everything is computed by one grouped LEFT JOIN, so employees without
+    summaries are kept with zero counts.
+    """
+    return employees.annotate(**summary_aggregates('attendancesummary__', {
+        'date__gte': start_date,
+        'date__lte': end_date,
+    }))
+
+
+def summary_totals(start_date, end_date, *group_by, employees=None):
+    """Grouped AttendanceSummary counts for the date range, e.g. per department"""
+    summaries = AttendanceSummary.objects.filter(date__gte=start_date, date__lte=end_date)
+    if employees is not None:
+        summaries = summaries.filter(employee__in=employees)
+    return summaries.values(*group_by).annotate(**summary_aggregates()).order_by(*group_by)
+
+
+def employee_overview(start_date, end_date, department_id=None, manager_id=None):
+    """Per-employee attendance overview used by the admin and manager dashboards"""
+    employees = Employee.objects.all()
+    if department_id:
+        employees = employees.filter(department_id=department_id)
+    if manager_id:
+        employees = employees.filter(manager_id=manager_id)
+
+    rows = annotate_attendance(employees, start_date, end_date).values(
+        'employee_id', 'employee_code', 'first_name', 'last_name', 'department__department_name',
+        'total_days', 'present_days', 'absent_days', 'half_days', 'leave_days', 'late_days',
+    ).order_by('employee_id')
+
+    return [
+        {
+            "employee_id": row['employee_id'],
+            "employee_name": f"{row['first_name']} {row['last_name']}",
+            "employee_code": row['employee_code'],
+            "department_name": row['department__department_name'],
+            "total_days": row['total_days'],
+            "present_days": row['present_days'],
+            "absent_days": row['absent_days'],
+            "half_days": row['half_days'],
+            "leave_days": row['leave_days'],
+            "late_days": row['late_days'],
+            "attendance_percentage": attendance_percentage(row['present_days'], row['half_days'], row['total_days']),
+        }
+        for row in rows
+    ]
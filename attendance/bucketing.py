@@ -0,0 +1,138 @@
+"""Work-date bucketing for punches.
+
+A punch belongs to the work date of the shift it was made for, not to the
+UTC day it is stored under. Each shift owns a 24-hour window of local time
+around the shift itself: it opens halfway through the off-duty gap before
+the shift starts and closes halfway through the gap after it ends. For the
+09:00-17:00 shift the window runs 01:00 to 01:00; for the 22:00-06:00 night
+shift it runs 14:00 to 14:00 the next day, so the 06:00 OUT is filed under
+the evening the shift started. Employees without a shift use calendar days.
+
+A window depends only on the shift's start and end times, so its offset
+from local midnight is computed once per shift and looked up afterwards.
+WorkCalendar goes one step further for bulk work: it precomputes the UTC
+instant each work date opens at, and buckets a punch with a binary search.
+"""
+from bisect import bisect_right
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from functools import lru_cache
+
+from django.utils import timezone
+
+from master.models import Employee
+from .periods import attendance_timezone
+
+# Window offset of employees without a shift: plain calendar days
+CALENDAR_DAY = timedelta(0)
+
+MINUTES_PER_DAY = 24 * 60
+
+
+def _minutes(value):
+    return value.hour * 60 + value.minute
+
+
+@lru_cache(maxsize=None)
+def shift_offset(start_time, end_time):
+    """Offset from local midnight to the opening of a shift's work-date window"""
+    if start_time is None or end_time is None:
+        return CALENDAR_DAY
+    start = _minutes(start_time)
+    off_duty = (start - _minutes(end_time)) % MINUTES_PER_DAY
+    return timedelta(minutes=start - off_duty // 2)
+
+
+def employee_offsets(employee_ids):
+    """{employee_id: window offset} for the given employees, in one query"""
+    return {
+        employee_id: shift_offset(start_time, end_time)
+        for employee_id, start_time, end_time in Employee.objects.filter(
+            employee_id__in=employee_ids
+        ).values_list('employee_id', 'shift__start_time', 'shift__end_time')
+    }
+
+
+def employee_offset(employee_id):
+    return employee_offsets([employee_id]).get(employee_id, CALENDAR_DAY)
+
+
+def _aware(value):
+    """Naive datetimes (as the FastAPI side stores them) are UTC"""
+    if timezone.is_naive(value):
+        return value.replace(tzinfo=dt_timezone.utc)
+    return value
+
+
+def work_date(punch_time, offset=CALENDAR_DAY):
+    """Work date a single punch belongs to"""
+    return (timezone.localtime(_aware(punch_time), attendance_timezone()) - offset).date()
+
+
+def current_work_date(offset=CALENDAR_DAY):
+    """Work date a punch made now would belong to"""
+    return work_date(timezone.now(), offset)
+
+
+def _opening(day, offset):
+    return timezone.make_aware(datetime.combine(day, time.min), attendance_timezone()) + offset
+
+
+def work_window(start_date, end_date=None, offset=CALENDAR_DAY):
+    """Aware ``[start, end)`` covering the punches of work dates ``start_date``..``end_date``"""
+    end_date = end_date or start_date
+    return _opening(start_date, offset), _opening(end_date + timedelta(days=1), offset)
+
+
+def shift_bounds(day, start_time, end_time):
+    """Aware start and end of a shift worked on ``day``; the end rolls over midnight if needed"""
+    tz = attendance_timezone()
+    end_day = day + timedelta(days=1) if end_time <= start_time else day
+    return (
+        timezone.make_aware(datetime.combine(day, start_time), tz),
+        timezone.make_aware(datetime.combine(end_day, end_time), tz),
+    )
+
+
+class WorkCalendar:
+    """Work dates ``start_date``..``end_date`` for every shift window offset.
+
+    The instants each work date opens at are computed once per offset, so
+    bucketing a punch is a bisect over a short list rather than a time
+    zone conversion.
+    """
+
+    def __init__(self, start_date, end_date):
+        self.start_date = start_date
+        self.days = (end_date - start_date).days + 1
+        self._openings = {}
+
+    @classmethod
+    def covering(cls, punch_times):
+        """Calendar spanning every work date the given punches can belong to"""
+        tz = attendance_timezone()
+        first = timezone.localtime(_aware(min(punch_times)), tz).date()
+        last = timezone.localtime(_aware(max(punch_times)), tz).date()
+        # Window offsets lie within a day either side of local midnight
+        return cls(first - timedelta(days=1), last + timedelta(days=1))
+
+    def openings(self, offset):
+        openings = self._openings.get(offset)
+        if openings is None:
+            openings = [
+                _opening(self.start_date + timedelta(days=n), offset)
+                for n in range(self.days + 1)
+            ]
+            self._openings[offset] = openings
+        return openings
+
+    def bounds(self, offsets):
+        """Aware ``[start, end)`` holding every punch of the calendar for any of ``offsets``"""
+        offsets = set(offsets) or {CALENDAR_DAY}
+        return self.openings(min(offsets))[0], self.openings(max(offsets))[-1]
+
+    def work_date(self, punch_time, offset=CALENDAR_DAY):
+        """Work date of ``punch_time``, or None if it falls outside the calendar"""
+        index = bisect_right(self.openings(offset), _aware(punch_time)) - 1
+        if 0 <= index < self.days:
+            return self.start_date + timedelta(days=index)
+        return None
@@ -0,0 +1,179 @@
+import json
+import threading
+import time
+from collections import deque
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from master.models import Employee, Device
+from .models import AttendanceLog
+from .periods import attendance_timezone
+from .signals import punches_recorded
+
+MAX_BATCH_SIZE = 5000
+PUNCH_TYPES = ('IN', 'OUT')
+
+
+class ThroughputMeter:
+    """Sliding-window counter used to report sustained punches per second"""
+
+    def __init__(self, window=60):
+        self.window = window
+        self._events = deque()
+        self._lock = threading.Lock()
+
+    def record(self, count):
+        now = time.monotonic()
+        with self._lock:
+            self._events.append((now, count))
+            self._expire(now)
+
+    def rate(self):
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            if not self._events:
+                return 0.0
+            total = sum(count for _, count in self._events)
+            elapsed = max(now - self._events[0][0], 1.0)
+        return round(total / elapsed, 2)
+
+    def _expire(self, now):
+        while self._events and now - self._events[0][0] > self.window:
+            self._events.popleft()
+
+
+throughput = ThroughputMeter()
+
+
+def parse_ndjson(body):
+    """Parse a newline-delimited JSON body into a list of punch dicts"""
+    if isinstance(body, bytes):
+        body = body.decode('utf-8')
+    punches = []
+    for line_no, line in enumerate(body.splitlines(), 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            punches.append(json.loads(line))
+        except ValueError:
+            raise ValueError(f'Invalid JSON on line {line_no}')
+    return punches
+
+
+def _parse_coordinate(value):
+    if value in (None, ''):
+        return None
+    try:
+        return Decimal(str(value)).quantize(Decimal('0.000001'))
+    except InvalidOperation:
+        raise ValueError(f'Invalid coordinate {value!r}')
+
+
+def _validate_punch(punch, employees):
+    """Return the AttendanceLog field values for one raw punch, or raise ValueError"""
+    if not isinstance(punch, dict):
+        raise ValueError('Punch must be an object')
+
+    employee_code = punch.get('employee_code') or punch.get('employee_id')
+    employee_id = employees.get(str(employee_code))
+    if employee_id is None:
+        raise ValueError(f'Unknown or inactive employee {employee_code!r}')
+
+    punch_type = str(punch.get('punch_type', '')).upper()
+    if punch_type not in PUNCH_TYPES:
+        raise ValueError(f'Invalid punch_type {punch.get("punch_type")!r}')
+
+    punch_time = punch.get('punch_time')
+    parsed = parse_datetime(punch_time) if isinstance(punch_time, str) else None
+    if parsed is None:
+        raise ValueError(f'Invalid punch_time {punch_time!r}')
+    if timezone.is_naive(parsed):
+        # Devices without a zone report local time
+        parsed = timezone.make_aware(parsed, attendance_timezone())
+
+    return {
+        'employee_id': employee_id,
+        'punch_type': punch_type,
+        'punch_time': parsed,
+        'geo_lat': _parse_coordinate(punch.get('geo_lat')),
+        'geo_long': _parse_coordinate(punch.get('geo_long')),
+    }
+
+
+def ingest_punches(device, punches, batch_size=500):
+    """Validate a device's buffered punches in one pass and bulk insert them.
+
+    Returns a dict with one result per input row (``created``, ``duplicate``
+    or ``error``) plus throughput statistics. Rows already stored for the same
+    employee, punch type and time are reported as duplicates so devices can
+    safely resend a buffer.
+    """
+    if len(punches) > MAX_BATCH_SIZE:
+        raise ValueError(f'Batch too large (max {MAX_BATCH_SIZE} punches)')
+
+    started = time.perf_counter()
+
+    # Resolve all employee codes with a single query
+    codes = {
+        str(punch.get('employee_code') or punch.get('employee_id'))
+        for punch in punches if isinstance(punch, dict)
+    }
+    employees = dict(
+        Employee.objects.filter(employee_code__in=codes, status=True).values_list('employee_code', 'employee_id')
+    )
+
+    results = [None] * len(punches)
+    valid = []
+    for index, punch in enumerate(punches):
+        try:
+            valid.append((index, _validate_punch(punch, employees)))
+        except ValueError as e:
+            results[index] = {'index': index, 'status': 'error', 'error': str(e)}
+
+    created = []
+    with transaction.atomic():
+        if valid:
+            # Skip punches that were already ingested by an earlier flush
+            times = [fields['punch_time'] for _, fields in valid]
+            seen = set(AttendanceLog.objects.filter(
+                employee_id__in={fields['employee_id'] for _, fields in valid},
+                punch_time__gte=min(times),
+                punch_time__lte=max(times),
+            ).values_list('employee_id', 'punch_type', 'punch_time'))
+
+            pending = []
+            for index, fields in valid:
+                key = (fields['employee_id'], fields['punch_type'], fields['punch_time'])
+                if key in seen:
+                    results[index] = {'index': index, 'status': 'duplicate'}
+                    continue
+                seen.add(key)
+                pending.append((index, AttendanceLog(device=device, status='approved', selfie_url='', **fields)))
+
+            logs = AttendanceLog.objects.bulk_create([log for _, log in pending], batch_size=batch_size)
+            for (index, _), log in zip(pending, logs):
+                results[index] = {'index': index, 'status': 'created', 'attendance_id': log.attendance_id}
+                created.append(log)
+
+        Device.objects.filter(pk=device.pk).update(status='online', last_seen=timezone.now())
+
+    elapsed = time.perf_counter() - started
+    throughput.record(len(created))
+    if created:
+        punches_recorded.send(sender=AttendanceLog, employee_ids={log.employee_id for log in created})
+
+    return {
+        'received': len(punches),
+        'created': len(created),
+        'duplicates': sum(1 for r in results if r['status'] == 'duplicate'),
+        'errors': sum(1 for r in results if r['status'] == 'error'),
+        'elapsed_ms': round(elapsed * 1000, 2),
+        'punches_per_second': round(len(created) / elapsed, 2) if elapsed > 0 else 0,
+        'sustained_punches_per_second': throughput.rate(),
+        'results': results,
+    }
@@ -0,0 +1,171 @@
+"""Live attendance counts for today's dashboards.
+
+Dashboards that poll re-aggregate AttendanceSummary for every viewer on
+every poll. LiveAttendance instead keeps, for the whole company, each
+department and each manager's team, how many active employees have
+punched in today and how many of those were late. A refresh folds in
+only the logs added since the previous one, so any number of viewers
+share one small incremental computation per tick.
+
+Folding is idempotent: an employee's earliest IN decides whether they
+are present and late, so a log seen twice changes nothing, and a
+backfilled earlier punch corrects lateness. Ids skipped below the
+high-water mark are looked up again for SUMMARY_LATE_COMMIT_WINDOW
+seconds, as the summary engine does, since they may belong to punches
+that commit late. The counts follow the
+attendance time zone's calendar day, like the dashboards, and start over
+when it changes. Punches arriving in this process send
+``punches_recorded`` so listeners can refresh straight away instead of
+waiting for their next tick.
+"""
+import threading
+import time
+from collections import Counter
+
+from django.db.models import Max
+
+from master.models import Employee
+from .bucketing import WorkCalendar, shift_bounds, shift_offset
+from .models import AttendanceLog
+from .periods import local_today
+from .summaries import MAX_PENDING_IDS, logs_by_id, track_skipped, unexpired
+
+COMPANY = ('company', None)
+
+
+def department_scope(department_id):
+    return ('department', department_id)
+
+
+def team_scope(manager_id):
+    return ('team', manager_id)
+
+
+class LiveAttendance:
+    """Today's present/late/absent counts per scope, kept up to date incrementally"""
+
+    def __init__(self):
+        self.day = None
+        self.version = 0
+        self._refreshing = threading.Lock()
+        self._lock = threading.Lock()
+
+    def refresh(self, today=None):
+        """Catch up with new logs, starting over on a new day; returns True if any count changed.
+
+        Queries run outside the state lock, so snapshot() never waits on the database.
+        """
+        today = today or local_today()
+        with self._refreshing:
+            if today != self.day:
+                self._start_day(today)
+                return True
+            now = time.time()
+            pending = unexpired(self.pending.items(), now)
+            rows = AttendanceLog.objects.values_list('attendance_id', 'employee_id', 'punch_type', 'status', 'punch_time')
+            late = logs_by_id(rows, pending)
+            new = list(rows.filter(attendance_id__gt=self.last_attendance_id))
+            for attendance_id, *_ in late:
+                del pending[attendance_id]
+            if new:
+                high = max(attendance_id for attendance_id, *_ in new)
+                pending = track_skipped(
+                    pending, self.last_attendance_id, high, {attendance_id for attendance_id, *_ in new}, now
+                )
+                self.last_attendance_id = high
+            self.pending = pending
+            logs = [
+                (employee_id, punch_time)
+                for _, employee_id, punch_type, status, punch_time in new + late
+                if punch_type == 'IN' and status != 'rejected'
+            ]
+            with self._lock:
+                changed = self._fold(logs)
+                if changed:
+                    self.version += 1
+            return changed
+
+    def snapshot(self, scope):
+        """Counts for one scope, as sent to dashboards; None before the first refresh"""
+        with self._lock:
+            if self.day is None:
+                return None
+            headcount = self.headcount[scope]
+            present = self.present[scope]
+            return {
+                'date': self.day.isoformat(),
+                'headcount': headcount,
+                'present': present,
+                'late': self.late[scope],
+                'absent': headcount - present,
+            }
+
+    def _start_day(self, day):
+        employees = {}
+        headcount = Counter()
+        for employee_id, department_id, manager_id, start_time, end_time in Employee.objects.filter(
+            status=True
+        ).values_list('employee_id', 'department_id', 'manager_id', 'shift__start_time', 'shift__end_time'):
+            scopes = (COMPANY, department_scope(department_id), team_scope(manager_id))
+            shift_start = shift_bounds(day, start_time, end_time)[0] if start_time and end_time else None
+            employees[employee_id] = (scopes, shift_offset(start_time, end_time), shift_start)
+            headcount.update(scopes)
+
+        calendar = WorkCalendar(day, day)
+        latest = self._latest_attendance_id()
+        start, end = calendar.bounds(offset for _, offset, _ in employees.values())
+        logs = list(self._logs(punch_time__gte=start, punch_time__lt=end))
+        # Ids below the mark that were not visible yet may still commit
+        now = time.time()
+        recent = max(latest - MAX_PENDING_IDS, 0)
+        committed = set(AttendanceLog.objects.filter(
+            attendance_id__gt=recent, attendance_id__lte=latest
+        ).values_list('attendance_id', flat=True))
+        pending = track_skipped({}, recent, latest + 1, committed, now)
+
+        with self._lock:
+            self.day = day
+            self.calendar = calendar
+            self.employees = employees
+            self.headcount = headcount
+            self.present = Counter()
+            self.late = Counter()
+            self.first_in = {}
+            self.last_attendance_id = latest
+            self.pending = pending
+            self._fold(logs)
+            self.version += 1
+
+    def _latest_attendance_id(self):
+        return AttendanceLog.objects.aggregate(latest=Max('attendance_id'))['latest'] or 0
+
+    def _logs(self, **filters):
+        return AttendanceLog.objects.filter(punch_type='IN', **filters).exclude(
+            status='rejected'
+        ).values_list('employee_id', 'punch_time')
+
+    def _fold(self, logs):
+        changed = False
+        for employee_id, punch_time in logs:
+            employee = self.employees.get(employee_id)
+            if employee is None:
+                # Inactive, or joined after the day started
+                continue
+            scopes, offset, shift_start = employee
+            if self.calendar.work_date(punch_time, offset) != self.day:
+                continue
+            first_in = self.first_in.get(employee_id)
+            if first_in is not None and first_in <= punch_time:
+                continue
+            was_late = first_in is not None and shift_start is not None and first_in > shift_start
+            is_late = shift_start is not None and punch_time > shift_start
+            self.first_in[employee_id] = punch_time
+            for scope in scopes:
+                if first_in is None:
+                    self.present[scope] += 1
+                self.late[scope] += is_late - was_late
+            changed = True
+        return changed
+
+
+live_attendance = LiveAttendance()
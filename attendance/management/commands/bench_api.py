@@ -0,0 +1,104 @@
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from master.models import Employee
+
+ENDPOINTS = {
+    'today': '/employee/attendance/today',
+    'history': '/employee/attendance/history?limit=20',
+}
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def build_app(principal):
+    """Sync and async attendance routers side by side, authenticated as ``principal``"""
+    sys.path.append(os.path.join(settings.BASE_DIR, 'fastapi_api'))
+    from fastapi import FastAPI
+    from fastapi_api import auth
+    from fastapi_api.routers import async_attendance, employee_attendance
+
+    app = FastAPI()
+    app.include_router(employee_attendance.router, prefix='/sync')
+    app.include_router(async_attendance.router, prefix='/async')
+    app.dependency_overrides[auth.get_current_user] = lambda: principal
+    app.dependency_overrides[auth.get_current_user_async] = lambda: principal
+    return app
+
+
+async def load(app, path, clients, requests):
+    """Latencies of ``requests`` GETs to ``path`` issued by ``clients`` concurrent clients"""
+    import httpx
+
+    latencies = []
+    remaining = iter(range(requests))
+
+    async def client(http):
+        for _ in remaining:
+            started = time.perf_counter()
+            response = await http.get(path)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                raise CommandError(f'{path} returned {response.status_code}: {response.text[:200]}')
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url='http://bench') as http:
+        started = time.perf_counter()
+        await asyncio.gather(*(client(http) for _ in range(clients)))
+        elapsed = time.perf_counter() - started
+    return latencies, elapsed
+
+
+class Command(BaseCommand):
+    help = 'Compare p50/p99 latency of the sync and async attendance endpoints under concurrent clients'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=500, help='Concurrent clients')
+        parser.add_argument('--requests', type=int, default=5000, help='Requests per endpoint and mode')
+        parser.add_argument('--endpoints', default=','.join(ENDPOINTS), help='Comma-separated: ' + ', '.join(ENDPOINTS))
+        parser.add_argument('--employee', type=int, help='employee_id to query as (default: the one with most punches)')
+
+    def handle(self, *args, **options):
+        from django.db.models import Count
+        from fastapi_api.auth import Principal
+
+        employee = Employee.objects.filter(pk=options['employee']) if options['employee'] else (
+            Employee.objects.annotate(punches=Count('attendancelog')).order_by('-punches')
+        )
+        employee = employee.first()
+        if employee is None:
+            raise CommandError('No employees to benchmark with; load some data first')
+        app = build_app(Principal(employee.user_id or 0, 'bench', 'Employee', employee.employee_id, True))
+
+        self.stdout.write(
+            f"{'endpoint':>10} {'mode':>6} {'p50 (ms)':>10} {'p99 (ms)':>10} {'req/s':>8}"
+            f"   ({options['clients']} clients, {options['requests']} requests)"
+        )
+        names = options['endpoints'].split(',')
+        for name in names:
+            if name not in ENDPOINTS:
+                raise CommandError(f'Unknown endpoint {name!r}')
+        # One event loop for every run: pooled async connections belong to the loop that opened them
+        asyncio.run(self.compare(app, names, options['clients'], options['requests']))
+
+    async def compare(self, app, names, clients, requests):
+        from database import get_async_engine
+
+        for name in names:
+            for mode in ('sync', 'async'):
+                latencies, elapsed = await load(app, f'/{mode}{ENDPOINTS[name]}', clients, requests)
+                self.stdout.write(
+                    f'{name:>10} {mode:>6} {statistics.median(latencies) * 1000:>10.1f} '
+                    f'{percentile(latencies, 0.99) * 1000:>10.1f} {len(latencies) / elapsed:>8.0f}'
+                )
+        # Close pooled aiosqlite connections, whose worker threads would keep the process alive
+        await get_async_engine().dispose()
@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from attendance.summaries import reset_checkpoint, run_summary_engine
+
+
+class Command(BaseCommand):
+    help = 'Fold new attendance punches into AttendanceSummary rows (once, or continuously with --watch)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--watch', action='store_true', help='Keep running as a background worker')
+        parser.add_argument('--interval', type=float, default=5.0, help='Seconds to sleep between polls in --watch mode')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Punches consumed per transaction')
+        parser.add_argument('--rebuild', action='store_true', help='Delete every summary, reset the high-water mark and recompute them all')
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            reset_checkpoint()
+            self.stdout.write('Summaries deleted and high-water mark reset; recomputing all summaries')
+
+        while True:
+            started = time.perf_counter()
+            processed = run_summary_engine(batch_size=options['batch_size'])
+            if processed:
+                elapsed = time.perf_counter() - started
+                self.stdout.write(f'Processed {processed} punches in {elapsed:.2f}s')
+
+            if not options['watch']:
+                break
+            close_old_connections()
+            time.sleep(options['interval'])
@@ -0,0 +1,22 @@
+# Generated by Django 5.1.2 on 2026-10-18 13:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SummaryCheckpoint',
+            fields=[
+                ('checkpoint_id', models.AutoField(primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('last_attendance_id', models.IntegerField(default=0, help_text='Highest AttendanceLog id folded into summaries')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.1.2 on 2026-10-18 13:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0002_summarycheckpoint'),
+        ('master', '0005_employee_manager'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='attendancelog',
+            index=models.Index(fields=['employee', 'punch_time'], name='attlog_employee_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attendancelog',
+            index=models.Index(fields=['punch_time'], name='attlog_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attendancesummary',
+            index=models.Index(fields=['date', 'status'], name='attsum_date_status_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.2 on 2026-10-18 14:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0003_attendancelog_attlog_employee_time_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='summarycheckpoint',
+            name='pending_ids',
+            field=models.JSONField(blank=True, default=list, help_text='[id, first seen missing (epoch seconds)] of ids below the high-water mark that may still commit'),
+        ),
+    ]
@@ -16,6 +16,12 @@ class AttendanceLog(models.Model):
         ('rejected', 'Rejected')
     ], default='approved')
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['employee', 'punch_time'], name='attlog_employee_time_idx'),
+            models.Index(fields=['punch_time'], name='attlog_time_idx'),
+        ]
+
     def __str__(self):
         return f"{self.employee.employee_code} - {self.punch_type} at {self.punch_time}"
 
@@ -37,6 +43,22 @@ class AttendanceSummary(models.Model):
 
     class Meta:
         unique_together = ('employee', 'date')
+        indexes = [
+            models.Index(fields=['date', 'status'], name='attsum_date_status_idx'),
+        ]
 
     def __str__(self):
         return f"{self.employee.employee_code} - {self.date} - {self.status}"
+
+class SummaryCheckpoint(models.Model):
+    checkpoint_id = models.AutoField(primary_key=True)
+    name = models.CharField(max_length=50, unique=True)
+    last_attendance_id = models.IntegerField(default=0, help_text="Highest AttendanceLog id folded into summaries")
+    pending_ids = models.JSONField(
+        default=list, blank=True,
+        help_text="[id, first seen missing (epoch seconds)] of ids below the high-water mark that may still commit",
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} @ {self.last_attendance_id}"
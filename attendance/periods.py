@@ -0,0 +1,58 @@
+"""Half-open ranges for date filters.
+
+Filtering with ``punch_time__date=...`` or on the month/year of a date
+wraps the column in a function, so the database cannot use an index on
+it. These helpers turn calendar days, months and years into
+``[start, end)`` bounds that compare against the bare column.
+
+Punches are stored in UTC; "local" days are calendar days in
+``settings.ATTENDANCE_TIME_ZONE``, the time zone the sites work in.
+"""
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.utils import timezone
+
+
+@lru_cache(maxsize=None)
+def _zone(name):
+    return ZoneInfo(name)
+
+
+def attendance_timezone():
+    """Time zone attendance days are counted in"""
+    return _zone(settings.ATTENDANCE_TIME_ZONE)
+
+
+def local_today():
+    """Today's calendar date in the attendance time zone"""
+    return timezone.localdate(timezone=attendance_timezone())
+
+
+def day_bounds(start_date, end_date=None):
+    """Aware ``[start, end)`` datetimes covering the local days ``start_date``..``end_date`` inclusive"""
+    tz = attendance_timezone()
+    end_date = end_date or start_date
+    return (
+        timezone.make_aware(datetime.combine(start_date, datetime.min.time()), tz),
+        timezone.make_aware(datetime.combine(end_date + timedelta(days=1), datetime.min.time()), tz),
+    )
+
+
+def on_days(field, start_date, end_date=None):
+    """Filter kwargs matching ``field`` (a DateTimeField) on the local days ``start_date``..``end_date``"""
+    start, end = day_bounds(start_date, end_date)
+    return {f'{field}__gte': start, f'{field}__lt': end}
+
+
+def month_bounds(year, month):
+    """``[first day, first day of the next month)`` of a calendar month"""
+    start = date(year, month, 1)
+    end = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+    return start, end
+
+
+def year_bounds(year):
+    return date(year, 1, 1), date(year + 1, 1, 1)
@@ -0,0 +1,9 @@
+from django.dispatch import Signal
+
+# Sent by the summary engine after a bulk upsert, which bypasses post_save.
+# ``pairs`` is the set of (employee_id, date) whose summaries were rebuilt.
+summaries_refreshed = Signal()
+
+# Sent after new punches are committed, by every path that records them.
+# ``employee_ids`` is the set of employees who punched.
+punches_recorded = Signal()
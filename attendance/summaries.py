@@ -0,0 +1,255 @@
+import time
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from master.models import Employee
+from .models import AttendanceLog, AttendanceSummary, SummaryCheckpoint
+from .bucketing import CALENDAR_DAY, WorkCalendar, employee_offsets, shift_bounds, shift_offset
+from .periods import attendance_timezone
+from .signals import summaries_refreshed
+
+SUMMARY_UPDATE_FIELDS = ['in_time', 'out_time', 'total_hours', 'late_by', 'early_out', 'status']
+# Skipped ids are tracked this far below the high-water mark
+MAX_PENDING_IDS = 10000
+
+
+def computed_summaries():
+    """Summaries the engine wrote from punches, the only ones it may delete.
+
+    Those always carry an in or out time; leave and absent days entered by
+    hand have neither. Leave rows are never counted as computed.
+    """
+    return AttendanceSummary.objects.filter(
+        Q(in_time__isnull=False) | Q(out_time__isnull=False)
+    ).exclude(status='leave')
+
+
+def summary_values(work_date, punches, shift_start=None, shift_end=None):
+    """SUMMARY_UPDATE_FIELDS values for one work date of (punch_type, punch_time) pairs"""
+    first_in = None
+    last_out = None
+    for punch_type, punch_time in punches:
+        if punch_type == 'IN' and first_in is None:
+            first_in = punch_time
+        elif punch_type == 'OUT':
+            last_out = punch_time
+
+    tz = attendance_timezone()
+    in_time = timezone.localtime(first_in, tz).time() if first_in else None
+    out_time = timezone.localtime(last_out, tz).time() if last_out else None
+
+    # Calculate total hours from the actual punch datetimes
+    total_hours = None
+    if first_in and last_out and last_out > first_in:
+        total_hours = round(Decimal((last_out - first_in).total_seconds()) / 3600, 2)
+
+    # Compare against the shift's actual datetimes so night shifts can end the next morning
+    late_by = 0
+    early_out = 0
+    if shift_start and shift_end:
+        shift_in, shift_out = shift_bounds(work_date, shift_start, shift_end)
+        if first_in and first_in > shift_in:
+            late_by = int((first_in - shift_in).total_seconds() / 60)
+        if last_out and last_out < shift_out:
+            early_out = int((shift_out - last_out).total_seconds() / 60)
+
+    status = 'present'
+    if not in_time:
+        status = 'absent'
+    elif total_hours and total_hours < 4:
+        status = 'half_day'
+
+    return in_time, out_time, total_hours, late_by, early_out, status
+
+
+def compute_summary(employee_id, work_date, punches, shift_start=None, shift_end=None):
+    """Build an unsaved AttendanceSummary from one employee's work date of (punch_type, punch_time) pairs"""
+    values = summary_values(work_date, punches, shift_start, shift_end)
+    return AttendanceSummary(employee_id=employee_id, date=work_date, **dict(zip(SUMMARY_UPDATE_FIELDS, values)))
+
+
+def delete_summaries(pairs, batch_size=500):
+    """Delete the computed summaries of a set of (employee_id, date) pairs.
+
+    Rows go in one DELETE per batch without per-row signals; callers tell
+    listeners through summaries_refreshed.
+    """
+    by_employee = {}
+    for employee_id, work_date in pairs:
+        by_employee.setdefault(employee_id, []).append(work_date)
+    employees = list(by_employee.items())
+    deleted = 0
+    for start in range(0, len(employees), batch_size):
+        condition = Q()
+        for employee_id, dates in employees[start:start + batch_size]:
+            condition |= Q(employee_id=employee_id, date__in=dates)
+        deleted += computed_summaries().filter(condition)._raw_delete(AttendanceSummary.objects.db)
+    return deleted
+
+
+def clear_summaries(batch_size=5000):
+    """Delete every computed summary, a batch at a time, ahead of a full rebuild"""
+    deleted = 0
+    while True:
+        pairs = set(computed_summaries().order_by().values_list('employee_id', 'date')[:batch_size])
+        if not pairs:
+            return deleted
+        deleted += delete_summaries(pairs)
+        summaries_refreshed.send(sender=AttendanceSummary, pairs=pairs)
+
+
+def rebuild_summaries(pairs, batch_size=500):
+    """Recompute and upsert the summaries for a set of (employee_id, date) pairs.
+
+    All punches for the affected employees are read with one query and the
+    summaries are written back with a single bulk upsert. Pairs left with
+    no punches lose their computed summary.
+    """
+    pairs = set(pairs)
+    if not pairs:
+        return 0
+
+    employee_ids = {employee_id for employee_id, _ in pairs}
+    dates = [work_date for _, work_date in pairs]
+
+    shifts = {
+        employee_id: (start_time, end_time)
+        for employee_id, start_time, end_time in Employee.objects.filter(
+            employee_id__in=employee_ids
+        ).values_list('employee_id', 'shift__start_time', 'shift__end_time')
+    }
+    offsets = {employee_id: shift_offset(*shift) for employee_id, shift in shifts.items()}
+    calendar = WorkCalendar(min(dates), max(dates))
+    range_start, range_end = calendar.bounds(offsets.values())
+
+    # Group punches by employee and work date
+    punches_by_day = {}
+    logs = AttendanceLog.objects.filter(
+        employee_id__in=employee_ids,
+        punch_time__gte=range_start,
+        punch_time__lt=range_end,
+    ).exclude(status='rejected').order_by('punch_time').values_list('employee_id', 'punch_type', 'punch_time')
+    for employee_id, punch_type, punch_time in logs:
+        key = (employee_id, calendar.work_date(punch_time, offsets.get(employee_id, CALENDAR_DAY)))
+        if key in pairs:
+            punches_by_day.setdefault(key, []).append((punch_type, punch_time))
+
+    summaries = [
+        compute_summary(employee_id, work_date, punches, *shifts.get(employee_id, (None, None)))
+        for (employee_id, work_date), punches in punches_by_day.items()
+    ]
+    AttendanceSummary.objects.bulk_create(
+        summaries,
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=['employee', 'date'],
+        update_fields=SUMMARY_UPDATE_FIELDS,
+    )
+    delete_summaries(pairs - punches_by_day.keys(), batch_size)
+    summaries_refreshed.send(sender=AttendanceSummary, pairs=pairs)
+    return len(summaries)
+
+
+def unexpired(pending_ids, now):
+    """``{attendance_id: first seen}`` of skipped ids still inside SUMMARY_LATE_COMMIT_WINDOW"""
+    return {
+        attendance_id: seen for attendance_id, seen in pending_ids
+        if now - seen < settings.SUMMARY_LATE_COMMIT_WINDOW
+    }
+
+
+def track_skipped(pending, last_id, high, seen_ids, now):
+    """Add the ids in ``(last_id, high)`` missing from ``seen_ids`` to ``pending``.
+
+    Ids are handed out before commit, so a gap below the new high-water
+    mark may be a transaction that is still running. Only the
+    MAX_PENDING_IDS ids below ``high`` are tracked.
+    """
+    floor = high - MAX_PENDING_IDS
+    pending.update(
+        (attendance_id, now)
+        for attendance_id in range(max(last_id + 1, floor), high)
+        if attendance_id not in seen_ids
+    )
+    return {attendance_id: seen for attendance_id, seen in pending.items() if attendance_id >= floor}
+
+
+def logs_by_id(logs, ids, chunk_size=500):
+    """Rows of the AttendanceLog queryset ``logs`` among ``ids``, a chunk of ids per query"""
+    ids = sorted(ids)
+    return [
+        row
+        for start in range(0, len(ids), chunk_size)
+        for row in logs.filter(attendance_id__in=ids[start:start + chunk_size])
+    ]
+
+
+def refresh_pending_summaries(batch_size=5000, checkpoint_name='default'):
+    """Fold the next batch of new AttendanceLog rows into their summaries.
+
+    Logs are consumed in ``attendance_id`` order past the checkpoint's
+    high-water mark; only the (employee, date) pairs they touch are
+    recomputed. Ids a batch skips over may belong to transactions that
+    have not committed yet (ids are handed out before commit), so they are
+    kept on the checkpoint and looked up again on every pass for
+    SUMMARY_LATE_COMMIT_WINDOW seconds. Returns the number of logs consumed.
+    """
+    with transaction.atomic():
+        checkpoint, _ = SummaryCheckpoint.objects.select_for_update().get_or_create(name=checkpoint_name)
+        now = time.time()
+        pending = unexpired(checkpoint.pending_ids, now)
+        rows = AttendanceLog.objects.values_list('attendance_id', 'employee_id', 'punch_time')
+        late = logs_by_id(rows, pending)
+        logs = list(rows.filter(attendance_id__gt=checkpoint.last_attendance_id).order_by('attendance_id')[:batch_size])
+
+        for attendance_id, _, _ in late:
+            del pending[attendance_id]
+        if logs:
+            high = logs[-1][0]
+            pending = track_skipped(
+                pending, checkpoint.last_attendance_id, high, {attendance_id for attendance_id, _, _ in logs}, now
+            )
+            checkpoint.last_attendance_id = high
+
+        if not (logs or late or len(pending) != len(checkpoint.pending_ids)):
+            return 0
+
+        logs += late
+        if logs:
+            offsets = employee_offsets({employee_id for _, employee_id, _ in logs})
+            calendar = WorkCalendar.covering([punch_time for _, _, punch_time in logs])
+            rebuild_summaries({
+                (employee_id, calendar.work_date(punch_time, offsets.get(employee_id, CALENDAR_DAY)))
+                for _, employee_id, punch_time in logs
+            })
+        checkpoint.pending_ids = sorted([attendance_id, seen] for attendance_id, seen in pending.items())
+        checkpoint.save(update_fields=['last_attendance_id', 'pending_ids', 'updated_at'])
+    return len(logs)
+
+
+def run_summary_engine(batch_size=5000, checkpoint_name='default'):
+    """Consume all pending logs; returns the total number of logs processed"""
+    total = 0
+    while True:
+        processed = refresh_pending_summaries(batch_size, checkpoint_name)
+        total += processed
+        if processed < batch_size:
+            return total
+
+
+def reset_checkpoint(checkpoint_name='default', last_attendance_id=0):
+    """Move the high-water mark back so the next run recomputes from there.
+
+    Rewinding to the start deletes every computed summary first: the
+    engine only writes days that still have punches, so days whose punches
+    were all removed would otherwise keep a stale summary.
+    """
+    if not last_attendance_id:
+        clear_summaries()
+    SummaryCheckpoint.objects.update_or_create(
+        name=checkpoint_name, defaults={'last_attendance_id': last_attendance_id, 'pending_ids': []}
+    )
@@ -1,3 +1,454 @@
-from django.test import TestCase
+import io
+import json
+import unittest
+from datetime import date, datetime, time, timedelta, timezone
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+
+from leave.models import LeaveApplication
+from master.models import Department, Device, Employee, Shift
+from .models import AttendanceLog, AttendanceSummary, SummaryCheckpoint
+from .aggregates import employee_overview, summary_totals
+from .ingest import MAX_BATCH_SIZE, ingest_punches, parse_ndjson
+from .bucketing import WorkCalendar, shift_offset, work_date
+from .live import COMPANY, LiveAttendance, department_scope, team_scope
+from .periods import day_bounds, month_bounds, on_days
+from .summaries import compute_summary, rebuild_summaries, run_summary_engine
+
+
+class PeriodTests(TestCase):
+
+    def test_day_bounds_are_half_open(self):
+        start, end = day_bounds(date(2025, 1, 31))
+        self.assertEqual((start.date(), start.hour), (date(2025, 1, 31), 0))
+        self.assertEqual((end.date(), end.hour), (date(2025, 2, 1), 0))
+
+    def test_month_bounds_roll_over_the_year(self):
+        self.assertEqual(month_bounds(2024, 12), (date(2024, 12, 1), date(2025, 1, 1)))
+        self.assertEqual(month_bounds(2024, 2), (date(2024, 2, 1), date(2024, 3, 1)))
+
+
+class WorkDateTests(TestCase):
+    """Punches land on their shift's work date in the attendance time zone (Asia/Kolkata)"""
+
+    night = shift_offset(time(22, 0), time(6, 0))
+
+    def test_window_opens_midway_through_the_off_duty_gap(self):
+        self.assertEqual(shift_offset(time(9, 0), time(17, 0)), timedelta(hours=1))
+        self.assertEqual(shift_offset(time(22, 0), time(6, 0)), timedelta(hours=14))
+        self.assertEqual(shift_offset(None, None), timedelta(0))
+
+    def test_evening_punch_is_not_filed_under_the_utc_day(self):
+        # 19:00 IST on Jan 6 is 13:30 UTC the same day, 00:30 IST on Jan 7 is still Jan 6 UTC
+        self.assertEqual(work_date(datetime(2025, 1, 6, 13, 30, tzinfo=timezone.utc)), date(2025, 1, 6))
+        self.assertEqual(work_date(datetime(2025, 1, 6, 19, 0, tzinfo=timezone.utc)), date(2025, 1, 7))
+
+    def test_night_shift_out_punch_belongs_to_the_evening_it_started(self):
+        punch_in = datetime(2025, 1, 6, 16, 30, tzinfo=timezone.utc)   # 22:00 IST Jan 6
+        punch_out = datetime(2025, 1, 7, 0, 15, tzinfo=timezone.utc)   # 05:45 IST Jan 7
+        calendar = WorkCalendar(date(2025, 1, 5), date(2025, 1, 8))
+        for punch in (punch_in, punch_out):
+            self.assertEqual(work_date(punch, self.night), date(2025, 1, 6))
+            self.assertEqual(calendar.work_date(punch, self.night), date(2025, 1, 6))
+
+        summary = compute_summary(1, date(2025, 1, 6), [('IN', punch_in), ('OUT', punch_out)], time(22, 0), time(6, 0))
+        self.assertEqual((summary.late_by, summary.early_out, summary.total_hours), (0, 15, 7.75))
+
+
+
+class AggregateTests(TestCase):
+    """Attendance counts and percentages come out of one grouped query per overview"""
+
+    start = date(2025, 1, 6)
+    end = date(2025, 1, 10)
+
+    def setUp(self):
+        self.engineering = Department.objects.create(department_name='Engineering')
+        sales = Department.objects.create(department_name='Sales')
+
+        def employee(code, department, manager=None):
+            return Employee.objects.create(
+                employee_code=code, first_name=code, last_name='X', email=f'{code}@example.com',
+                department=department, manager=manager, date_of_joining=date(2024, 1, 1),
+            )
+
+        self.manager = employee('M1', self.engineering)
+        self.first = employee('E1', self.engineering, self.manager)
+        self.second = employee('E2', sales, self.manager)
+        self.idle = employee('E3', sales)
+        rows = {
+            self.first: [
+                ('present', 0, '8.00'), ('present', 12, '7.50'), ('half_day', 0, '3.00'), ('absent', 0, None), ('leave', 0, None),
+            ],
+            self.second: [('present', 5, '8.25'), ('present', 0, '8.00'), ('half_day', 30, '3.50')],
+            self.manager: [('present', 0, '9.00')],
+        }
+        AttendanceSummary.objects.bulk_create([
+            AttendanceSummary(
+                employee=record, date=self.start + timedelta(days=offset), status=status, late_by=late_by,
+                total_hours=Decimal(hours) if hours else None,
+            )
+            for record, days in rows.items() for offset, (status, late_by, hours) in enumerate(days)
+        ])
+        # Outside the range
+        AttendanceSummary.objects.create(employee=self.first, date=self.end + timedelta(days=1), status='absent')
+        AttendanceSummary.objects.create(employee=self.second, date=self.start - timedelta(days=1), status='present')
+
+    def counts(self, rows):
+        return {
+            row['employee_code']: (
+                row['total_days'], row['present_days'], row['absent_days'], row['half_days'], row['leave_days'],
+                row['late_days'], row['attendance_percentage'],
+            )
+            for row in rows
+        }
+
+    def test_employee_overview(self):
+        with self.assertNumQueries(1):
+            rows = employee_overview(self.start, self.end)
+        self.assertEqual(self.counts(rows), {
+            'M1': (1, 1, 0, 0, 0, 0, 100.0),
+            'E1': (5, 2, 1, 1, 1, 1, 50.0),
+            'E2': (3, 2, 0, 1, 0, 2, 83.33),
+            'E3': (0, 0, 0, 0, 0, 0, 0),
+        })
+        self.assertEqual(rows[1]['employee_name'], 'E1 X')
+        self.assertEqual(rows[1]['department_name'], 'Engineering')
+
+    def test_employee_overview_filters(self):
+        department = employee_overview(self.start, self.end, department_id=self.engineering.pk)
+        self.assertEqual([row['employee_code'] for row in department], ['M1', 'E1'])
+        team = employee_overview(self.start, self.end, manager_id=self.manager.pk)
+        self.assertEqual([row['employee_code'] for row in team], ['E1', 'E2'])
+
+    def test_summary_totals_by_department(self):
+        rows = list(summary_totals(self.start, self.end, 'employee__department__department_name'))
+        self.assertEqual([
+            (row['employee__department__department_name'], row['total_days'], row['present_days'], row['half_days'],
+             row['late_days'], row['total_hours'])
+            for row in rows
+        ], [
+            ('Engineering', 6, 3, 1, 1, Decimal('27.50')),
+            ('Sales', 3, 2, 1, 2, Decimal('19.75')),
+        ])
+        team = summary_totals(self.start, self.end, 'employee__manager', employees=[self.first])
+        self.assertEqual([(row['employee__manager'], row['total_days']) for row in team], [(self.manager.pk, 5)])
+
+
+class SummaryEngineTests(TestCase):
+    """New punches are folded into summaries past a high-water mark that tolerates out-of-order commits"""
+
+    day = date(2025, 1, 6)
+
+    def setUp(self):
+        shift = Shift.objects.create(shift_name='General', start_time=time(9, 0), end_time=time(17, 0))
+        self.employee = Employee.objects.create(
+            employee_code='E1', first_name='E', last_name='X', email='e1@example.com', shift=shift, date_of_joining=self.day
+        )
+
+    def punch(self, day, hour, minute, punch_type='IN', status='approved', **fields):
+        # IST is UTC+05:30
+        punch_time = datetime(day.year, day.month, day.day, hour, minute, tzinfo=timezone.utc) - timedelta(hours=5, minutes=30)
+        return AttendanceLog.objects.create(
+            employee=self.employee, punch_type=punch_type, punch_time=punch_time, status=status, **fields
+        )
+
+    def summary(self, day):
+        return AttendanceSummary.objects.filter(employee=self.employee, date=day).first()
+
+    def test_new_punches_update_their_day(self):
+        self.punch(self.day, 9, 10)
+        self.assertEqual(run_summary_engine(), 1)
+        summary = self.summary(self.day)
+        self.assertEqual((summary.in_time, summary.out_time, summary.late_by), (time(9, 10), None, 10))
+
+        out = self.punch(self.day, 17, 0, 'OUT')
+        self.assertEqual(run_summary_engine(), 1)
+        summary = self.summary(self.day)
+        self.assertEqual((summary.status, summary.total_hours), ('present', Decimal('7.83')))
+        self.assertEqual(SummaryCheckpoint.objects.get().last_attendance_id, out.pk)
+        self.assertEqual(run_summary_engine(), 0)
+
+    def test_punch_committed_out_of_id_order_is_picked_up(self):
+        first = self.punch(self.day, 9, 0)
+        # The next id went to a transaction that commits after this later one
+        self.punch(self.day, 17, 0, 'OUT', attendance_id=first.pk + 2)
+        run_summary_engine()
+        self.assertEqual(SummaryCheckpoint.objects.get().pending_ids[0][0], first.pk + 1)
+
+        other_day = date(2025, 1, 7)
+        self.punch(other_day, 9, 0, attendance_id=first.pk + 1)
+        self.assertEqual(run_summary_engine(), 1)
+        self.assertEqual(self.summary(other_day).status, 'present')
+        self.assertEqual(SummaryCheckpoint.objects.get().pending_ids, [])
+
+    @override_settings(SUMMARY_LATE_COMMIT_WINDOW=0)
+    def test_skipped_ids_are_given_up_after_the_window(self):
+        first = self.punch(self.day, 9, 0)
+        self.punch(self.day, 17, 0, 'OUT', attendance_id=first.pk + 2)
+        run_summary_engine()
+        run_summary_engine()
+        self.assertEqual(SummaryCheckpoint.objects.get().pending_ids, [])
+
+    def test_day_without_punches_loses_its_summary(self):
+        punch = self.punch(self.day, 9, 0)
+        run_summary_engine()
+        punch.delete()
+        rebuild_summaries({(self.employee.pk, self.day)})
+        self.assertIsNone(self.summary(self.day))
+
+    def test_days_entered_by_hand_are_kept(self):
+        AttendanceSummary.objects.create(employee=self.employee, date=self.day, status='leave')
+        AttendanceSummary.objects.create(employee=self.employee, date=date(2025, 1, 7), status='absent')
+        # Stray punches on both days, later rejected
+        punches = [self.punch(self.day, 9, 0), self.punch(date(2025, 1, 7), 9, 0)]
+        AttendanceLog.objects.filter(pk__in=[punch.pk for punch in punches]).update(status='rejected')
+        rebuild_summaries({(self.employee.pk, self.day), (self.employee.pk, date(2025, 1, 7))})
+        self.assertEqual(
+            list(AttendanceSummary.objects.order_by('date').values_list('status', flat=True)), ['leave', 'absent']
+        )
+
+        call_command('refresh_summaries', '--rebuild', stdout=io.StringIO())
+        self.assertEqual(AttendanceSummary.objects.count(), 2)
+
+    def test_full_rebuild_starts_from_no_summaries(self):
+        self.punch(self.day, 9, 0)
+        other_day = date(2025, 1, 7)
+        self.punch(other_day, 9, 0)
+        run_summary_engine()
+        # Removed without going through the engine, as a bulk cleanup would
+        AttendanceLog.objects.filter(punch_time__date=other_day).delete()
+        AttendanceSummary.objects.filter(date=self.day).update(status='absent')
+
+        call_command('refresh_summaries', '--rebuild', stdout=io.StringIO())
+        self.assertIsNone(self.summary(other_day))
+        self.assertEqual(self.summary(self.day).status, 'present')
+
+    def test_rejected_punches_are_ignored(self):
+        self.punch(self.day, 9, 0)
+        self.punch(self.day, 13, 0, 'OUT', status='rejected')
+        run_summary_engine()
+        self.assertIsNone(self.summary(self.day).out_time)
+
+
+class IngestTests(TestCase):
+    """Device batches are validated row by row and written in one transaction"""
+
+    def setUp(self):
+        self.device = Device.objects.create(device_name='Gate', serial_number='SN1', ip_address='10.0.0.1')
+        self.employee = Employee.objects.create(
+            employee_code='E1', first_name='E', last_name='X', email='e1@example.com', date_of_joining=date(2024, 1, 1)
+        )
+        Employee.objects.create(
+            employee_code='E2', first_name='F', last_name='X', email='e2@example.com',
+            date_of_joining=date(2024, 1, 1), status=False,
+        )
+
+    def punch(self, punch_type='IN', punch_time='2025-01-06T09:00:00+05:30', employee_code='E1', **fields):
+        return {'employee_code': employee_code, 'punch_type': punch_type, 'punch_time': punch_time, **fields}
+
+    def test_every_row_gets_a_result(self):
+        result = ingest_punches(self.device, [
+            self.punch(geo_lat='12.9715987', geo_long=77.5946),
+            self.punch(employee_code='E2'),
+            self.punch(employee_code='E9'),
+            self.punch(punch_type='BREAK'),
+            self.punch(punch_time='yesterday'),
+            self.punch(geo_lat='north'),
+            'IN',
+            self.punch('out', '2025-01-06T18:00:00'),
+        ])
+        self.assertEqual((result['received'], result['created'], result['duplicates'], result['errors']), (8, 2, 0, 6))
+        self.assertEqual([row['status'] for row in result['results']], ['created'] + ['error'] * 6 + ['created'])
+        self.assertEqual([row.get('error') for row in result['results'][1:7]], [
+            "Unknown or inactive employee 'E2'",
+            "Unknown or inactive employee 'E9'",
+            "Invalid punch_type 'BREAK'",
+            "Invalid punch_time 'yesterday'",
+            "Invalid coordinate 'north'",
+            'Punch must be an object',
+        ])
+
+        first = AttendanceLog.objects.get(pk=result['results'][0]['attendance_id'])
+        self.assertEqual((first.device, first.status, first.geo_lat), (self.device, 'approved', Decimal('12.971599')))
+        self.assertEqual(first.punch_time, datetime(2025, 1, 6, 3, 30, tzinfo=timezone.utc))
+        # Naive times are read in the attendance time zone, 18:00 IST
+        last = AttendanceLog.objects.get(pk=result['results'][7]['attendance_id'])
+        self.assertEqual((last.punch_type, last.punch_time), ('OUT', datetime(2025, 1, 6, 12, 30, tzinfo=timezone.utc)))
+        self.device.refresh_from_db()
+        self.assertEqual(self.device.status, 'online')
+
+    def test_resent_and_repeated_punches_are_duplicates(self):
+        ingest_punches(self.device, [self.punch()])
+        result = ingest_punches(self.device, [
+            self.punch(punch_time='2025-01-06T03:30:00Z'),
+            self.punch('OUT'),
+            self.punch('OUT'),
+        ])
+        self.assertEqual([row['status'] for row in result['results']], ['duplicate', 'created', 'duplicate'])
+        self.assertEqual(AttendanceLog.objects.count(), 2)
+
+    def test_oversized_batch_is_refused(self):
+        with self.assertRaisesMessage(ValueError, f'max {MAX_BATCH_SIZE} punches'):
+            ingest_punches(self.device, [self.punch()] * (MAX_BATCH_SIZE + 1))
+        self.assertFalse(AttendanceLog.objects.exists())
+
+    def test_failed_write_stores_nothing(self):
+        with mock.patch('attendance.ingest.Device.objects.filter', side_effect=RuntimeError('database went away')):
+            with self.assertRaises(RuntimeError):
+                ingest_punches(self.device, [self.punch(), self.punch('OUT', '2025-01-06T18:00:00+05:30')])
+        self.assertFalse(AttendanceLog.objects.exists())
+
+    def test_ndjson_lines(self):
+        body = json.dumps(self.punch()) + '\n\n' + json.dumps(self.punch('OUT')) + '\n'
+        self.assertEqual(parse_ndjson(body.encode()), [self.punch(), self.punch('OUT')])
+        with self.assertRaisesMessage(ValueError, 'Invalid JSON on line 2'):
+            parse_ndjson(json.dumps(self.punch()) + '\n{"employee_code": ')
+
+    def test_batch_view_accepts_json_and_ndjson(self):
+        response = self.client.post('/attendance/submit/batch/', {
+            'serial_number': 'SN1', 'punches': [self.punch(), self.punch(employee_code='E9')],
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.json()['success'], response.json()['created'], response.json()['errors']), (True, 1, 1))
+
+        body = '\n'.join(json.dumps(punch) for punch in (self.punch(), self.punch('OUT')))
+        response = self.client.post('/attendance/submit/batch/?serial_number=SN1', body, content_type='application/x-ndjson')
+        self.assertEqual((response.json()['created'], response.json()['duplicates']), (1, 1))
+
+    def test_batch_view_rejects_bad_requests(self):
+        response = self.client.post('/attendance/submit/batch/?serial_number=SN1', '{', content_type='application/x-ndjson')
+        self.assertEqual((response.status_code, response.json()['message']), (400, 'Invalid JSON on line 1'))
+        response = self.client.post('/attendance/submit/batch/', {
+            'serial_number': 'SN1', 'punches': [self.punch()] * (MAX_BATCH_SIZE + 1),
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post('/attendance/submit/batch/', {'serial_number': 'SN9', 'punches': []}, content_type='application/json')
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(AttendanceLog.objects.exists())
+
+
+class LiveAttendanceTests(TestCase):
+    """Live counts fold in only new punches and match what a full recount would give"""
+
+    day = date(2025, 1, 6)
+
+    def setUp(self):
+        self.department = Department.objects.create(department_name='Ops')
+        shift = Shift.objects.create(shift_name='General', start_time=time(9, 0), end_time=time(17, 0))
+
+        def employee(code, **fields):
+            return Employee.objects.create(
+                employee_code=code, first_name=code, last_name='X', email=f'{code}@example.com',
+                department=self.department, shift=shift, date_of_joining=self.day, **fields
+            )
+        self.manager = employee('M1')
+        self.on_time = employee('E1', manager=self.manager)
+        self.late = employee('E2', manager=self.manager)
+
+    def punch(self, employee, hour, minute, punch_type='IN', **fields):
+        # IST is UTC+05:30
+        punch_time = datetime(2025, 1, 6, hour, minute, tzinfo=timezone.utc) - timedelta(hours=5, minutes=30)
+        return AttendanceLog.objects.create(
+            employee=employee, punch_type=punch_type, punch_time=punch_time, status='approved', **fields
+        )
+
+    def test_counts_follow_new_and_backfilled_punches(self):
+        self.punch(self.on_time, 8, 55)
+        live = LiveAttendance()
+        live.refresh(self.day)
+        self.assertEqual(live.snapshot(COMPANY), {'date': '2025-01-06', 'headcount': 3, 'present': 1, 'late': 0, 'absent': 2})
+
+        self.punch(self.late, 9, 20)
+        self.punch(self.late, 17, 5, 'OUT')
+        self.punch(self.manager, 8, 0)
+        self.assertTrue(live.refresh(self.day))
+        self.assertEqual(live.snapshot(team_scope(self.manager.pk))['late'], 1)
+        self.assertEqual(live.snapshot(department_scope(self.department.pk))['present'], 3)
+        self.assertFalse(live.refresh(self.day))
+
+        # A device flushes an earlier punch: E2 was on time after all
+        self.punch(self.late, 8, 59)
+        live.refresh(self.day)
+        self.assertEqual(live.snapshot(team_scope(self.manager.pk)), {'date': '2025-01-06', 'headcount': 2, 'present': 2, 'late': 0, 'absent': 0})
+
+        # A new day starts from zero
+        live.refresh(date(2025, 1, 7))
+        self.assertEqual(live.snapshot(COMPANY)['present'], 0)
+
+    def test_punch_committed_out_of_id_order_is_counted(self):
+        first = self.punch(self.on_time, 8, 55)
+        live = LiveAttendance()
+        live.refresh(self.day)
+        # The next id went to a transaction that commits after this later one
+        self.punch(self.late, 9, 20, attendance_id=first.pk + 2)
+        live.refresh(self.day)
+        self.assertEqual(live.snapshot(COMPANY)['present'], 2)
+
+        self.punch(self.manager, 8, 30, attendance_id=first.pk + 1)
+        self.assertTrue(live.refresh(self.day))
+        self.assertEqual(live.snapshot(COMPANY)['present'], 3)
+        self.assertEqual(live.pending, {})
+
+    def test_ids_missing_when_the_day_starts_are_rechecked(self):
+        first = self.punch(self.on_time, 8, 55)
+        self.punch(self.late, 9, 20, attendance_id=first.pk + 2)
+        live = LiveAttendance()
+        live.refresh(self.day)
+        self.assertEqual(list(live.pending), [first.pk + 1])
+
+        self.punch(self.manager, 8, 30, attendance_id=first.pk + 1)
+        live.refresh(self.day)
+        self.assertEqual(live.snapshot(COMPANY)['present'], 3)
+
+    @override_settings(SUMMARY_LATE_COMMIT_WINDOW=0)
+    def test_skipped_ids_are_given_up_after_the_window(self):
+        first = self.punch(self.on_time, 8, 55)
+        live = LiveAttendance()
+        live.refresh(self.day)
+        self.punch(self.late, 9, 20, attendance_id=first.pk + 2)
+        live.refresh(self.day)
+        live.refresh(self.day)
+        self.assertEqual(live.pending, {})
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN is SQLite specific')
+class DatePredicatePlanTests(TestCase):
+    """Date filters are range predicates on bare columns, so they search an index instead of scanning"""
+
+    def assertSearches(self, queryset, index=None):
+        plan = queryset.explain()
+        table = queryset.model._meta.db_table
+        self.assertNotIn(f'SCAN {table}', plan)
+        self.assertIn(f'SEARCH {table} USING', plan)
+        if index:
+            self.assertIn(index, plan)
+
+    def test_punches_on_a_day(self):
+        self.assertSearches(AttendanceLog.objects.filter(**on_days('punch_time', date(2025, 1, 6))), 'attlog_time_idx')
+
+    def test_employee_punches_over_a_range(self):
+        queryset = AttendanceLog.objects.filter(employee_id=1, **on_days('punch_time', date(2025, 1, 1), date(2025, 1, 31)))
+        self.assertSearches(queryset, 'attlog_employee_time_idx')
+
+    def test_date_function_defeats_the_index(self):
+        plan = AttendanceLog.objects.filter(punch_time__date=date(2025, 1, 6)).explain()
+        self.assertIn('SCAN attendance_attendancelog', plan)
+
+    def test_summaries_by_month_and_status(self):
+        start, end = month_bounds(2025, 1)
+        self.assertSearches(AttendanceSummary.objects.filter(date__gte=start, date__lt=end, status='present'))
+
+    def test_employee_leave_in_a_year(self):
+        self.assertSearches(LeaveApplication.objects.filter(
+            employee_id=1, status='approved', start_date__gte=date(2025, 1, 1), start_date__lt=date(2026, 1, 1)
+        ))
+
+    def test_leave_overlapping_a_period(self):
+        self.assertSearches(LeaveApplication.objects.filter(
+            status='approved', start_date__lte=date(2025, 1, 31), end_date__gte=date(2025, 1, 1)
+        ))
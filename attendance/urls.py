@@ -5,4 +5,5 @@ urlpatterns = [
     path('', views.attendance_view, name='attendance'),
     path('mark/', views.mark_attendance_view, name='mark_attendance'),
     path('submit/', views.submit_attendance, name='submit_attendance'),
+    path('submit/batch/', views.submit_attendance_batch, name='submit_attendance_batch'),
 ]
\ No newline at end of file
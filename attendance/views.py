@@ -4,19 +4,25 @@ from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_POST
 from django.contrib.auth.decorators import login_required
 from .models import AttendanceLog, AttendanceSummary
+from .ingest import ingest_punches, parse_ndjson
+from .bucketing import current_work_date, employee_offset, work_window
+from .periods import attendance_timezone, local_today, on_days
+from .signals import punches_recorded
 from master.models import Employee, Device
-from datetime import date, datetime, time
+from core.media import UploadRejected, media_url, store_chunks
+from django.conf import settings
+from datetime import date
 from django.utils import timezone
 import json
 
 @login_required
 def attendance_view(request):
     """Attendance management page"""
-    today = date.today()
+    today = local_today()
 
     # Get today's attendance logs
     today_logs = AttendanceLog.objects.select_related('employee', 'device').filter(
-        punch_time__date=today
+        **on_days('punch_time', today)
     ).order_by('-punch_time')
 
     # Get today's attendance summary
@@ -69,14 +75,17 @@ def mark_attendance_view(request):
                 date_of_joining=date.today()
             )
 
-        # Check today's attendance
-        today = date.today()
+        # Check today's attendance; a night shift's today started yesterday evening
+        offset = employee_offset(employee.employee_id)
+        today = current_work_date(offset)
         today_attendance = AttendanceSummary.objects.filter(employee=employee, date=today).first()
 
         # Determine if check-in or check-out
+        window_start, window_end = work_window(today, offset=offset)
         last_punch = AttendanceLog.objects.filter(
             employee=employee,
-            punch_time__date=today
+            punch_time__gte=window_start,
+            punch_time__lt=window_end,
         ).order_by('-punch_time').first()
 
         punch_type = 'IN' if not last_punch or last_punch.punch_type == 'OUT' else 'OUT'
@@ -96,7 +105,11 @@ def mark_attendance_view(request):
 @csrf_exempt
 @require_POST
 def submit_attendance(request):
-    """AJAX endpoint for submitting attendance with selfie and geo location"""
+    """AJAX endpoint for submitting attendance with selfie and geo location.
+
+    The day's AttendanceSummary is refreshed by the summary engine
+    (``manage.py refresh_summaries``), not inline per punch.
+    """
     try:
         data = json.loads(request.POST.get('data', '{}'))
         employee_id = data.get('employee_id')
@@ -114,22 +127,15 @@ def submit_attendance(request):
             defaults={'device_type': 'Mobile', 'status': True}
         )
 
-        # Handle selfie upload
+        # Stream the selfie into the media store; processing happens in the media worker
         selfie_url = ''
         if 'selfie' in request.FILES:
             selfie_file = request.FILES['selfie']
-            # Save to media directory
-            import os
-            from django.conf import settings
-            filename = f"selfies/{employee.employee_code}_{timezone.now().strftime('%Y%m%d_%H%M%S')}.jpg"
-            filepath = os.path.join(settings.MEDIA_ROOT, filename)
-            os.makedirs(os.path.dirname(filepath), exist_ok=True)
-
-            with open(filepath, 'wb+') as destination:
-                for chunk in selfie_file.chunks():
-                    destination.write(chunk)
-
-            selfie_url = f"{settings.MEDIA_URL}{filename}"
+            asset = store_chunks(
+                selfie_file.chunks(settings.MEDIA_UPLOAD_CHUNK_SIZE),
+                selfie_file.name, selfie_file.content_type, selfie_file.size
+            )
+            selfie_url = media_url(asset)
 
         # Create attendance log
         attendance_log = AttendanceLog.objects.create(
@@ -142,47 +148,60 @@ def submit_attendance(request):
             selfie_url=selfie_url,
             status='approved'
         )
-
-        # Update or create attendance summary
-        today = date.today()
-        summary, created = AttendanceSummary.objects.get_or_create(
-            employee=employee,
-            date=today,
-            defaults={'status': 'present'}
-        )
-
-        if punch_type == 'IN':
-            summary.in_time = attendance_log.punch_time.time()
-            # Check if late
-            shift_start = time.fromisoformat(employee.shift.start_time)
-            if summary.in_time > shift_start:
-                diff = datetime.combine(today, summary.in_time) - datetime.combine(today, shift_start)
-                summary.late_by = int(diff.total_seconds() / 60)
-        elif punch_type == 'OUT':
-            summary.out_time = attendance_log.punch_time.time()
-            # Calculate total hours
-            if summary.in_time:
-                in_datetime = datetime.combine(today, summary.in_time)
-                out_datetime = datetime.combine(today, summary.out_time)
-                duration = out_datetime - in_datetime
-                summary.total_hours = round(duration.total_seconds() / 3600, 2)
-
-                # Check early out
-                shift_end = time.fromisoformat(employee.shift.end_time)
-                if summary.out_time < shift_end:
-                    diff = datetime.combine(today, shift_end) - datetime.combine(today, summary.out_time)
-                    summary.early_out = int(diff.total_seconds() / 60)
-
-        summary.save()
+        punches_recorded.send(sender=AttendanceLog, employee_ids={employee.employee_id})
 
         return JsonResponse({
             'success': True,
             'message': f'Attendance {punch_type} marked successfully',
-            'punch_time': attendance_log.punch_time.strftime('%H:%M:%S')
+            'punch_time': timezone.localtime(attendance_log.punch_time, attendance_timezone()).strftime('%H:%M:%S')
         })
 
+    except UploadRejected as e:
+        return JsonResponse({
+            'success': False,
+            'message': str(e)
+        }, status=e.status_code)
+
     except Exception as e:
         return JsonResponse({
             'success': False,
             'message': str(e)
         }, status=400)
+
+
+@csrf_exempt
+@require_POST
+def submit_attendance_batch(request):
+    """Bulk endpoint for devices flushing buffered punches.
+
+    Accepts either a JSON object ``{"serial_number": ..., "punches": [...]}``
+    or an ``application/x-ndjson`` body with one punch per line and the device
+    serial number in the query string.
+    """
+    try:
+        if request.content_type == 'application/x-ndjson':
+            punches = parse_ndjson(request.body)
+            serial_number = request.GET.get('serial_number')
+        else:
+            data = json.loads(request.body or b'{}')
+            punches = data.get('punches', [])
+            serial_number = data.get('serial_number') or request.GET.get('serial_number')
+
+        if not isinstance(punches, list):
+            raise ValueError('punches must be a list')
+
+        device = Device.objects.filter(serial_number=serial_number).first()
+        if not device:
+            return JsonResponse({
+                'success': False,
+                'message': f'Unknown device {serial_number!r}'
+            }, status=404)
+
+        result = ingest_punches(device, punches)
+        return JsonResponse({'success': True, **result})
+
+    except ValueError as e:
+        return JsonResponse({
+            'success': False,
+            'message': str(e)
+        }, status=400)
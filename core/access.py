@@ -0,0 +1,199 @@
+"""Role checks for the Django views, from a per-process cache.
+
+A logged-in user's role, employee and department are read in one query
+the first time they are needed and kept in ``access_cache``, keyed by
+user id, so a page no longer pays for request.user.userprofile, its role
+and the Employee lookup on every request. Saving or deleting a User,
+UserProfile, Employee or Role drops the affected entries from every
+cache registered with register_cache(), the FastAPI principal cache
+included; entries also expire after their TTL so writes made by other
+processes are picked up.
+
+Views declare who may see them with role_required(), which also puts the
+user's Employee on the request when the view needs it.
+"""
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from django.contrib import messages
+from django.contrib.auth.decorators import login_required
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.http import JsonResponse
+from django.shortcuts import redirect
+
+from master.models import Employee
+from .models import Role, UserProfile
+
+ACCESS_CACHE_SIZE = 10000
+ACCESS_CACHE_TTL = 300  # seconds
+
+
+class UserCache:
+    """Thread-safe LRU of user_id -> value whose entries expire after ``ttl`` seconds"""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.generation = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires <= time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return value
+
+    def set(self, user_id, value, generation):
+        """Store a value loaded while the cache was at ``generation``.
+
+        An invalidation in the meantime bumps the generation, and the
+        possibly stale value is then dropped instead of cached.
+        """
+        with self._lock:
+            if generation != self.generation:
+                return
+            self._entries[user_id] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id=None):
+        """Forget one user, or everyone when ``user_id`` is None"""
+        with self._lock:
+            self.generation += 1
+            if user_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(user_id, None)
+
+
+class Access:
+    """What the views need to know about a logged-in user"""
+    __slots__ = ('user_id', 'has_profile', 'role', 'employee_id', 'department_id')
+
+    def __init__(self, user_id, has_profile, role, employee_id, department_id):
+        self.user_id = user_id
+        self.has_profile = has_profile
+        self.role = role
+        self.employee_id = employee_id
+        self.department_id = department_id
+
+
+# Every per-user cache the signal receivers below keep in step with the database
+user_caches = []
+
+
+def register_cache(cache):
+    """Have saves and deletes of users, profiles, employees and roles invalidate ``cache``"""
+    user_caches.append(cache)
+    return cache
+
+
+access_cache = register_cache(UserCache(ACCESS_CACHE_SIZE, ACCESS_CACHE_TTL))
+
+
+def load_access(user_id):
+    """Read a user's profile, role, employee and department in a single query"""
+    row = User.objects.filter(pk=user_id).values_list(
+        'userprofile__id', 'userprofile__role__role_name', 'employee__employee_id', 'employee__department_id'
+    ).first()
+    if row is None:
+        return Access(user_id, False, None, None, None)
+    profile_id, role, employee_id, department_id = row
+    return Access(user_id, profile_id is not None, role, employee_id, department_id)
+
+
+def get_access(request):
+    """Access of the request's user, from the cache or loaded once per request"""
+    access = getattr(request, '_access', None)
+    if access is None:
+        user_id = request.user.pk
+        access = access_cache.get(user_id)
+        if access is None:
+            generation = access_cache.generation
+            access = load_access(user_id)
+            access_cache.set(user_id, access, generation)
+        request._access = access
+    return access
+
+
+def linked_employee(request):
+    """The Employee linked to the request's user, with its department, or None"""
+    access = get_access(request)
+    if access.employee_id is None:
+        return None
+    # The user filter keeps an entry cached before a relink from handing out someone else's record
+    return Employee.objects.select_related('department').filter(
+        pk=access.employee_id, user_id=request.user.pk
+    ).first()
+
+
+def role_required(role, employee=False, json=False):
+    """Only let logged-in users with ``role`` through to the view.
+
+    Others are sent to the dashboard, or to the login page when they have
+    no profile, with a message; ``json`` views get an error response
+    instead. With ``employee`` the user's linked Employee is set as
+    ``request.employee``, and users without one are turned away as well.
+    """
+    def decorator(view):
+        @login_required
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            access = get_access(request)
+            if not access.has_profile:
+                if json:
+                    return JsonResponse({'success': False, 'error': 'User profile not found'})
+                messages.error(request, 'User profile not found.')
+                return redirect('login')
+            if access.role != role:
+                if json:
+                    return JsonResponse({'success': False, 'error': 'Access denied'})
+                messages.error(request, f'Access denied. {role} privileges required.')
+                return redirect('dashboard')
+            if employee:
+                request.employee = linked_employee(request)
+                if request.employee is None:
+                    if json:
+                        return JsonResponse({'success': False, 'error': f'{role} profile not found'})
+                    messages.error(request, f'{role} profile not found.')
+                    return redirect('dashboard')
+            return view(request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# === USER CACHE INVALIDATION ===
+
+def invalidate_user_caches(user_id=None):
+    """Forget one user, or everyone when ``user_id`` is None, in every registered cache"""
+    for cache in user_caches:
+        cache.invalidate(user_id)
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_user_access(sender, instance, **kwargs):
+    invalidate_user_caches(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=UserProfile)
+def invalidate_profile_access(sender, instance, **kwargs):
+    invalidate_user_caches(instance.user_id)
+
+
+@receiver([post_save, post_delete], sender=Employee)
+@receiver([post_save, post_delete], sender=Role)
+def invalidate_all_access(sender, instance, **kwargs):
+    # An employee can move between users and a role rename affects every holder
+    invalidate_user_caches()
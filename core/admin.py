@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Role, UserProfile, ActivityLog
+from .models import Role, UserProfile, ActivityLog, QueryReport
 
 @admin.register(Role)
 class RoleAdmin(admin.ModelAdmin):
@@ -17,3 +17,11 @@ class ActivityLogAdmin(admin.ModelAdmin):
     list_display = ('log_id', 'user', 'action', 'timestamp', 'ip_address')
     list_filter = ('timestamp',)
     search_fields = ('user__username', 'action')
+
+@admin.register(QueryReport)
+class QueryReportAdmin(admin.ModelAdmin):
+    list_display = ('kind', 'method', 'route', 'worst_count', 'worst_ms', 'occurrences', 'last_seen')
+    list_filter = ('kind', 'stack')
+    search_fields = ('route', 'fingerprint')
+    readonly_fields = [field.name for field in QueryReport._meta.fields]
+    ordering = ('-worst_count', '-worst_ms')
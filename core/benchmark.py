@@ -0,0 +1,265 @@
+"""Scripted load against the Django views and FastAPI endpoints.
+
+A scenario is a list of Steps, each a batch of prepared requests for one
+page or endpoint. Requests go through httpx's ASGI transport into the
+application uvicorn serves (hexaattendanceportal.asgi), so routing,
+middleware, sessions and JWT authentication all take part, just without
+sockets. The employee, manager and admin API routers, which the site
+does not mount, are served by a second FastAPI app with the same metrics
+middleware, the sync and async attendance routers side by side.
+
+For each step the runner records latency quantiles, throughput and
+response statuses, plus queries and database time per request from the
+request metrics registry. Everything that needs the database to set up
+a step (logins, punch batches, draft payroll runs) happens before the
+timed part.
+"""
+import asyncio
+import os
+import sys
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db.models import Count
+from django.test import Client
+from django.utils import timezone
+
+from hexaattendanceportal.metrics import ASGIMetricsMiddleware, quantiles, registry
+from master.models import Device, Employee
+from payroll.models import PayrollPeriod, PayrollRun
+
+# Untimed requests sent first by read-only steps, to fill caches and open connections
+WARMUP = 2
+PUNCH_BATCH = 100
+PAYROLL_RUNS = 3
+EMPLOYEE_LOGINS = 20
+
+
+class Step:
+    """Requests for one page or endpoint: (method, path, httpx keyword arguments) each"""
+
+    def __init__(self, scenario, name, app, requests, expect=200, warmup=0):
+        self.scenario = scenario
+        self.name = name
+        self.app = app
+        self.requests = requests
+        self.expect = expect
+        self.warmup = warmup
+
+
+class Cast:
+    """Who the scripted requests are made as, with a session cookie and bearer token each"""
+
+    def __init__(self):
+        self.admin = User.objects.filter(userprofile__role__role_name='Admin', is_active=True).order_by('id').first()
+        manager = Employee.objects.filter(user__isnull=False, status=True).annotate(
+            team=Count('subordinates')
+        ).order_by('-team', 'employee_id').first()
+        self.manager = manager.user if manager else None
+        self.employees = list(User.objects.filter(
+            userprofile__role__role_name='Employee', employee__status=True, is_active=True
+        ).order_by('id')[:EMPLOYEE_LOGINS])
+        if not (self.admin and self.manager and self.employees):
+            raise ValueError('The database needs an admin, a manager and employees with logins')
+        self.employee_codes = list(
+            Employee.objects.filter(status=True).order_by('employee_id').values_list('employee_code', flat=True)
+        )
+        self.device = Device.objects.order_by('device_id').values_list('serial_number', flat=True).first()
+        self._headers = {}
+
+    def headers(self, user):
+        if user.pk not in self._headers:
+            from fastapi_api.auth import create_access_token, token_claims
+
+            client = Client()
+            client.force_login(user)
+            session = client.cookies[settings.SESSION_COOKIE_NAME].value
+            token = create_access_token(token_claims(user), timedelta(hours=12))
+            self._headers[user.pk] = {
+                'Cookie': f'{settings.SESSION_COOKIE_NAME}={session}',
+                'Authorization': f'Bearer {token}',
+            }
+        return self._headers[user.pk]
+
+
+def _gets(cast, count, user, path):
+    return [('GET', path, {'headers': cast.headers(user)})] * (count + WARMUP)
+
+
+def _read_steps(scenario, cast, count, pages):
+    """Warmed-up GET steps from (name, app, user, path) tuples"""
+    return [Step(scenario, name, app, _gets(cast, count, user, path), warmup=WARMUP) for name, app, user, path in pages]
+
+
+def punch_steps(cast, count):
+    """Bursts of device batches through both stacks, and single punches from the employee API"""
+    now = timezone.now()
+    sequence = iter(range(2 * count * PUNCH_BATCH))
+
+    def batch():
+        # Distinct times, so no punch is reported as a duplicate of an earlier one
+        return [
+            {
+                'employee_code': cast.employee_codes[index % len(cast.employee_codes)],
+                'punch_type': 'IN' if index % 2 else 'OUT',
+                'punch_time': (now - timedelta(milliseconds=index)).isoformat(),
+            }
+            for index in (next(sequence) for _ in range(PUNCH_BATCH))
+        ]
+
+    employees = cast.employees
+    return [
+        Step('punches', f'device batch of {PUNCH_BATCH} (FastAPI)', 'site', [
+            ('POST', f'/api/devices/{cast.device}/punches', {'json': batch()}) for _ in range(count)
+        ]),
+        Step('punches', f'device batch of {PUNCH_BATCH} (Django)', 'site', [
+            ('POST', '/attendance/submit/batch/', {'json': {'serial_number': cast.device, 'punches': batch()}})
+            for _ in range(count)
+        ]),
+        Step('punches', 'employee mark (async API)', 'api', [
+            ('POST', '/async/employee/attendance/mark', {
+                'data': {'punch_type': 'IN'}, 'headers': cast.headers(employees[index % len(employees)]),
+            })
+            for index in range(count)
+        ]),
+    ]
+
+
+def dashboard_steps(cast, count):
+    employee = cast.employees[0]
+    return _read_steps('dashboards', cast, count, [
+        ('admin dashboard', 'site', cast.admin, '/admin/'),
+        ('manager dashboard', 'site', cast.manager, '/manager/'),
+        ('employee dashboard', 'site', employee, '/employee/'),
+        ('attendance today', 'site', cast.admin, '/attendance/'),
+        ('admin dashboard (async API)', 'api', cast.admin, '/async/admin/dashboard'),
+        ('manager dashboard (async API)', 'api', cast.manager, '/async/manager/dashboard'),
+        ('employee today (sync API)', 'api', employee, '/sync/employee/attendance/today'),
+        ('employee today (async API)', 'api', employee, '/async/employee/attendance/today'),
+    ])
+
+
+def report_steps(cast, count):
+    return _read_steps('reports', cast, count, [
+        ('reports page', 'site', cast.admin, '/reports/'),
+        ('attendance CSV', 'site', cast.admin, '/reports/export/csv/'),
+        ('month of punches CSV', 'site', cast.admin, '/reports/export/punches/csv/'),
+        ('company overview (API)', 'api', cast.admin, '/admin/attendance/overview'),
+        ('attendance logs page (API)', 'api', cast.admin, '/admin/attendance/logs?limit=100'),
+        ('team overview (API)', 'api', cast.manager, '/manager/attendance/overview'),
+    ])
+
+
+def payroll_steps(cast, count):
+    """Payroll pages, and processing fresh draft runs of the latest period for every employee"""
+    steps = _read_steps('payroll', cast, count, [
+        ('payroll dashboard', 'site', cast.admin, '/payroll/'),
+        ('payslips', 'site', cast.admin, '/payroll/payslips/'),
+    ])
+    period = PayrollPeriod.objects.order_by('-start_date').first()
+    if period is not None:
+        headers = cast.headers(cast.admin)
+        runs = [PayrollRun.objects.create(period=period) for _ in range(min(count, PAYROLL_RUNS))]
+        steps.append(Step('payroll', 'process payroll run', 'site', [
+            ('GET', f'/payroll/payroll-runs/{run.run_id}/process/', {'headers': headers}) for run in runs
+        ], expect=302))
+    return steps
+
+
+SCENARIOS = {
+    'punches': punch_steps,
+    'dashboards': dashboard_steps,
+    'reports': report_steps,
+    'payroll': payroll_steps,
+}
+
+
+def build_api():
+    """The API routers the site does not mount, served like the site's own routers"""
+    from fastapi import FastAPI
+    from fastapi_api.routers import admin, async_attendance, employee_attendance, manager
+
+    app = FastAPI()
+    app.add_middleware(ASGIMetricsMiddleware)
+    app.include_router(admin.router)
+    app.include_router(manager.router)
+    app.include_router(employee_attendance.router, prefix='/sync')
+    app.include_router(async_attendance.router, prefix='/async')
+    return app
+
+
+async def run_step(http, step, clients):
+    """Send a step's requests from ``clients`` concurrent clients; returns its result dict"""
+    for method, path, kwargs in step.requests[:step.warmup]:
+        await http.request(method, path, **kwargs)
+
+    latencies = []
+    statuses = {}
+    pending = iter(step.requests[step.warmup:])
+
+    async def client():
+        for method, path, kwargs in pending:
+            started = time.perf_counter()
+            response = await http.request(method, path, **kwargs)
+            latencies.append(time.perf_counter() - started)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    requests_before, queries_before, db_before = registry.totals()
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(clients)))
+    elapsed = time.perf_counter() - started
+    requests, queries, db_seconds = (
+        after - before for after, before in zip(registry.totals(), (requests_before, queries_before, db_before))
+    )
+
+    count = len(latencies)
+    return {
+        'scenario': step.scenario,
+        'step': step.name,
+        'method': step.requests[0][0],
+        'path': step.requests[0][1],
+        'requests': count,
+        'clients': clients,
+        'errors': count - statuses.get(step.expect, 0),
+        'statuses': {str(status): total for status, total in sorted(statuses.items())},
+        'latency_ms': {
+            'mean': round(sum(latencies) / count * 1000, 2),
+            **{f'p{round(q * 100)}': round(value * 1000, 2) for q, value in quantiles(latencies)},
+            'max': round(max(latencies) * 1000, 2),
+        },
+        'requests_per_second': round(count / elapsed, 1),
+        'queries_per_request': round(queries / requests, 1) if requests else None,
+        'db_ms_per_request': round(db_seconds / requests * 1000, 2) if requests else None,
+    }
+
+
+async def run_steps(steps, clients):
+    import httpx
+    from database import get_async_engine
+    from hexaattendanceportal.asgi import application
+
+    apps = {'site': application, 'api': build_api()}
+    results = []
+    try:
+        for step in steps:
+            if not step.requests:
+                continue
+            transport = httpx.ASGITransport(app=apps[step.app])
+            async with httpx.AsyncClient(transport=transport, base_url='http://localhost', timeout=None) as http:
+                results.append(await run_step(http, step, clients))
+    finally:
+        # Close pooled aiosqlite connections, whose worker threads would keep the process alive
+        await get_async_engine().dispose()
+    return results
+
+
+def run(scenarios, requests=50, clients=10):
+    """Result dicts for every step of the named scenarios, in order"""
+    # The routers import their siblings as top-level modules
+    sys.path.append(os.path.join(settings.BASE_DIR, 'fastapi_api'))
+    cast = Cast()
+    steps = [step for name in scenarios for step in SCENARIOS[name](cast, requests)]
+    # One event loop for every step: pooled async connections belong to the loop that opened them
+    return asyncio.run(run_steps(steps, clients))
@@ -0,0 +1,82 @@
+"""Resized, recompressed copies of stored selfies.
+
+Pages and API lists should never load a full-resolution camera image.
+The media worker writes a copy of every asset at each size in SIZES,
+under ``derivatives/<size>/`` in the content-addressed store, keyed by the
+original's hash, and records the names on
+MediaAsset.derivatives. Views and API responses map stored URLs to a
+size with sized_urls(), which falls back to the original while an asset
+is still queued or could not be decoded.
+"""
+import os
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+
+from .models import MediaAsset
+
+# Longest edge in pixels of each derivative
+SIZES = {
+    'thumb': 160,
+    'medium': 640,
+}
+QUALITY = 75
+
+
+def output_format():
+    """WebP where Pillow was built with it, JPEG otherwise"""
+    from PIL import features
+
+    return ('WEBP', '.webp') if features.check('webp') else ('JPEG', '.jpg')
+
+
+def generate_derivatives(asset, path):
+    """Media worker step: write every size in SIZES for ``asset``"""
+    from PIL import Image, ImageOps
+
+    image_format, extension = output_format()
+    with Image.open(path) as original:
+        # Phone cameras store rotation in EXIF; bake it in before EXIF is dropped
+        image = ImageOps.exif_transpose(original).convert('RGB')
+    derivatives = {}
+    for size, edge in SIZES.items():
+        copy = image.copy()
+        copy.thumbnail((edge, edge))
+        temporary = default_storage.temporary_file()
+        try:
+            copy.save(temporary, image_format, quality=QUALITY, optimize=True)
+            derivatives[size] = default_storage.commit(
+                temporary, f'derivatives/{size}/{asset.sha256}{extension}', asset.sha256
+            )
+        finally:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+    asset.derivatives = derivatives
+
+
+def storage_name(url):
+    """Storage name of a URL under MEDIA_URL"""
+    return url[len(settings.MEDIA_URL):]
+
+
+def content_hash(name):
+    """Uploads are stored as <sha256>.<ext>; the hash is the file name"""
+    return os.path.splitext(os.path.basename(name))[0]
+
+
+def sized_urls(urls, size):
+    """Map each media URL to its URL at ``size``, with one query.
+
+    URLs without a derivative (blank, outside MEDIA_URL, not processed
+    yet) map to themselves.
+    """
+    names = {url: storage_name(url) for url in urls if url and url.startswith(settings.MEDIA_URL)}
+    derivatives = dict(MediaAsset.objects.filter(
+        sha256__in={content_hash(name) for name in names.values()}
+    ).values_list('sha256', 'derivatives'))
+    sized = {url: url for url in urls}
+    for url, name in names.items():
+        derivative = derivatives.get(content_hash(name), {}).get(size)
+        if derivative:
+            sized[url] = default_storage.url(derivative)
+    return sized
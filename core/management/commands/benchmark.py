@@ -0,0 +1,103 @@
+import json
+import os
+import platform
+import sqlite3
+import subprocess
+import time
+
+import django
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.utils import timezone
+
+from core.benchmark import SCENARIOS, run
+from core.synthetic import dataset_counts, generate
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = 'Generate a synthetic dataset in a separate SQLite database, run scripted scenarios against it and write the results as JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--employees', type=int, default=200, help='Employees to generate')
+        parser.add_argument('--days', type=int, default=365, help='Days of history to generate, ending today')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--scenarios', default=','.join(SCENARIOS), help='Comma-separated: ' + ', '.join(SCENARIOS))
+        parser.add_argument('--requests', type=int, default=50, help='Timed requests per step')
+        parser.add_argument('--clients', type=int, default=10, help='Concurrent clients')
+        parser.add_argument('--database', default=settings.BENCHMARK_DATABASE, help='SQLite file to generate the data in')
+        parser.add_argument('--reuse', action='store_true', help='Keep an existing benchmark database instead of regenerating it')
+        parser.add_argument('--output', default='benchmark-results.json', help='JSON results file')
+
+    def handle(self, *args, **options):
+        names = options['scenarios'].split(',')
+        for name in names:
+            if name not in SCENARIOS:
+                raise CommandError(f'Unknown scenario {name!r}')
+        database = settings.DATABASES['default']
+        if database['ENGINE'] != 'django.db.backends.sqlite3':
+            raise CommandError('Benchmarks run against SQLite only')
+
+        # Both stacks read the default database settings, Django per connection and SQLAlchemy
+        # when fastapi_api.database is first imported, which core.benchmark leaves until the run
+        path = os.path.abspath(options['database'])
+        connections['default'].close()
+        database['NAME'] = path
+        if not options['reuse']:
+            for suffix in ('', '-wal', '-shm'):
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
+        fresh = not os.path.exists(path)
+        call_command('migrate', verbosity=0, interactive=False)
+
+        generation = None
+        if fresh:
+            self.stdout.write(f"Generating {options['employees']} employees x {options['days']} days in {path}")
+            started = time.perf_counter()
+            written = generate(options['employees'], options['days'], options['seed'])
+            generation = round(time.perf_counter() - started, 2)
+            self.stdout.write(', '.join(f'{count} {kind}' for kind, count in written.items()) + f' in {generation}s')
+
+        started_at = timezone.now()
+        try:
+            results = run(names, options['requests'], options['clients'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(
+            f"{'scenario':<11} {'step':<36} {'p50 (ms)':>9} {'p95 (ms)':>9} {'req/s':>7} {'queries':>8} {'errors':>6}"
+        )
+        for result in results:
+            self.stdout.write(
+                f"{result['scenario']:<11} {result['step']:<36} {result['latency_ms']['p50']:>9.1f} "
+                f"{result['latency_ms']['p95']:>9.1f} {result['requests_per_second']:>7.1f} "
+                f"{result['queries_per_request'] if result['queries_per_request'] is not None else '-':>8} {result['errors']:>6}"
+            )
+
+        payload = {
+            'started_at': started_at.isoformat(),
+            'git_commit': git_commit(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'debug': settings.DEBUG,
+            'options': {
+                key: options[key] for key in ('employees', 'days', 'seed', 'requests', 'clients', 'reuse')
+            } | {'scenarios': names},
+            'dataset': {**dataset_counts(), 'generation_seconds': generation},
+            'results': results,
+        }
+        with open(options['output'], 'w') as output:
+            json.dump(payload, output, indent=2)
+            output.write('\n')
+        self.stdout.write(f"Wrote {len(results)} results to {options['output']}")
@@ -0,0 +1,77 @@
+from time import perf_counter
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core.models import Role, UserProfile
+from core.synthetic import PASSWORD, generate
+from settings.models import AttendanceRule, CompanyProfile, WorkWeek
+
+# (username, first name, last name, role, profile employee id) of the demo logins
+DEMO_USERS = [
+    ('admin', 'Admin', 'User', 'Admin', 'ADM001'),
+    ('manager1', 'Manager', 'One', 'Manager', 'MGR001'),
+    ('hr1', 'HR', 'One', 'HR', 'HR001'),
+]
+WORKING_DAYS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday']
+WEEKEND = ['saturday', 'sunday']
+# Seconds between punch progress lines
+PROGRESS_INTERVAL = 5
+
+
+def create_site_settings():
+    CompanyProfile.objects.get_or_create(name='HexaHash Technologies', defaults={
+        'address': '123 Tech Street, Silicon Valley, CA 94043',
+        'contact_email': 'info@hexahash.com',
+        'logo_url': 'https://example.com/logo.png',
+    })
+    AttendanceRule.objects.get_or_create(rule_name='Standard Rule', defaults={'grace_minutes': 15, 'rounding_policy': 'nearest_15'})
+    for day in WORKING_DAYS + WEEKEND:
+        WorkWeek.objects.get_or_create(day=day, defaults={'is_working_day': day in WORKING_DAYS})
+
+
+def create_demo_users():
+    for username, first_name, last_name, role_name, employee_id in DEMO_USERS:
+        user, created = User.objects.get_or_create(username=username, defaults={
+            'email': f'{username}@company.com', 'first_name': first_name, 'last_name': last_name, 'is_staff': True,
+        })
+        if created:
+            user.set_password(PASSWORD)
+            user.save()
+        UserProfile.objects.get_or_create(user=user, defaults={
+            'role': Role.objects.get(role_name=role_name), 'employee_id': employee_id,
+        })
+
+
+class Command(BaseCommand):
+    help = 'Fill the database with synthetic employees, punches, leave and payroll, plus the demo logins'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--employees', type=int, default=100, help='Employees to generate')
+        parser.add_argument('--days', type=int, default=90, help='Days of history to generate, ending today')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        if options['employees'] < 1 or options['days'] < 1:
+            raise CommandError('--employees and --days must be at least 1')
+        last_report = [perf_counter()]
+
+        def progress(stage, rows, seconds, done):
+            if not done and perf_counter() - last_report[0] < PROGRESS_INTERVAL:
+                return
+            last_report[0] = perf_counter()
+            rate = f'{rows / seconds:,.0f} rows/s' if seconds else '-'
+            self.stdout.write(f"{stage:<20} {rows:>12,} rows {seconds:>8.1f}s {rate:>16}{'' if done else ' ...'}")
+
+        # Work weeks decide which days get punches, so they go in first
+        with transaction.atomic():
+            create_site_settings()
+        started = perf_counter()
+        written = generate(options['employees'], options['days'], options['seed'], progress=progress)
+        with transaction.atomic():
+            create_demo_users()
+        self.stdout.write(self.style.SUCCESS(
+            ', '.join(f'{count:,} {kind}' for kind, count in written.items()) + f' in {perf_counter() - started:.1f}s'
+        ))
+        self.stdout.write(f"Log in as {', '.join(username for username, *_ in DEMO_USERS)} with password {PASSWORD}")
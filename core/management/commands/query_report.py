@@ -0,0 +1,31 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from core.models import QueryReport
+from core.querywatch import report_rows
+
+
+class Command(BaseCommand):
+    help = 'Dump repeated (N+1) and slow statement reports as JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--kind', choices=['repeated', 'slow'], help='Only one kind of report')
+        parser.add_argument('--output', help='Write to this file instead of stdout')
+        parser.add_argument('--clear', action='store_true', help='Delete the reports after dumping them')
+
+    def handle(self, *args, **options):
+        rows = report_rows(options['kind'])
+        payload = json.dumps(rows, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                output.write(payload + '\n')
+            self.stdout.write(f"Wrote {len(rows)} reports to {options['output']}")
+        else:
+            self.stdout.write(payload)
+
+        if options['clear']:
+            reports = QueryReport.objects.all()
+            if options['kind']:
+                reports = reports.filter(kind=options['kind'])
+            reports.delete()
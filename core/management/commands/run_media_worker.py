@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from core.media import claim_next_asset, process_asset, requeue_stale_assets
+
+
+class Command(BaseCommand):
+    help = 'Process newly uploaded media assets (inspection and derivatives)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Drain the queue once and exit')
+        parser.add_argument('--interval', type=float, default=2.0, help='Seconds to sleep when the queue is empty')
+        parser.add_argument('--stale-after', type=int, default=10 * 60, help='Requeue assets processing longer than this many seconds')
+
+    def handle(self, *args, **options):
+        while True:
+            requeue_stale_assets(options['stale_after'])
+
+            asset = claim_next_asset()
+            while asset:
+                started = time.perf_counter()
+                process_asset(asset)
+                self.stdout.write(f'Asset {asset.asset_id} {asset.status} in {time.perf_counter() - started:.2f}s')
+                asset = claim_next_asset()
+
+            if options['once']:
+                break
+            close_old_connections()
+            time.sleep(options['interval'])
@@ -0,0 +1,219 @@
+"""Streaming ingestion for uploaded selfies.
+
+An upload is copied to a temporary file in MEDIA_UPLOAD_CHUNK_SIZE pieces
+while its SHA-256 is computed, and rejected as soon as it passes
+MEDIA_UPLOAD_MAX_BYTES, so memory per upload stays at one chunk whatever
+the image size. The finished file is committed to the content-addressed
+default storage: identical uploads share one file and one MediaAsset row.
+
+Nothing slow happens in the request. New assets are queued and the media
+worker (``manage.py run_media_worker``) runs PROCESSORS over them.
+"""
+import base64
+import hashlib
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import IntegrityError
+from django.utils import timezone
+
+from .derivatives import generate_derivatives
+from .models import MediaAsset
+
+IMAGE_TYPES = {
+    '.jpg': 'image/jpeg',
+    '.png': 'image/png',
+    '.webp': 'image/webp',
+}
+EXTENSION_ALIASES = {'.jpeg': '.jpg'}
+
+
+class UploadRejected(ValueError):
+    """An upload that is not an accepted image"""
+    status_code = 400
+
+
+class UploadTooLarge(UploadRejected):
+    status_code = 413
+
+    def __init__(self):
+        super().__init__(f'Upload exceeds {settings.MEDIA_UPLOAD_MAX_BYTES} bytes')
+
+
+def image_extension(filename=None, content_type=None):
+    """Normalised extension for an image upload, from its filename or else its content type"""
+    extension = os.path.splitext(filename or '')[1].lower()
+    extension = EXTENSION_ALIASES.get(extension, extension)
+    if extension in IMAGE_TYPES:
+        return extension
+    for known, known_type in IMAGE_TYPES.items():
+        if content_type == known_type:
+            return known
+    raise UploadRejected('Only JPEG, PNG and WebP images are accepted')
+
+
+def check_size(size):
+    """Reject an upload up front when its declared size is already over the limit"""
+    if size is not None and size > settings.MEDIA_UPLOAD_MAX_BYTES:
+        raise UploadTooLarge()
+
+
+class Digest:
+    """Running SHA-256 and byte count of an upload, enforcing the size limit"""
+
+    def __init__(self):
+        self.hash = hashlib.sha256()
+        self.size = 0
+
+    def update(self, chunk):
+        self.size += len(chunk)
+        if self.size > settings.MEDIA_UPLOAD_MAX_BYTES:
+            raise UploadTooLarge()
+        self.hash.update(chunk)
+
+
+def commit_spool(path, digest, extension, subdir):
+    """Move a fully written spool file into place and return its MediaAsset.
+
+    Content already on disk is reused and the spool file dropped.
+    """
+    sha256 = digest.hash.hexdigest()
+    existing = MediaAsset.objects.filter(sha256=sha256).first()
+    if existing and default_storage.exists(existing.name):
+        os.remove(path)
+        return existing
+
+    name = default_storage.commit(path, f'{subdir}/{sha256}{extension}', sha256)
+    if existing:
+        # The row outlived its file; point it at the restored copy
+        existing.name = name
+        existing.save(update_fields=['name'])
+        return existing
+    try:
+        return MediaAsset.objects.create(
+            sha256=sha256, name=name, size=digest.size, content_type=IMAGE_TYPES[extension]
+        )
+    except IntegrityError:
+        # A concurrent upload of the same content won the insert
+        return MediaAsset.objects.get(sha256=sha256)
+
+
+def store_chunks(chunks, filename=None, content_type=None, size=None, subdir='selfies'):
+    """Stream an iterable of byte chunks into the media store; returns the MediaAsset"""
+    check_size(size)
+    extension = image_extension(filename, content_type)
+    path = default_storage.temporary_file()
+    digest = Digest()
+    try:
+        with open(path, 'wb') as spool:
+            for chunk in chunks:
+                digest.update(chunk)
+                spool.write(chunk)
+        return commit_spool(path, digest, extension, subdir)
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def read_chunks(file, chunk_size=None):
+    """Fixed-size chunks of a binary file object"""
+    chunk_size = chunk_size or settings.MEDIA_UPLOAD_CHUNK_SIZE
+    return iter(lambda: file.read(chunk_size), b'')
+
+
+def data_url_chunks(payload, chunk_size=None):
+    """Decode base64 text a slice at a time rather than into one large bytes object"""
+    # Four base64 characters decode to three bytes, so slices must be multiples of four
+    step = (chunk_size or settings.MEDIA_UPLOAD_CHUNK_SIZE) // 3 * 4
+    for start in range(0, len(payload), step):
+        yield base64.b64decode(payload[start:start + step])
+
+
+def store_data_url(data_url, subdir='selfies'):
+    """Store a ``data:image/...;base64,...`` URL, as sent by in-browser cameras"""
+    header, _, payload = data_url.partition(',')
+    if not header.startswith('data:image/') or not header.endswith(';base64'):
+        raise UploadRejected('Expected a base64 image data URL')
+    check_size(len(payload) * 3 // 4)
+    content_type = header[len('data:'):-len(';base64')]
+    return store_chunks(data_url_chunks(payload), content_type=content_type, subdir=subdir)
+
+
+async def store_upload(upload, subdir='selfies'):
+    """Async store_chunks() for a FastAPI UploadFile.
+
+    Reads and writes are awaited chunk by chunk; only the final rename and
+    the MediaAsset insert run in a worker thread.
+    """
+    import anyio
+
+    check_size(upload.size)
+    extension = image_extension(upload.filename, upload.content_type)
+    path = await anyio.to_thread.run_sync(default_storage.temporary_file)
+    digest = Digest()
+    try:
+        async with await anyio.open_file(path, 'wb') as spool:
+            while chunk := await upload.read(settings.MEDIA_UPLOAD_CHUNK_SIZE):
+                digest.update(chunk)
+                await spool.write(chunk)
+        return await anyio.to_thread.run_sync(commit_spool, path, digest, extension, subdir)
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def media_url(asset):
+    return default_storage.url(asset.name)
+
+
+# === MEDIA WORKER ===
+
+def inspect_image(asset, path):
+    """Record the image dimensions; fails the asset if Pillow cannot read it"""
+    from PIL import Image
+
+    with Image.open(path) as image:
+        asset.width, asset.height = image.size
+        image.verify()
+
+
+# Steps the media worker runs over every new asset, in order
+PROCESSORS = [inspect_image, generate_derivatives]
+
+
+def claim_next_asset():
+    """Atomically move the oldest queued asset to processing; None when the queue is empty"""
+    while True:
+        asset_id = MediaAsset.objects.filter(status='queued').order_by('asset_id').values_list('asset_id', flat=True).first()
+        if asset_id is None:
+            return None
+        claimed = MediaAsset.objects.filter(asset_id=asset_id, status='queued').update(
+            status='processing', started_at=timezone.now()
+        )
+        if claimed:
+            return MediaAsset.objects.get(asset_id=asset_id)
+
+
+def process_asset(asset):
+    """Run every processor over a claimed asset and record the outcome"""
+    path = default_storage.path(asset.name)
+    try:
+        for processor in PROCESSORS:
+            processor(asset, path)
+    except Exception as e:
+        asset.status = 'failed'
+        asset.error = f'{type(e).__name__}: {e}'
+    else:
+        asset.status = 'done'
+        asset.error = ''
+    asset.processed_at = timezone.now()
+    asset.save()
+    return asset
+
+
+def requeue_stale_assets(timeout):
+    """Put back assets whose worker died mid-run (processing for longer than ``timeout`` seconds)"""
+    cutoff = timezone.now() - timedelta(seconds=timeout)
+    return MediaAsset.objects.filter(status='processing', started_at__lt=cutoff).update(status='queued', started_at=None)
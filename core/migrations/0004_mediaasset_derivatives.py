@@ -0,0 +1,18 @@
+# Generated by Django 5.1.2 on 2026-10-18 13:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_mediaasset'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mediaasset',
+            name='derivatives',
+            field=models.JSONField(blank=True, default=dict, help_text='Storage name of each resized copy, by size'),
+        ),
+    ]
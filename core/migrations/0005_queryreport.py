@@ -0,0 +1,35 @@
+# Generated by Django 5.1.2 on 2026-10-18 13:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_mediaasset_derivatives'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QueryReport',
+            fields=[
+                ('report_id', models.AutoField(primary_key=True, serialize=False)),
+                ('kind', models.CharField(choices=[('repeated', 'Repeated in one request'), ('slow', 'Slow statement')], max_length=20)),
+                ('stack', models.CharField(max_length=20)),
+                ('method', models.CharField(max_length=10)),
+                ('route', models.CharField(max_length=255)),
+                ('fingerprint_hash', models.CharField(max_length=40)),
+                ('fingerprint', models.TextField(help_text='Statement with literals and parameters replaced by ?')),
+                ('example', models.TextField(blank=True)),
+                ('explain', models.TextField(blank=True)),
+                ('occurrences', models.PositiveIntegerField(default=1, help_text='Requests in which it was flagged')),
+                ('worst_count', models.PositiveIntegerField(default=0, help_text='Most executions in one request')),
+                ('worst_ms', models.FloatField(default=0, help_text='Slowest execution, or most total time for repeats')),
+                ('first_seen', models.DateTimeField(auto_now_add=True)),
+                ('last_seen', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('kind', 'stack', 'method', 'route', 'fingerprint_hash'), name='queryreport_unique')],
+            },
+        ),
+    ]
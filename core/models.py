@@ -32,3 +32,58 @@ class ActivityLog(models.Model):
 
     def __str__(self):
         return f"{self.user.username} - {self.action} at {self.timestamp}"
+
+class MediaAsset(models.Model):
+    """One stored upload, keyed by content hash; also the media worker's queue"""
+    asset_id = models.AutoField(primary_key=True)
+    sha256 = models.CharField(max_length=64, unique=True)
+    name = models.CharField(max_length=255, help_text="Storage name under MEDIA_ROOT")
+    size = models.BigIntegerField()
+    content_type = models.CharField(max_length=100, blank=True)
+    width = models.PositiveIntegerField(null=True, blank=True)
+    height = models.PositiveIntegerField(null=True, blank=True)
+    derivatives = models.JSONField(default=dict, blank=True, help_text="Storage name of each resized copy, by size")
+    status = models.CharField(max_length=20, choices=[
+        ('queued', 'Queued'),
+        ('processing', 'Processing'),
+        ('done', 'Done'),
+        ('failed', 'Failed')
+    ], default='queued')
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'asset_id'], name='media_status_idx')]
+
+    def __str__(self):
+        return f"{self.name} ({self.status})"
+
+class QueryReport(models.Model):
+    """A repeated (N+1) or slow statement seen on a route, one row per fingerprint"""
+    report_id = models.AutoField(primary_key=True)
+    kind = models.CharField(max_length=20, choices=[
+        ('repeated', 'Repeated in one request'),
+        ('slow', 'Slow statement')
+    ])
+    stack = models.CharField(max_length=20)
+    method = models.CharField(max_length=10)
+    route = models.CharField(max_length=255)
+    fingerprint_hash = models.CharField(max_length=40)
+    fingerprint = models.TextField(help_text="Statement with literals and parameters replaced by ?")
+    example = models.TextField(blank=True)
+    explain = models.TextField(blank=True)
+    occurrences = models.PositiveIntegerField(default=1, help_text="Requests in which it was flagged")
+    worst_count = models.PositiveIntegerField(default=0, help_text="Most executions in one request")
+    worst_ms = models.FloatField(default=0, help_text="Slowest execution, or most total time for repeats")
+    first_seen = models.DateTimeField(auto_now_add=True)
+    last_seen = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'stack', 'method', 'route', 'fingerprint_hash'], name='queryreport_unique')
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.method} {self.route}: {self.fingerprint[:80]}"
@@ -0,0 +1,164 @@
+"""Per-request query fingerprinting: N+1 patterns and slow statements.
+
+A sampled request (QUERY_TRACE_SAMPLE_RATE; every request with DEBUG on)
+carries a QueryTrace that the metrics hooks in hexaattendanceportal.metrics
+feed with each statement: Django's execute wrapper and SQLAlchemy's
+cursor events both end up in QueryTrace.record(). Statements are reduced
+to fingerprints, with literals, parameters and IN lists collapsed, so a
+loop issuing the same query per row shows up as one fingerprint with a
+high count.
+
+When the request ends, any fingerprint run more than
+QUERY_REPEAT_THRESHOLD times and any statement slower than SLOW_QUERY_MS
+is logged, slow SELECTs together with their EXPLAIN plan, and recorded
+as a QueryReport: one row per route and fingerprint, browsable in the
+admin and dumped with ``manage.py query_report``.
+"""
+import hashlib
+import logging
+import random
+import re
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import QueryReport
+
+logger = logging.getLogger(__name__)
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_PLACEHOLDER = re.compile(r"%\(\w+\)s|%s|\?|\$\d+|(?<!:):\w+")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_SPACE = re.compile(r'\s+')
+
+
+def fingerprint(sql):
+    """``sql`` with literals and parameters as ``?`` and IN lists as ``(...)``"""
+    sql = _STRING.sub('?', sql)
+    sql = _PLACEHOLDER.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _LIST.sub('(...)', sql)
+    return _SPACE.sub(' ', sql).strip()
+
+
+def start_trace():
+    """A QueryTrace for a request picked by sampling, else None"""
+    if random.random() < settings.QUERY_TRACE_SAMPLE_RATE:
+        return QueryTrace()
+    return None
+
+
+def explain(sql, params, source):
+    """Query plan of a SELECT, run on Django's connection to the shared database.
+
+    SQLAlchemy statements use the driver's own parameter style, so they go
+    to the raw DB-API connection rather than through Django's cursor.
+    """
+    if not sql.lstrip().upper().startswith(('SELECT', 'WITH')):
+        return ''
+    prefix = 'EXPLAIN QUERY PLAN ' if connection.vendor == 'sqlite' else 'EXPLAIN '
+    try:
+        if source == 'django':
+            cursor = connection.cursor()
+        else:
+            connection.ensure_connection()
+            cursor = connection.connection.cursor()
+        try:
+            cursor.execute(prefix + sql, params or ())
+            return '\n'.join(' '.join(str(column) for column in row) for row in cursor.fetchall())
+        finally:
+            cursor.close()
+    except Exception as e:
+        return f'EXPLAIN failed: {e}'
+
+
+class QueryTrace:
+    """Statements of one request, grouped by fingerprint"""
+
+    def __init__(self):
+        self.fingerprints = {}
+        # Slowest execution of each slow fingerprint
+        self.slow = {}
+
+    def record(self, sql, params, seconds, source):
+        key = fingerprint(sql)
+        entry = self.fingerprints.get(key)
+        if entry is None:
+            self.fingerprints[key] = [1, seconds, sql]
+        else:
+            entry[0] += 1
+            entry[1] += seconds
+        if seconds * 1000 >= settings.SLOW_QUERY_MS and seconds > self.slow.get(key, (None, None, -1, None))[2]:
+            self.slow[key] = (sql, params, seconds, source)
+
+    def repeated(self):
+        """(fingerprint, count, total seconds, example) for fingerprints over the threshold"""
+        return [
+            (key, count, seconds, example)
+            for key, (count, seconds, example) in self.fingerprints.items()
+            if count > settings.QUERY_REPEAT_THRESHOLD
+        ]
+
+    def flagged(self):
+        return bool(self.slow) or bool(self.repeated())
+
+    def finish(self, stack, method, route):
+        """Log and store the findings; call after the request's statements are done"""
+        for key, count, seconds, example in self.repeated():
+            logger.warning('%s %s %s ran %d times (%.1f ms): %s', stack, method, route, count, seconds * 1000, key)
+            save_report('repeated', stack, method, route, key, example, count=count, ms=seconds * 1000)
+        for key, (sql, params, seconds, source) in self.slow.items():
+            plan = explain(sql, params, source)
+            logger.warning('%s %s %s slow statement (%.1f ms): %s\n%s', stack, method, route, seconds * 1000, sql, plan)
+            save_report('slow', stack, method, route, key, sql, plan=plan, count=1, ms=seconds * 1000)
+
+
+def save_report(kind, stack, method, route, key, example, plan='', count=1, ms=0.0):
+    fingerprint_hash = hashlib.sha1(key.encode()).hexdigest()
+    lookup = dict(kind=kind, stack=stack, method=method, route=route[:255], fingerprint_hash=fingerprint_hash)
+    changes = dict(
+        occurrences=F('occurrences') + 1,
+        worst_count=Greatest('worst_count', count),
+        worst_ms=Greatest('worst_ms', ms),
+        example=example,
+        last_seen=timezone.now(),
+        **({'explain': plan} if plan else {}),
+    )
+    if QueryReport.objects.filter(**lookup).update(**changes):
+        return
+    try:
+        with transaction.atomic():
+            QueryReport.objects.create(
+                fingerprint=key, example=example, explain=plan, worst_count=count, worst_ms=ms, **lookup
+            )
+    except IntegrityError:
+        # A concurrent request inserted the same report first
+        QueryReport.objects.filter(**lookup).update(**changes)
+
+
+def report_rows(kind=None):
+    """QueryReports as plain dicts, worst first, for JSON dumps"""
+    reports = QueryReport.objects.order_by('-worst_count', '-worst_ms')
+    if kind:
+        reports = reports.filter(kind=kind)
+    return [
+        {
+            'kind': report.kind,
+            'stack': report.stack,
+            'method': report.method,
+            'route': report.route,
+            'fingerprint': report.fingerprint,
+            'example': report.example,
+            'explain': report.explain,
+            'occurrences': report.occurrences,
+            'worst_count': report.worst_count,
+            'worst_ms': round(report.worst_ms, 2),
+            'first_seen': report.first_seen.isoformat(),
+            'last_seen': report.last_seen.isoformat(),
+        }
+        for report in reports
+    ]
@@ -0,0 +1,67 @@
+"""Default file storage: files are named by the SHA-256 of their content.
+
+``profile_pictures/photo.jpg`` is stored as
+``profile_pictures/ab/cd/abcd….jpg``: the upload_to directory is kept, the
+file name is replaced by the hash and two levels of hash-prefix
+directories keep any one directory to a few hundred entries. Identical
+uploads resolve to the same file, so the second is not written at all.
+
+Files are written to MEDIA_ROOT/tmp and renamed into place, so a reader
+never sees a half-written file. Because content files can be shared,
+callers must not delete a file just because one record stops using it.
+"""
+import hashlib
+import os
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+
+
+class ContentAddressedStorage(FileSystemStorage):
+
+    def content_name(self, name, sha256):
+        """Sharded storage name for content ``sha256`` uploaded as ``name``"""
+        directory, filename = os.path.split(name)
+        extension = os.path.splitext(filename)[1].lower()
+        return os.path.join(directory, sha256[:2], sha256[2:4], sha256 + extension).replace('\\', '/')
+
+    def temporary_file(self):
+        """Path of a new empty file on the same filesystem as the store, ready for commit()"""
+        directory = self.path('tmp')
+        os.makedirs(directory, exist_ok=True)
+        handle, path = tempfile.mkstemp(dir=directory, suffix='.part')
+        os.close(handle)
+        return path
+
+    def commit(self, temporary, name, sha256):
+        """Move a fully written temporary file into place and return its storage name.
+
+        When the content is already stored the temporary file is dropped.
+        """
+        final = self.content_name(name, sha256)
+        destination = self.path(final)
+        if os.path.exists(destination):
+            os.remove(temporary)
+            return final
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        if self.file_permissions_mode is not None:
+            os.chmod(temporary, self.file_permissions_mode)
+        os.replace(temporary, destination)
+        return final
+
+    def get_available_name(self, name, max_length=None):
+        # The final name comes from the content, and equal names mean equal files
+        return name
+
+    def _save(self, name, content):
+        temporary = self.temporary_file()
+        digest = hashlib.sha256()
+        try:
+            with open(temporary, 'wb') as output:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    output.write(chunk)
+            return self.commit(temporary, name, digest.hexdigest())
+        finally:
+            if os.path.exists(temporary):
+                os.remove(temporary)
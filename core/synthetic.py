@@ -0,0 +1,397 @@
+"""Synthetic attendance data at benchmark scale.
+
+generate() adds ``employees`` employees, spread over departments, shifts
+and managers' teams, with ``days`` days of history ending today: device
+punches on every working day, the summaries the summary engine builds
+from them, leave applications, salaries and a completed payroll run for
+every full month of the range. Rows are bulk inserted a block of days at
+a time, in punch-time order as a live site would store them, so nothing
+is saved or looked up row by row.
+
+The same seed and end date give the same data, so two versions of the
+code can be benchmarked against identical databases. Generated rows are
+added to whatever is already there; use an empty database for
+measurements.
+"""
+import random
+from datetime import date, time, timedelta
+from decimal import Decimal
+from time import perf_counter
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.db.models import Max
+
+from attendance.bucketing import shift_bounds
+from attendance.models import AttendanceLog, AttendanceSummary
+from attendance.periods import local_today, month_bounds
+from attendance.summaries import SUMMARY_UPDATE_FIELDS, reset_checkpoint, summary_values
+from leave.models import LeaveApplication, LeaveType
+from master.models import Department, Designation, Device, Employee, Holiday, Shift
+from payroll.engine import process_payroll_run
+from payroll.models import EmployeeSalary, PayrollPeriod, PayrollRun, SalaryComponent, SalaryComponentValue
+from payroll.proration import working_dates
+from reports.rollups import rebuild_rollups
+from .models import Role, UserProfile
+
+DEPARTMENT_SIZE = 100
+TEAM_SIZE = 10
+EMPLOYEES_PER_DEVICE = 250
+# Punches generated and written per transaction, rounded to whole days
+PUNCHES_PER_BLOCK = 50000
+BATCH_SIZE = 2000
+
+PASSWORD = 'password123'
+ROLES = ['Admin', 'Manager', 'Employee', 'HR']
+DESIGNATIONS = ['Software Engineer', 'Senior Software Engineer', 'HR Manager', 'Accountant', 'Operations Manager', 'Marketing Specialist']
+SHIFTS = [('Morning', time(9, 0), time(17, 0)), ('Evening', time(14, 0), time(22, 0)), ('Night', time(22, 0), time(6, 0))]
+SHIFT_WEIGHTS = [8, 1, 1]
+HOLIDAYS = [(1, 1, "New Year's Day"), (1, 26, 'Republic Day'), (5, 1, 'Labour Day'), (8, 15, 'Independence Day'), (10, 2, 'Gandhi Jayanti'), (12, 25, 'Christmas')]
+LEAVE_TYPES = [('Annual Leave', 30), ('Sick Leave', 15), ('Casual Leave', 12)]
+LEAVE_STATUSES = ['approved', 'pending', 'rejected']
+LEAVE_STATUS_WEIGHTS = [7, 2, 1]
+# (name, type, percentage of basic or None, fixed monthly amount)
+SALARY_COMPONENTS = [
+    ('HRA', 'earning', Decimal('40'), None),
+    ('Conveyance Allowance', 'earning', None, Decimal('1600')),
+    ('Medical Allowance', 'earning', None, Decimal('1250')),
+    ('Provident Fund', 'deduction', Decimal('12'), None),
+    ('Professional Tax', 'deduction', None, Decimal('200')),
+    ('Income Tax', 'deduction', Decimal('10'), None),
+]
+BASIC_SALARIES = [Decimal(amount) for amount in range(25000, 150001, 5000)]
+
+# How an employee's working day goes; 'missed_out' has an IN punch only
+OUTCOMES = ['present', 'half_day', 'missed_out', 'absent']
+OUTCOME_WEIGHTS = [85, 4, 3, 8]
+# Pre-drawn punch offsets per distribution
+POOL_SIZE = 4096
+LEAVES_PER_YEAR = 4
+
+
+def _by_name(model, field, names, **defaults):
+    """Insert the named reference rows that are missing; returns {name: instance}"""
+    model.objects.bulk_create([model(**{field: name}, **defaults.get(name, {})) for name in names], ignore_conflicts=True)
+    return {getattr(row, field): row for row in model.objects.filter(**{f'{field}__in': names})}
+
+
+def create_reference_data(start_date, end_date):
+    """Roles, designations, shifts, leave types, salary components and the holidays of the range"""
+    roles = _by_name(Role, 'role_name', ROLES)
+    designations = _by_name(Designation, 'designation_name', DESIGNATIONS)
+    shifts = _by_name(Shift, 'shift_name', [name for name, _, _ in SHIFTS], **{
+        name: {'start_time': start, 'end_time': end, 'grace_in': 15, 'grace_out': 15} for name, start, end in SHIFTS
+    })
+    leave_types = _by_name(LeaveType, 'type_name', [name for name, _ in LEAVE_TYPES], **{
+        name: {'max_days': max_days} for name, max_days in LEAVE_TYPES
+    })
+    components = _by_name(SalaryComponent, 'component_name', [name for name, _, _, _ in SALARY_COMPONENTS], **{
+        name: {'component_type': component_type} for name, component_type, _, _ in SALARY_COMPONENTS
+    })
+    Holiday.objects.bulk_create([
+        Holiday(holiday_date=date(year, month, day), description=description)
+        for year in range(start_date.year, end_date.year + 1)
+        for month, day, description in HOLIDAYS
+    ], ignore_conflicts=True)
+    return roles, designations, [shifts[name] for name, _, _ in SHIFTS], leave_types, components
+
+
+def create_admin(roles, password):
+    user, _ = User.objects.get_or_create(
+        username='synthetic-admin', defaults={'email': 'synthetic-admin@example.com', 'is_staff': True, 'password': password}
+    )
+    profile, _ = UserProfile.objects.get_or_create(user=user, defaults={'role': roles['Admin']})
+    return profile
+
+
+def create_devices(count):
+    """Entrance devices for ``count`` employees; returns their ids"""
+    serials = [f'SYN-{index + 1:04d}' for index in range((count + EMPLOYEES_PER_DEVICE - 1) // EMPLOYEES_PER_DEVICE)]
+    devices = _by_name(Device, 'serial_number', serials, **{
+        serial: {'device_name': f'Entrance {serial}', 'ip_address': '10.0.0.1', 'status': 'online'} for serial in serials
+    })
+    return [devices[serial].device_id for serial in serials]
+
+
+def create_employees(rng, count, start_date, roles, designations, shifts, password):
+    """Employees with their users, profiles, departments and managers"""
+    first = (Employee.objects.aggregate(last=Max('employee_id'))['last'] or 0) + 1
+    numbers = range(first, first + count)
+
+    names = [f'Department {index + 1:03d}' for index in range((count + DEPARTMENT_SIZE - 1) // DEPARTMENT_SIZE)]
+    departments = _by_name(Department, 'department_name', names)
+    departments = [departments[name] for name in names]
+
+    users = User.objects.bulk_create([
+        User(username=f'emp{number:06d}', email=f'emp{number:06d}@example.com', password=password)
+        for number in numbers
+    ], batch_size=BATCH_SIZE)
+
+    designation_list = list(designations.values())
+    employees = []
+    for index, (number, user) in enumerate(zip(numbers, users)):
+        department = departments[index // DEPARTMENT_SIZE]
+        employees.append(Employee(
+            user=user,
+            employee_code=f'EMP{number:06d}',
+            first_name='Employee',
+            last_name=str(number),
+            email=user.email,
+            department=department,
+            designation=rng.choice(designation_list),
+            shift=rng.choices(shifts, SHIFT_WEIGHTS)[0],
+            date_of_joining=start_date - timedelta(days=rng.randint(30, 2000)),
+        ))
+    Employee.objects.bulk_create(employees, batch_size=BATCH_SIZE)
+
+    # The first employees of each department manage teams of the rest
+    managers = set()
+    for start in range(0, count, DEPARTMENT_SIZE):
+        members = employees[start:start + DEPARTMENT_SIZE]
+        leads = members[:max(1, len(members) // TEAM_SIZE)]
+        managers.update(lead.employee_id for lead in leads)
+        for index, member in enumerate(members[len(leads):]):
+            member.manager = leads[index % len(leads)]
+    Employee.objects.bulk_update([employee for employee in employees if employee.manager_id], ['manager'], batch_size=BATCH_SIZE)
+
+    UserProfile.objects.bulk_create([
+        UserProfile(
+            user_id=employee.user_id,
+            role=roles['Manager'] if employee.employee_id in managers else roles['Employee'],
+            employee_id=employee.employee_code,
+        )
+        for employee in employees
+    ], batch_size=BATCH_SIZE)
+    return employees
+
+
+def create_leaves(rng, employees, start_date, end_date, leave_types, approver):
+    """Leave applications over the range; returns the set of (employee_id, date) on approved leave"""
+    days = (end_date - start_date).days + 1
+    types = list(leave_types.values())
+    applications = []
+    on_leave = set()
+    for employee in employees:
+        for _ in range(round(days * LEAVES_PER_YEAR / 365 * rng.uniform(0.5, 1.5))):
+            start = start_date + timedelta(days=rng.randrange(days))
+            length = rng.randint(1, 3)
+            status = rng.choices(LEAVE_STATUSES, LEAVE_STATUS_WEIGHTS)[0]
+            applications.append(LeaveApplication(
+                employee=employee,
+                leave_type=rng.choice(types),
+                start_date=start,
+                end_date=start + timedelta(days=length - 1),
+                total_days=Decimal(length),
+                reason='Synthetic leave',
+                status=status,
+                approved_by=approver if status != 'pending' else None,
+            ))
+            if status == 'approved':
+                on_leave.update((employee.employee_id, start + timedelta(days=offset)) for offset in range(length))
+    LeaveApplication.objects.bulk_create(applications, batch_size=BATCH_SIZE)
+    return len(applications), on_leave
+
+
+def offset_pool(rng, low, high, mode=None):
+    """POOL_SIZE offsets in seconds, triangularly distributed, drawn from with rng.choices()"""
+    return [timedelta(seconds=int(rng.triangular(low, high, mode))) for _ in range(POOL_SIZE)]
+
+
+def day_punches(rng, day, workforce, on_leave, shift_times, pools):
+    """Punches of one working day as (punch_time, employee_id, punch_type, device_id), and summary rows.
+
+    Summary rows are (employee_id, date, *SUMMARY_UPDATE_FIELDS) as the summary engine computes them.
+    The random draws for the whole workforce are taken in one call each.
+    """
+    count = len(workforce)
+    outcomes = rng.choices(OUTCOMES, OUTCOME_WEIGHTS, k=count)
+    arrivals = rng.choices(pools['arrival'], k=count)
+    departures = rng.choices(pools['departure'], k=count)
+    half_days = rng.choices(pools['half_day'], k=count)
+    bounds = {shift_id: shift_bounds(day, start, end) for shift_id, (start, end) in shift_times.items()}
+
+    punches = []
+    summaries = []
+    for (employee_id, shift_id, device_id), outcome, arrival, departure, half_day in zip(
+        workforce, outcomes, arrivals, departures, half_days
+    ):
+        if outcome == 'absent' or (employee_id, day) in on_leave:
+            continue
+        shift_in, shift_out = bounds[shift_id]
+        punch_in = shift_in + arrival
+        worked = [('IN', punch_in)]
+        if outcome == 'half_day':
+            worked.append(('OUT', punch_in + half_day))
+        elif outcome == 'present':
+            worked.append(('OUT', shift_out + departure))
+        punches.extend((punch_time, employee_id, punch_type, device_id) for punch_type, punch_time in worked)
+        summaries.append((employee_id, day, *summary_values(day, worked, *shift_times[shift_id])))
+    return punches, summaries
+
+
+def insert_rows(model, field_names, rows):
+    """Insert tuples of database-ready values with one executemany().
+
+    Used for the tables that get millions of rows: bulk_create() runs every
+    value through its field's preparation and builds the INSERT per batch,
+    which costs several times more than the insert itself.
+    """
+    fields = [model._meta.get_field(name) for name in field_names]
+    quote = connection.ops.quote_name
+    sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+        quote(model._meta.db_table), ', '.join(quote(field.column) for field in fields), ', '.join(['%s'] * len(fields))
+    )
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, rows)
+
+
+def write_attendance(punches, summaries):
+    """Store a block of days: punches in punch-time order, as a live site receives them, and their summaries"""
+    ops = connection.ops
+    punches.sort()
+    insert_rows(AttendanceLog, ['punch_time', 'employee', 'punch_type', 'device', 'selfie_url', 'status'], [
+        (ops.adapt_datetimefield_value(punch_time), employee_id, punch_type, device_id, '', 'approved')
+        for punch_time, employee_id, punch_type, device_id in punches
+    ])
+    insert_rows(AttendanceSummary, ['employee', 'date', *SUMMARY_UPDATE_FIELDS], [
+        (
+            employee_id,
+            ops.adapt_datefield_value(work_date),
+            ops.adapt_timefield_value(in_time),
+            ops.adapt_timefield_value(out_time),
+            ops.adapt_decimalfield_value(total_hours, 5, 2),
+            late_by,
+            early_out,
+            status,
+        )
+        for employee_id, work_date, in_time, out_time, total_hours, late_by, early_out, status in summaries
+    ])
+
+
+def create_attendance(rng, employees, start_date, end_date, on_leave, devices, shifts, progress):
+    """Punches and summaries for every working day, one transaction per block of days.
+
+    Returns the number of punches and of summaries written.
+    """
+    shift_times = {shift.shift_id: (shift.start_time, shift.end_time) for shift in shifts}
+    workforce = [
+        (employee.employee_id, employee.shift_id, devices[index // EMPLOYEES_PER_DEVICE % len(devices)])
+        for index, employee in enumerate(employees)
+    ]
+    pools = {
+        'arrival': offset_pool(rng, -1800, 3600, -300),
+        'departure': offset_pool(rng, -1800, 5400, 600),
+        'half_day': offset_pool(rng, 7200, 12600),
+    }
+    # Working days and holidays are read once, not checked per employee and day
+    days = working_dates(start_date, end_date)
+    days_per_block = max(1, PUNCHES_PER_BLOCK // (2 * len(employees)))
+
+    started = perf_counter()
+    punch_count = summary_count = 0
+    for start in range(0, len(days), days_per_block):
+        punches = []
+        summaries = []
+        for day in days[start:start + days_per_block]:
+            day_logs, day_summaries = day_punches(rng, day, workforce, on_leave, shift_times, pools)
+            punches.extend(day_logs)
+            summaries.extend(day_summaries)
+        with transaction.atomic():
+            write_attendance(punches, summaries)
+        punch_count += len(punches)
+        summary_count += len(summaries)
+        progress('punches', punch_count, perf_counter() - started, start + days_per_block >= len(days))
+    # The summaries are already there; the engine only needs to fold punches made from now on
+    reset_checkpoint(last_attendance_id=AttendanceLog.objects.aggregate(last=Max('attendance_id'))['last'] or 0)
+    return punch_count, summary_count
+
+
+def create_salaries(rng, employees, components):
+    salaries = EmployeeSalary.objects.bulk_create([
+        EmployeeSalary(employee=employee, basic_salary=rng.choice(BASIC_SALARIES), effective_date=employee.date_of_joining)
+        for employee in employees
+    ], batch_size=BATCH_SIZE)
+    SalaryComponentValue.objects.bulk_create([
+        SalaryComponentValue(
+            employee_salary=salary,
+            component=components[name],
+            amount=amount or Decimal('0'),
+            is_percentage=percentage is not None,
+            percentage_of_basic=percentage,
+        )
+        for salary in salaries
+        for name, _, percentage, amount in SALARY_COMPONENTS
+    ], batch_size=BATCH_SIZE)
+
+
+def create_payroll_runs(start_date, end_date, processed_by):
+    """A completed run for each full month of the range and an open period for the current month"""
+    runs = 0
+    month = date(start_date.year, start_date.month, 1)
+    if month < start_date:
+        month = month_bounds(month.year, month.month)[1]
+    while month <= end_date:
+        next_month = month_bounds(month.year, month.month)[1]
+        closed = next_month <= end_date
+        period, _ = PayrollPeriod.objects.get_or_create(
+            period_name=month.strftime('%B %Y'),
+            defaults={'start_date': month, 'end_date': next_month - timedelta(days=1), 'is_closed': closed},
+        )
+        if closed:
+            process_payroll_run(PayrollRun.objects.create(period=period, processed_by=processed_by))
+            runs += 1
+        month = next_month
+    return runs
+
+
+def generate(employees=100, days=365, seed=42, end_date=None, progress=None):
+    """Bulk-create a synthetic dataset and return the number of rows written per kind.
+
+    ``progress(stage, rows, seconds, done)`` is called when each stage
+    finishes, and for punches after every block of days as well.
+    """
+    progress = progress or (lambda stage, rows, seconds, done: None)
+
+    def timed(stage, work, rows):
+        started = perf_counter()
+        result = work()
+        progress(stage, rows(result), perf_counter() - started, True)
+        return result
+
+    rng = random.Random(seed)
+    end_date = end_date or local_today()
+    start_date = end_date - timedelta(days=days - 1)
+    # One hash for every synthetic user: hashing is deliberately slow
+    password = make_password(PASSWORD)
+
+    roles, designations, shifts, leave_types, components = create_reference_data(start_date, end_date)
+    admin = create_admin(roles, password)
+    devices = create_devices(employees)
+    staff = timed('employees', lambda: create_employees(rng, employees, start_date, roles, designations, shifts, password), len)
+    leaves, on_leave = timed(
+        'leave applications', lambda: create_leaves(rng, staff, start_date, end_date, leave_types, admin.user), lambda result: result[0]
+    )
+    punches, summaries = create_attendance(rng, staff, start_date, end_date, on_leave, devices, shifts, progress)
+    timed('rollups', rebuild_rollups, lambda _: summaries)
+    timed('salaries', lambda: create_salaries(rng, staff, components), lambda _: len(staff))
+    runs = timed('payroll runs', lambda: create_payroll_runs(start_date, end_date, admin), lambda runs: runs)
+    return {
+        'employees': len(staff),
+        'days': days,
+        'punches': punches,
+        'summaries': summaries,
+        'leave_applications': leaves,
+        'payroll_runs': runs,
+    }
+
+
+def dataset_counts():
+    """Size of the data in the database, for labelling benchmark results"""
+    return {
+        'employees': Employee.objects.count(),
+        'punches': AttendanceLog.objects.count(),
+        'summaries': AttendanceSummary.objects.count(),
+        'leave_applications': LeaveApplication.objects.count(),
+        'payroll_runs': PayrollRun.objects.count(),
+    }
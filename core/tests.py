@@ -1,3 +1,270 @@
-from django.test import TestCase
+import base64
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+from datetime import date
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import DatabaseError, connection
+from django.db.models import QuerySet
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import ResolverMatch
+from PIL import Image
+
+from hexaattendanceportal.metrics import RequestMetricsMiddleware, registry
+
+from .access import UserCache, access_cache, register_cache, user_caches
+from .derivatives import sized_urls
+from .media import (
+    UploadRejected, UploadTooLarge, claim_next_asset, media_url, process_asset, store_chunks, store_data_url,
+)
+from .models import MediaAsset, QueryReport, Role, UserProfile
+from .querywatch import fingerprint, report_rows, save_report
+from .synthetic import generate
+
+
+def jpeg_bytes(size=(64, 48)):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, 'navy').save(buffer, 'JPEG')
+    return buffer.getvalue()
+
+
+class MediaIngestTests(TestCase):
+    """Uploads stream to content-named files, are deduplicated and queued for the media worker"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings = override_settings(MEDIA_ROOT=self.media_root, MEDIA_UPLOAD_MAX_BYTES=50_000, MEDIA_UPLOAD_CHUNK_SIZE=1024)
+        self.settings.enable()
+
+    def tearDown(self):
+        self.settings.disable()
+        shutil.rmtree(self.media_root)
+
+    def chunks(self, data):
+        return (data[i:i + 1024] for i in range(0, len(data), 1024))
+
+    def test_identical_uploads_share_one_file(self):
+        data = jpeg_bytes()
+        first = store_chunks(self.chunks(data), 'a.jpg')
+        second = store_data_url('data:image/jpeg;base64,' + base64.b64encode(data).decode())
+        self.assertEqual(first.pk, second.pk)
+        self.assertEqual(MediaAsset.objects.count(), 1)
+        sha = first.sha256
+        self.assertEqual(first.name, f'selfies/{sha[:2]}/{sha[2:4]}/{sha}.jpg')
+        self.assertEqual(os.listdir(os.path.join(self.media_root, 'selfies', sha[:2], sha[2:4])), [f'{sha}.jpg'])
+        self.assertEqual(os.listdir(os.path.join(self.media_root, 'tmp')), [])
+
+    def test_oversized_upload_is_rejected_midstream(self):
+        with self.assertRaises(UploadTooLarge):
+            store_chunks(self.chunks(b'\xff' * 60_000), 'big.jpg')
+        with self.assertRaises(UploadTooLarge):
+            store_chunks(iter(()), 'big.jpg', size=60_000)
+        self.assertFalse(MediaAsset.objects.exists())
+        self.assertEqual(os.listdir(os.path.join(self.media_root, 'tmp')), [])
+
+    def test_non_images_are_rejected(self):
+        with self.assertRaises(UploadRejected):
+            store_chunks(self.chunks(b'MZ'), 'tool.exe', 'application/octet-stream')
+
+    def test_worker_inspects_queued_assets(self):
+        good = store_chunks(self.chunks(jpeg_bytes((80, 60))), 'good.jpg')
+        bad = store_chunks(self.chunks(b'not really a jpeg'), 'bad.jpg')
+        while (asset := claim_next_asset()) is not None:
+            process_asset(asset)
+        good.refresh_from_db()
+        bad.refresh_from_db()
+        self.assertEqual((good.status, good.width, good.height), ('done', 80, 60))
+        self.assertEqual(bad.status, 'failed')
+
+    def test_worker_writes_smaller_derivatives(self):
+        asset = store_chunks(self.chunks(jpeg_bytes((1200, 900))), 'big.jpg')
+        url = media_url(asset)
+        self.assertEqual(sized_urls([url, ''], 'thumb'), {url: url, '': ''})
+        process_asset(claim_next_asset())
+        asset.refresh_from_db()
+        self.assertEqual(set(asset.derivatives), {'thumb', 'medium'})
+        thumb = sized_urls([url], 'thumb')[url]
+        self.assertTrue(thumb.startswith('/media/derivatives/thumb/'))
+        with Image.open(os.path.join(self.media_root, asset.derivatives['thumb'])) as image:
+            self.assertEqual(image.size, (160, 120))
+        with Image.open(os.path.join(self.media_root, asset.derivatives['medium'])) as image:
+            self.assertEqual(image.size, (640, 480))
+
+
+class ContentAddressedStorageTests(TestCase):
+    """The default storage names files by content hash in a sharded tree"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings.enable()
+
+    def tearDown(self):
+        self.settings.disable()
+        shutil.rmtree(self.media_root)
+
+    def test_identical_files_are_stored_once(self):
+        data = jpeg_bytes()
+        sha = hashlib.sha256(data).hexdigest()
+        first = default_storage.save('profile_pictures/me.JPG', ContentFile(data))
+        second = default_storage.save('profile_pictures/copy.jpg', ContentFile(data))
+        self.assertEqual(first, f'profile_pictures/{sha[:2]}/{sha[2:4]}/{sha}.jpg')
+        self.assertEqual(second, first)
+        self.assertEqual(os.listdir(os.path.join(self.media_root, 'profile_pictures', sha[:2], sha[2:4])), [f'{sha}.jpg'])
+        self.assertEqual(os.listdir(os.path.join(self.media_root, 'tmp')), [])
+        with default_storage.open(first) as stored:
+            self.assertEqual(stored.read(), data)
+
+
+class RequestMetricsTests(TestCase):
+    """Requests are recorded under their URL pattern with the queries they made"""
+
+    def test_view_is_recorded_with_its_queries(self):
+        user = User.objects.create_user('metrics', password='x')
+        self.client.force_login(user)
+        self.client.get('/login/')
+        metrics = registry.routes[('django', 'GET', 'login/')]
+        self.assertGreaterEqual(metrics.queries.count, 1)
+        # Session and user lookups
+        self.assertGreaterEqual(metrics.queries.samples[-1], 2)
+
+        text = registry.render()
+        self.assertIn('# TYPE http_request_duration_seconds summary', text)
+        self.assertIn('http_requests_total{stack="django",method="GET",route="login/",status="302"}', text)
+        self.assertIn('http_request_queries{stack="django",method="GET",route="login/",quantile="0.99"}', text)
+
+
+class QueryWatchTests(TestCase):
+    """Statements are fingerprinted per request; repeats and slow ones are reported"""
+
+    def test_fingerprint_collapses_literals_and_in_lists(self):
+        self.assertEqual(
+            fingerprint("SELECT * FROM t WHERE id IN (%s, %s, %s) AND name = 'x''y' LIMIT 21"),
+            'SELECT * FROM t WHERE id IN (...) AND name = ? LIMIT ?',
+        )
+        self.assertEqual(fingerprint('SELECT a FROM t1 WHERE b = ?'), fingerprint('SELECT a FROM t1 WHERE b = 7'))
+
+    @override_settings(QUERY_TRACE_SAMPLE_RATE=1, QUERY_REPEAT_THRESHOLD=5, SLOW_QUERY_MS=0)
+    def test_repeated_and_slow_statements_are_reported(self):
+        def view(request):
+            request.resolver_match = ResolverMatch(view, (), {}, route='roles/')
+            for role_id in range(8):
+                list(Role.objects.filter(role_id=role_id))
+            return HttpResponse('ok')
+
+        middleware = RequestMetricsMiddleware(view)
+        with self.assertLogs('core.querywatch', 'WARNING') as logs:
+            middleware(RequestFactory().get('/roles/'))
+            middleware(RequestFactory().get('/roles/'))
+        self.assertIn('ran 8 times', logs.output[0])
+
+        repeated = QueryReport.objects.get(kind='repeated', route='roles/')
+        self.assertEqual((repeated.worst_count, repeated.occurrences), (8, 2))
+        self.assertIn('WHERE "core_role"."role_id" = ?', repeated.fingerprint)
+        slow = QueryReport.objects.get(kind='slow', route='roles/')
+        self.assertTrue(slow.explain)
+        self.assertEqual([row['kind'] for row in report_rows()], ['repeated', 'slow'])
+
+    def test_report_inserted_by_a_concurrent_request_is_updated(self):
+        save_report('repeated', 'django', 'GET', 'roles/', 'SELECT ?', 'SELECT 1', count=8)
+        update = QuerySet.update
+        calls = []
+
+        def update_after_the_other_insert(queryset, **changes):
+            # The first update runs before the other request's insert commits
+            calls.append(changes)
+            return 0 if len(calls) == 1 else update(queryset, **changes)
+
+        with mock.patch.object(QuerySet, 'update', update_after_the_other_insert):
+            save_report('repeated', 'django', 'GET', 'roles/', 'SELECT ?', 'SELECT 2', count=12)
+        report = QueryReport.objects.get()
+        self.assertEqual((report.occurrences, report.worst_count, report.example), (2, 12, 'SELECT 2'))
+
+    @override_settings(QUERY_TRACE_SAMPLE_RATE=1, QUERY_REPEAT_THRESHOLD=0)
+    def test_failed_report_does_not_fail_the_request(self):
+        def view(request):
+            list(Role.objects.all())
+            return HttpResponse('ok')
+
+        middleware = RequestMetricsMiddleware(view)
+        with mock.patch('core.querywatch.save_report', side_effect=DatabaseError('locked')), \
+                self.assertLogs('core.querywatch', 'WARNING'), \
+                self.assertLogs('hexaattendanceportal.metrics', 'ERROR') as logs:
+            response = middleware(RequestFactory().get('/roles/'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Query report for django GET unmatched failed', logs.output[0])
+
+
+class AccessTests(TestCase):
+    """Role checks come from the access cache, which profile changes invalidate"""
+
+    def setUp(self):
+        from master.models import Department, Employee
+
+        access_cache.invalidate()
+        self.user = User.objects.create_user('access-manager', password='x')
+        self.profile = UserProfile.objects.create(user=self.user, role=Role.objects.create(role_name='Manager'))
+        Employee.objects.create(
+            user=self.user, employee_code='ACC001', first_name='A', last_name='M', email='am@example.com',
+            department=Department.objects.create(department_name='Access'), date_of_joining=date(2024, 1, 1),
+        )
+        self.client.force_login(self.user)
+
+    def test_role_is_read_once(self):
+        self.assertEqual(self.client.get('/manager/own-leave/').status_code, 200)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get('/manager/own-leave/').status_code, 200)
+        tables = ' '.join(query['sql'] for query in queries)
+        self.assertNotIn('core_userprofile', tables)
+        self.assertNotIn('core_role', tables)
+
+    def test_profile_change_is_picked_up(self):
+        self.assertEqual(self.client.get('/manager/own-leave/').status_code, 200)
+        self.profile.role = Role.objects.create(role_name='Employee')
+        self.profile.save()
+        response = self.client.get('/manager/own-leave/')
+        self.assertRedirects(response, '/dashboard/', fetch_redirect_response=False)
+
+    def test_registered_caches_are_invalidated_together(self):
+        other = register_cache(UserCache(10, 60))
+        self.addCleanup(user_caches.remove, other)
+        other.set(self.user.pk, 'principal', other.generation)
+        access_cache.set(self.user.pk, 'access', access_cache.generation)
+
+        self.profile.save()
+        self.assertEqual((other.get(self.user.pk), access_cache.get(self.user.pk)), (None, None))
+
+        other.set(self.user.pk, 'principal', other.generation)
+        Role.objects.create(role_name='Auditor')
+        self.assertIsNone(other.get(self.user.pk))
+
+
+class SyntheticDataTests(TestCase):
+    """Generated summaries match the engine's and every full month gets a payroll run"""
+
+    def test_generate(self):
+        from attendance.models import AttendanceSummary
+        from attendance.summaries import rebuild_summaries
+        from master.models import Employee
+        from payroll.models import PayrollRun
+
+        written = generate(employees=25, days=45, seed=7, end_date=date(2025, 3, 14))
+        self.assertEqual(written['employees'], 25)
+        self.assertEqual(AttendanceSummary.objects.count(), written['summaries'])
+        self.assertEqual(Employee.objects.filter(manager__isnull=True).count(), 2)
+
+        fields = ('employee_id', 'date', 'in_time', 'out_time', 'total_hours', 'late_by', 'early_out', 'status')
+        generated = set(AttendanceSummary.objects.values_list(*fields))
+        rebuild_summaries(AttendanceSummary.objects.values_list('employee_id', 'date'))
+        self.assertEqual(set(AttendanceSummary.objects.values_list(*fields)), generated)
+
+        run = PayrollRun.objects.get()
+        self.assertEqual((run.period.period_name, run.status, run.total_employees), ('February 2025', 'completed', 25))
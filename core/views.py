@@ -6,6 +6,12 @@ from django.contrib.auth.models import User
 from .models import UserProfile, Role, ActivityLog
 from master.models import Employee, Task, TaskSubmission
 from attendance.models import AttendanceSummary, AttendanceLog
+from attendance.aggregates import annotate_attendance
+from attendance.bucketing import current_work_date, employee_offset
+from attendance.periods import local_today, on_days
+from .access import get_access, linked_employee, role_required
+from .derivatives import sized_urls
+from .media import UploadRejected, store_data_url
 from leave.models import LeaveApplication
 from django.utils import timezone
 from django.db.models import Count, Q, Sum
@@ -179,32 +185,20 @@ def logout_view(request):
 @login_required
 def dashboard(request):
     """Redirect to appropriate dashboard based on user role"""
-    try:
-        user_profile = request.user.userprofile
-        role = user_profile.role.role_name
-        if role == 'Admin':
-            return redirect('admin')
-        elif role == 'Manager':
-            return redirect('manager')
-        elif role == 'Employee':
-            return redirect('employee')
-        else:
-            return redirect('login')
-    except UserProfile.DoesNotExist:
+    role = get_access(request).role
+    if role == 'Admin':
+        return redirect('admin')
+    elif role == 'Manager':
+        return redirect('manager')
+    elif role == 'Employee':
+        return redirect('employee')
+    else:
         return redirect('login')
 
-@login_required
+@role_required('Admin')
 def admin_view(request):
     """Admin management page"""
-    try:
-        user_profile = request.user.userprofile
-        if user_profile.role.role_name != 'Admin':
-            messages.error(request, 'Access denied. Admin privileges required.')
-            return redirect('dashboard')
-        user_role = 'Admin'
-    except UserProfile.DoesNotExist:
-        messages.error(request, 'User profile not found.')
-        return redirect('login')
+    user_role = 'Admin'
 
     # Get admin statistics
     total_users = User.objects.count()
@@ -232,18 +226,10 @@ def admin_view(request):
 
     return render(request, 'core/admin.html', context)
 
-@login_required
+@role_required('Admin')
 def add_user_view(request):
     """Add User page"""
-    try:
-        user_profile = request.user.userprofile
-        if user_profile.role.role_name != 'Admin':
-            messages.error(request, 'Access denied. Admin privileges required.')
-            return redirect('dashboard')
-        user_role = 'Admin'
-    except UserProfile.DoesNotExist:
-        messages.error(request, 'User profile not found.')
-        return redirect('login')
+    user_role = 'Admin'
 
     if request.method == 'POST':
         username = request.POST.get('username')
@@ -371,18 +357,10 @@ def add_user_view(request):
     }
     return render(request, 'core/add_user.html', context)
 
-@login_required
+@role_required('Admin')
 def manage_users_view(request):
     """Manage Users page"""
-    try:
-        user_profile = request.user.userprofile
-        if user_profile.role.role_name != 'Admin':
-            messages.error(request, 'Access denied. Admin privileges required.')
-            return redirect('dashboard')
-        user_role = 'Admin'
-    except UserProfile.DoesNotExist:
-        messages.error(request, 'User profile not found.')
-        return redirect('login')
+    user_role = 'Admin'
 
     # Get all users for management
     from django.contrib.auth.models import User
@@ -390,18 +368,10 @@ def manage_users_view(request):
     context = {'user_role': user_role, 'users': users}
     return render(request, 'core/manage_users.html', context)
 
-@login_required
+@role_required('Admin')
 def edit_user_view(request, user_id):
     """Edit User page"""
-    try:
-        user_profile = request.user.userprofile
-        if user_profile.role.role_name != 'Admin':
-            messages.error(request, 'Access denied. Admin privileges required.')
-            return redirect('dashboard')
-        user_role = 'Admin'
-    except UserProfile.DoesNotExist:
-        messages.error(request, 'User profile not found.')
-        return redirect('login')
+    user_role = 'Admin'
 
     try:
         user = User.objects.select_related('userprofile__role').get(id=user_id)
@@ -453,18 +423,9 @@ def edit_user_view(request, user_id):
     context = {'user_role': user_role, 'user': user}
     return render(request, 'core/edit_user.html', context)
 
-@login_required
+@role_required('Admin')
 def delete_user_view(request, user_id):
     """Delete User"""
-    try:
-        user_profile = request.user.userprofile
-        if user_profile.role.role_name != 'Admin':
-            messages.error(request, 'Access denied. Admin privileges required.')
-            return redirect('dashboard')
-    except UserProfile.DoesNotExist:
-        messages.error(request, 'User profile not found.')
-        return redirect('login')
-
     try:
         user = User.objects.get(id=user_id)
         user.delete()
@@ -473,18 +434,9 @@ def delete_user_view(request, user_id):
         messages.error(request, 'User not found')
     return redirect('manage_users')
 
-@login_required
+@role_required('Admin')
 def reset_password_view(request, user_id):
     """Reset User Password"""
-    try:
-        user_profile = request.user.userprofile
-        if user_profile.role.role_name != 'Admin':
-            messages.error(request, 'Access denied. Admin privileges required.')
-            return redirect('dashboard')
-    except UserProfile.DoesNotExist:
-        messages.error(request, 'User profile not found.')
-        return redirect('login')
-
     try:
         user = User.objects.get(id=user_id)
         new_password = 'password123'  # Default reset password
@@ -495,18 +447,10 @@ def reset_password_view(request, user_id):
         messages.error(request, 'User not found')
     return redirect('manage_users')
 
-@login_required
+@role_required('Admin')
 def view_user_details_view(request, user_id):
     """View User Details"""
-    try:
-        user_profile = request.user.userprofile
-        if user_profile.role.role_name != 'Admin':
-            messages.error(request, 'Access denied. Admin privileges required.')
-            return redirect('dashboard')
-        user_role = 'Admin'
-    except UserProfile.DoesNotExist:
-        messages.error(request, 'User profile not found.')
-        return redirect('login')
+    user_role = 'Admin'
 
     try:
         user = User.objects.select_related('userprofile__role').get(id=user_id)
@@ -519,49 +463,25 @@ def view_user_details_view(request, user_id):
 
     return render(request, 'core/view_user_details.html', context)
 
-@login_required
+@role_required('Admin')
 def system_settings_view(request):
     """System Settings page"""
-    try:
-        user_profile = request.user.userprofile
-        if user_profile.role.role_name != 'Admin':
-            messages.error(request, 'Access denied. Admin privileges required.')
-            return redirect('dashboard')
-        user_role = 'Admin'
-    except UserProfile.DoesNotExist:
-        messages.error(request, 'User profile not found.')
-        return redirect('login')
+    user_role = 'Admin'
 
     context = {'user_role': user_role}
     return render(request, 'core/system_settings.html', context)
 
-@login_required
+@role_required('Admin')
 def backup_data_view(request):
     """Backup Data page"""
-    try:
-        user_profile = request.user.userprofile
-        if user_profile.role.role_name != 'Admin':
-            messages.error(request, 'Access denied. Admin privileges required.')
-            return redirect('dashboard')
-        user_role = 'Admin'
-    except UserProfile.DoesNotExist:
-        messages.error(request, 'User profile not found.')
-        return redirect('login')
+    user_role = 'Admin'
 
     context = {'user_role': user_role}
     return render(request, 'core/backup_data.html', context)
 
-@login_required
+@role_required('Employee')
 def employee_view(request):
     """Employee dashboard"""
-    try:
-        user_profile = request.user.userprofile
-        if user_profile.role.role_name != 'Employee':
-            messages.error(request, 'Access denied. Employee privileges required.')
-            return redirect('dashboard')
-    except UserProfile.DoesNotExist:
-        messages.error(request, 'User profile not found.')
-        return redirect('login')
     # Use dummy employee (first active employee)
     employee = Employee.objects.filter(status=True).first()
     if not employee:
@@ -600,7 +520,7 @@ def employee_view(request):
     leaves = LeaveApplication.objects.filter(employee=employee).order_by('-applied_date')[:10]
 
     # Today's attendance status
-    today = date.today()
+    today = current_work_date(employee_offset(employee.employee_id))
     today_attendance = AttendanceSummary.objects.filter(employee=employee, date=today).first()
 
     context = {
@@ -613,22 +533,12 @@ def employee_view(request):
     }
     return render(request, 'core/employee.html', context)
 
-@login_required
+@role_required('Employee')
 def profile_view(request):
     """Employee profile page"""
-    try:
-        user_profile = request.user.userprofile
-        if user_profile.role.role_name != 'Employee':
-            messages.error(request, 'Access denied. Employee privileges required.')
-            return redirect('dashboard')
-    except UserProfile.DoesNotExist:
-        messages.error(request, 'User profile not found.')
-        return redirect('login')
-
     # Get employee linked to user
-    try:
-        employee = Employee.objects.get(user=request.user)
-    except Employee.DoesNotExist:
+    employee = linked_employee(request)
+    if employee is None:
         # Try to link user to employee via employee_id in profile
         try:
             user_profile = request.user.userprofile
@@ -682,22 +592,11 @@ def profile_view(request):
                 messages.error(request, 'Profile picture must be less than 5MB.')
                 return redirect('employee_profile')
 
-            # Save the profile picture
+            # Save the profile picture. The old one is left in place: the store is
+            # content-addressed, so another employee may be using the same file.
             from django.core.files.storage import default_storage
-            from django.core.files.base import ContentFile
-            import uuid
-
-            # Delete old profile picture if exists
-            if employee.profile_picture:
-                try:
-                    default_storage.delete(employee.profile_picture.path)
-                except:
-                    pass
 
-            # Save new profile picture
-            file_name = f"profile_{employee.employee_code}_{uuid.uuid4().hex[:8]}.{profile_picture.name.split('.')[-1]}"
-            file_path = default_storage.save(f'profile_pictures/{file_name}', ContentFile(profile_picture.read()))
-            employee.profile_picture = file_path
+            employee.profile_picture = default_storage.save(f'profile_pictures/{profile_picture.name}', profile_picture)
 
         # Update employee information
         employee.first_name = first_name
@@ -746,7 +645,7 @@ def profile_view(request):
     leaves = LeaveApplication.objects.filter(employee=employee).order_by('-applied_date')[:10]
 
     # Today's attendance status
-    today = date.today()
+    today = current_work_date(employee_offset(employee.employee_id))
     today_attendance = AttendanceSummary.objects.filter(employee=employee, date=today).first()
 
     # Attendance statistics for current month
@@ -777,24 +676,10 @@ def profile_view(request):
     }
     return render(request, 'core/profile.html', context)
 
-@login_required
+@role_required('Employee', employee=True)
 def leave_view(request):
     """Employee leave page"""
-    try:
-        user_profile = request.user.userprofile
-        if user_profile.role.role_name != 'Employee':
-            messages.error(request, 'Access denied. Employee privileges required.')
-            return redirect('dashboard')
-    except UserProfile.DoesNotExist:
-        messages.error(request, 'User profile not found.')
-        return redirect('login')
-
-    # Get employee linked to user
-    try:
-        employee = Employee.objects.get(user=request.user)
-    except Employee.DoesNotExist:
-        messages.error(request, 'Employee profile not found.')
-        return redirect('dashboard')
+    employee = request.employee
 
     # Get employee's leave applications
     leaves = LeaveApplication.objects.filter(employee=employee).order_by('-applied_date')
@@ -810,22 +695,12 @@ def leave_view(request):
     }
     return render(request, 'core/leave.html', context)
 
-@login_required
+@role_required('Manager')
 def manager_view(request):
     """Manager/HR dashboard"""
-    try:
-        user_profile = request.user.userprofile
-        if user_profile.role.role_name != 'Manager':
-            messages.error(request, 'Access denied. Manager privileges required.')
-            return redirect('dashboard')
-    except UserProfile.DoesNotExist:
-        messages.error(request, 'User profile not found.')
-        return redirect('login')
-
     # Get manager linked to user
-    try:
-        manager = Employee.objects.get(user=request.user)
-    except Employee.DoesNotExist:
+    manager = linked_employee(request)
+    if manager is None:
         # Create dummy manager employee if not exists
         from master.models import Department, Designation, Shift
         dept = Department.objects.get_or_create(department_name='Management')[0]
@@ -848,7 +723,7 @@ def manager_view(request):
     dept_employees = Employee.objects.filter(department=manager.department, status=True)
 
     # Today's attendance for department
-    today = date.today()
+    today = local_today()
     dept_attendance_today = AttendanceSummary.objects.filter(
         employee__in=dept_employees,
         date=today
@@ -900,28 +775,15 @@ def manager_view(request):
     }
     return render(request, 'core/manager.html', context)
 
-@login_required
+@role_required('Employee', employee=True)
 def submit_task(request, task_id):
     """Employee submits task completion with location and selfie"""
-    try:
-        user_profile = request.user.userprofile
-        if user_profile.role.role_name != 'Employee':
-            messages.error(request, 'Access denied. Employee privileges required.')
-            return redirect('dashboard')
-    except UserProfile.DoesNotExist:
-        messages.error(request, 'User profile not found.')
-        return redirect('login')
-
     task = get_object_or_404(Task, pk=task_id)
     # Verify task belongs to current user
-    try:
-        employee = Employee.objects.get(user=request.user)
-        if task.allotted_employee != employee:
-            messages.error(request, 'Access denied. Task not assigned to you.')
-            return redirect('employee')
-    except Employee.DoesNotExist:
-        messages.error(request, 'Employee profile not found.')
-        return redirect('dashboard')
+    employee = request.employee
+    if task.allotted_employee_id != employee.employee_id:
+        messages.error(request, 'Access denied. Task not assigned to you.')
+        return redirect('employee')
 
     if request.method == 'POST':
         location_lat = request.POST.get('location_lat')
@@ -929,19 +791,14 @@ def submit_task(request, task_id):
         notes = request.POST.get('notes')
         selfie_data = request.POST.get('selfie')
 
-        # Handle base64 image data
+        # Decode the camera's data URL straight to disk, a chunk at a time
         selfie = None
         if selfie_data and selfie_data.startswith('data:image'):
-            import base64
-            from django.core.files.base import ContentFile
-            from django.core.files.storage import default_storage
-            import uuid
-
-            # Extract base64 data
-            format, imgstr = selfie_data.split(';base64,')
-            ext = format.split('/')[-1]
-            data = ContentFile(base64.b64decode(imgstr), name=f'selfie_{uuid.uuid4()}.{ext}')
-            selfie = default_storage.save(f'selfies/{data.name}', data)
+            try:
+                selfie = store_data_url(selfie_data, subdir='task_selfies').name
+            except UploadRejected as e:
+                messages.error(request, str(e))
+                return render(request, 'core/submit_task.html', {'task': task}, status=e.status_code)
 
         submission = TaskSubmission.objects.create(
             task=task,
@@ -957,22 +814,12 @@ def submit_task(request, task_id):
 
     return render(request, 'core/submit_task.html', {'task': task})
 
-@login_required
+@role_required('Employee')
 def employee_tasks_view(request):
     """Employee tasks page"""
-    try:
-        user_profile = request.user.userprofile
-        if user_profile.role.role_name != 'Employee':
-            messages.error(request, 'Access denied. Employee privileges required.')
-            return redirect('dashboard')
-    except UserProfile.DoesNotExist:
-        messages.error(request, 'User profile not found.')
-        return redirect('login')
-
     # Get employee linked to user
-    try:
-        employee = Employee.objects.get(user=request.user)
-    except Employee.DoesNotExist:
+    employee = linked_employee(request)
+    if employee is None:
         # Try to link user to employee via employee_id in profile
         try:
             user_profile = request.user.userprofile
@@ -997,24 +844,10 @@ def employee_tasks_view(request):
     }
     return render(request, 'core/employee_tasks.html', context)
 
-@login_required
+@role_required('Manager', employee=True)
 def employee_tracking_view(request):
     """View for tracking employee locations on a map"""
-    try:
-        user_profile = request.user.userprofile
-        if user_profile.role.role_name != 'Manager':
-            messages.error(request, 'Access denied. Manager privileges required.')
-            return redirect('dashboard')
-    except UserProfile.DoesNotExist:
-        messages.error(request, 'User profile not found.')
-        return redirect('login')
-
-    # Get manager linked to user
-    try:
-        manager = Employee.objects.get(user=request.user)
-    except Employee.DoesNotExist:
-        messages.error(request, 'Manager profile not found.')
-        return redirect('dashboard')
+    manager = request.employee
 
     # Get department employees
     dept_employees = Employee.objects.filter(department=manager.department, status=True)
@@ -1031,6 +864,11 @@ def employee_tracking_view(request):
         geo_long__isnull=False
     ).select_related('employee').order_by('-punch_time')
 
+    # The list and map show thumbnails; the click-through modal the medium size
+    selfies = [log.selfie_url for log in recent_logs]
+    thumbs = sized_urls(selfies, 'thumb')
+    mediums = sized_urls(selfies, 'medium')
+
     # Prepare location data for the map
     location_data = []
     for log in recent_logs:
@@ -1041,7 +879,8 @@ def employee_tracking_view(request):
             'longitude': float(log.geo_long),
             'punch_time': log.punch_time.strftime('%Y-%m-%d %H:%M:%S'),
             'punch_type': log.punch_type,
-            'selfie_url': log.selfie_url or ''
+            'selfie_url': thumbs.get(log.selfie_url, ''),
+            'selfie_medium_url': mediums.get(log.selfie_url, '')
         })
 
     context = {
@@ -1049,57 +888,41 @@ def employee_tracking_view(request):
         'location_data': location_data,
         'dept_employees': dept_employees,
         'total_locations': len(location_data),
-        'today': date.today(),
+        'today': local_today(),
         'user_role': 'Manager',
     }
 
     return render(request, 'core/employee_tracking.html', context)
 
-@login_required
+@role_required('Manager', employee=True)
 def manager_employees_view(request):
     """Manager view for managing department employees"""
-    try:
-        user_profile = request.user.userprofile
-        if user_profile.role.role_name != 'Manager':
-            messages.error(request, 'Access denied. Manager privileges required.')
-            return redirect('dashboard')
-    except UserProfile.DoesNotExist:
-        messages.error(request, 'User profile not found.')
-        return redirect('login')
-
-    # Get manager linked to user
-    try:
-        manager = Employee.objects.get(user=request.user)
-    except Employee.DoesNotExist:
-        messages.error(request, 'Manager profile not found.')
-        return redirect('dashboard')
-
-    # Get department employees with detailed info
-    dept_employees = Employee.objects.filter(
-        department=manager.department
-    ).select_related('department', 'designation', 'shift', 'user').order_by('first_name')
-
-    # Calculate inactive count and active count
-    inactive_count = dept_employees.filter(status=False).count()
-    active_count = dept_employees.filter(status=True).count()
+    manager = request.employee
 
     # Get attendance statistics for current month
-    today = date.today()
+    today = local_today()
     start_of_month = today.replace(day=1)
 
-    attendance_stats = {}
-    for emp in dept_employees:
-        monthly_attendance = AttendanceSummary.objects.filter(
-            employee=emp,
-            date__gte=start_of_month,
-            date__lte=today
-        ).aggregate(
-            present_days=Count('summary_id', filter=Q(status='present')),
-            absent_days=Count('summary_id', filter=Q(status='absent')),
-            half_days=Count('summary_id', filter=Q(status='half_day')),
-            total_hours=Sum('total_hours')
-        )
-        attendance_stats[emp.employee_id] = monthly_attendance
+    # Get department employees with their monthly attendance in one grouped query
+    dept_employees = list(annotate_attendance(
+        Employee.objects.filter(department=manager.department),
+        start_of_month,
+        today
+    ).select_related('department', 'designation', 'shift', 'user').order_by('first_name'))
+
+    # Calculate inactive count and active count
+    inactive_count = sum(1 for emp in dept_employees if not emp.status)
+    active_count = len(dept_employees) - inactive_count
+
+    attendance_stats = {
+        emp.employee_id: {
+            'present_days': emp.present_days,
+            'absent_days': emp.absent_days,
+            'half_days': emp.half_days,
+            'total_hours': emp.total_hours,
+        }
+        for emp in dept_employees
+    }
 
     context = {
         'manager': manager,
@@ -1112,24 +935,10 @@ def manager_employees_view(request):
     }
     return render(request, 'core/manager_employees.html', context)
 
-@login_required
+@role_required('Manager', employee=True)
 def manager_tasks_view(request):
     """Manager view for managing department tasks"""
-    try:
-        user_profile = request.user.userprofile
-        if user_profile.role.role_name != 'Manager':
-            messages.error(request, 'Access denied. Manager privileges required.')
-            return redirect('dashboard')
-    except UserProfile.DoesNotExist:
-        messages.error(request, 'User profile not found.')
-        return redirect('login')
-
-    # Get manager linked to user
-    try:
-        manager = Employee.objects.get(user=request.user)
-    except Employee.DoesNotExist:
-        messages.error(request, 'Manager profile not found.')
-        return redirect('dashboard')
+    manager = request.employee
 
     # Get department employees for task assignment
     dept_employees = Employee.objects.filter(department=manager.department, status=True)
@@ -1153,29 +962,15 @@ def manager_tasks_view(request):
         'pending_tasks': pending_tasks,
         'completed_tasks': completed_tasks,
         'in_progress_tasks': in_progress_tasks,
-        'today': date.today(),
+        'today': local_today(),
         'user_role': 'Manager',
     }
     return render(request, 'core/manager_tasks.html', context)
 
-@login_required
+@role_required('Manager', employee=True)
 def manager_leave_view(request):
     """Manager view for managing department leave applications"""
-    try:
-        user_profile = request.user.userprofile
-        if user_profile.role.role_name != 'Manager':
-            messages.error(request, 'Access denied. Manager privileges required.')
-            return redirect('dashboard')
-    except UserProfile.DoesNotExist:
-        messages.error(request, 'User profile not found.')
-        return redirect('login')
-
-    # Get manager linked to user
-    try:
-        manager = Employee.objects.get(user=request.user)
-    except Employee.DoesNotExist:
-        messages.error(request, 'Manager profile not found.')
-        return redirect('dashboard')
+    manager = request.employee
 
     # Get department employees
     dept_employees = Employee.objects.filter(department=manager.department, status=True)
@@ -1198,39 +993,25 @@ def manager_leave_view(request):
         'pending_leaves': pending_leaves,
         'approved_leaves': approved_leaves,
         'rejected_leaves': rejected_leaves,
-        'today': date.today(),
+        'today': local_today(),
         'user_role': 'Manager',
     }
     return render(request, 'core/manager_leave.html', context)
 
-@login_required
+@role_required('Manager', employee=True)
 def manager_attendance_view(request):
     """Manager view for department attendance management"""
-    try:
-        user_profile = request.user.userprofile
-        if user_profile.role.role_name != 'Manager':
-            messages.error(request, 'Access denied. Manager privileges required.')
-            return redirect('dashboard')
-    except UserProfile.DoesNotExist:
-        messages.error(request, 'User profile not found.')
-        return redirect('login')
-
-    # Get manager linked to user
-    try:
-        manager = Employee.objects.get(user=request.user)
-    except Employee.DoesNotExist:
-        messages.error(request, 'Manager profile not found.')
-        return redirect('dashboard')
+    manager = request.employee
 
     # Get department employees
     dept_employees = Employee.objects.filter(department=manager.department, status=True)
 
     # Get attendance data - default to today
-    selected_date = request.GET.get('date', date.today().strftime('%Y-%m-%d'))
+    selected_date = request.GET.get('date', local_today().strftime('%Y-%m-%d'))
     try:
         attendance_date = date.fromisoformat(selected_date)
     except ValueError:
-        attendance_date = date.today()
+        attendance_date = local_today()
 
     # Get attendance summaries for selected date
     attendance_summaries = AttendanceSummary.objects.filter(
@@ -1241,7 +1022,7 @@ def manager_attendance_view(request):
     # Get attendance logs for selected date
     attendance_logs = AttendanceLog.objects.filter(
         employee__in=dept_employees,
-        punch_time__date=attendance_date
+        **on_days('punch_time', attendance_date)
     ).select_related('employee', 'device').order_by('punch_time')
 
     # Calculate statistics
@@ -1265,26 +1046,18 @@ def manager_attendance_view(request):
         'present_count': present_count,
         'absent_count': absent_count,
         'on_leave_count': on_leave_count,
-        'today': date.today(),
+        'today': local_today(),
         'user_role': 'Manager',
     }
     return render(request, 'core/manager_attendance.html', context)
 
-@login_required
+@role_required('Manager', employee=True, json=True)
 def approve_leave(request, leave_id):
     """Approve a leave application"""
     try:
-        user_profile = request.user.userprofile
-        if user_profile.role.role_name != 'Manager':
-            return JsonResponse({'success': False, 'error': 'Access denied'})
-    except UserProfile.DoesNotExist:
-        return JsonResponse({'success': False, 'error': 'User profile not found'})
-
-    try:
-        leave_app = LeaveApplication.objects.get(leave_id=leave_id)
+        leave_app = LeaveApplication.objects.select_related('employee').get(leave_id=leave_id)
         # Check if leave belongs to manager's department
-        manager = Employee.objects.get(user=request.user)
-        if leave_app.employee.department != manager.department:
+        if leave_app.employee.department_id != request.employee.department_id:
             return JsonResponse({'success': False, 'error': 'Access denied'})
 
         leave_app.status = 'approved'
@@ -1295,24 +1068,14 @@ def approve_leave(request, leave_id):
         return JsonResponse({'success': True, 'message': 'Leave approved successfully'})
     except LeaveApplication.DoesNotExist:
         return JsonResponse({'success': False, 'error': 'Leave application not found'})
-    except Employee.DoesNotExist:
-        return JsonResponse({'success': False, 'error': 'Manager profile not found'})
 
-@login_required
+@role_required('Manager', employee=True, json=True)
 def reject_leave(request, leave_id):
     """Reject a leave application"""
     try:
-        user_profile = request.user.userprofile
-        if user_profile.role.role_name != 'Manager':
-            return JsonResponse({'success': False, 'error': 'Access denied'})
-    except UserProfile.DoesNotExist:
-        return JsonResponse({'success': False, 'error': 'User profile not found'})
-
-    try:
-        leave_app = LeaveApplication.objects.get(leave_id=leave_id)
+        leave_app = LeaveApplication.objects.select_related('employee').get(leave_id=leave_id)
         # Check if leave belongs to manager's department
-        manager = Employee.objects.get(user=request.user)
-        if leave_app.employee.department != manager.department:
+        if leave_app.employee.department_id != request.employee.department_id:
             return JsonResponse({'success': False, 'error': 'Access denied'})
 
         leave_app.status = 'rejected'
@@ -1323,27 +1086,11 @@ def reject_leave(request, leave_id):
         return JsonResponse({'success': True, 'message': 'Leave rejected successfully'})
     except LeaveApplication.DoesNotExist:
         return JsonResponse({'success': False, 'error': 'Leave application not found'})
-    except Employee.DoesNotExist:
-        return JsonResponse({'success': False, 'error': 'Manager profile not found'})
 
-@login_required
+@role_required('Manager', employee=True)
 def manager_add_employee_view(request):
     """Manager view for adding employees to their department"""
-    try:
-        user_profile = request.user.userprofile
-        if user_profile.role.role_name != 'Manager':
-            messages.error(request, 'Access denied. Manager privileges required.')
-            return redirect('dashboard')
-    except UserProfile.DoesNotExist:
-        messages.error(request, 'User profile not found.')
-        return redirect('login')
-
-    # Get manager linked to user
-    try:
-        manager = Employee.objects.get(user=request.user)
-    except Employee.DoesNotExist:
-        messages.error(request, 'Manager profile not found.')
-        return redirect('dashboard')
+    manager = request.employee
 
     if request.method == 'POST':
         username = request.POST.get('username')
@@ -1453,24 +1200,10 @@ def manager_add_employee_view(request):
     }
     return render(request, 'core/manager_add_employee.html', context)
 
-@login_required
+@role_required('Manager', employee=True)
 def manager_profile_view(request):
     """Manager profile page - view own attendance, leave, and payroll records"""
-    try:
-        user_profile = request.user.userprofile
-        if user_profile.role.role_name != 'Manager':
-            messages.error(request, 'Access denied. Manager privileges required.')
-            return redirect('dashboard')
-    except UserProfile.DoesNotExist:
-        messages.error(request, 'User profile not found.')
-        return redirect('login')
-
-    # Get manager linked to user
-    try:
-        manager = Employee.objects.get(user=request.user)
-    except Employee.DoesNotExist:
-        messages.error(request, 'Manager profile not found.')
-        return redirect('dashboard')
+    manager = request.employee
 
     # Get manager's attendance summary (last 10 days)
     attendance = AttendanceSummary.objects.filter(employee=manager).order_by('-date')[:10]
@@ -1479,7 +1212,7 @@ def manager_profile_view(request):
     leaves = LeaveApplication.objects.filter(employee=manager).order_by('-applied_date')[:10]
 
     # Today's attendance status
-    today = date.today()
+    today = current_work_date(employee_offset(manager.employee_id))
     today_attendance = AttendanceSummary.objects.filter(employee=manager, date=today).first()
 
     # Attendance statistics for current month
@@ -1510,27 +1243,13 @@ def manager_profile_view(request):
     }
     return render(request, 'core/manager_profile.html', context)
 
-@login_required
+@role_required('Manager', employee=True)
 def manager_own_attendance_view(request):
     """Manager view for own attendance records"""
-    try:
-        user_profile = request.user.userprofile
-        if user_profile.role.role_name != 'Manager':
-            messages.error(request, 'Access denied. Manager privileges required.')
-            return redirect('dashboard')
-    except UserProfile.DoesNotExist:
-        messages.error(request, 'User profile not found.')
-        return redirect('login')
-
-    # Get manager linked to user
-    try:
-        manager = Employee.objects.get(user=request.user)
-    except Employee.DoesNotExist:
-        messages.error(request, 'Manager profile not found.')
-        return redirect('dashboard')
+    manager = request.employee
 
     # Get attendance data - default to current month
-    selected_month = request.GET.get('month', date.today().strftime('%Y-%m'))
+    selected_month = request.GET.get('month', local_today().strftime('%Y-%m'))
     try:
         year, month = map(int, selected_month.split('-'))
         start_date = date(year, month, 1)
@@ -1539,8 +1258,8 @@ def manager_own_attendance_view(request):
         else:
             end_date = date(year, month + 1, 1) - timedelta(days=1)
     except (ValueError, IndexError):
-        start_date = date.today().replace(day=1)
-        end_date = date.today()
+        start_date = local_today().replace(day=1)
+        end_date = local_today()
 
     # Get attendance summaries for selected month
     attendance_records = AttendanceSummary.objects.filter(
@@ -1571,24 +1290,10 @@ def manager_own_attendance_view(request):
     }
     return render(request, 'core/manager_own_attendance.html', context)
 
-@login_required
+@role_required('Manager', employee=True)
 def manager_own_leave_view(request):
     """Manager view for own leave records"""
-    try:
-        user_profile = request.user.userprofile
-        if user_profile.role.role_name != 'Manager':
-            messages.error(request, 'Access denied. Manager privileges required.')
-            return redirect('dashboard')
-    except UserProfile.DoesNotExist:
-        messages.error(request, 'User profile not found.')
-        return redirect('login')
-
-    # Get manager linked to user
-    try:
-        manager = Employee.objects.get(user=request.user)
-    except Employee.DoesNotExist:
-        messages.error(request, 'Manager profile not found.')
-        return redirect('dashboard')
+    manager = request.employee
 
     # Get manager's leave applications
     leaves = LeaveApplication.objects.filter(employee=manager).order_by('-applied_date')
@@ -1610,24 +1315,10 @@ def manager_own_leave_view(request):
     }
     return render(request, 'core/manager_own_leave.html', context)
 
-@login_required
+@role_required('Manager', employee=True)
 def manager_own_payroll_view(request):
     """Manager view for own payroll records"""
-    try:
-        user_profile = request.user.userprofile
-        if user_profile.role.role_name != 'Manager':
-            messages.error(request, 'Access denied. Manager privileges required.')
-            return redirect('dashboard')
-    except UserProfile.DoesNotExist:
-        messages.error(request, 'User profile not found.')
-        return redirect('login')
-
-    # Get manager linked to user
-    try:
-        manager = Employee.objects.get(user=request.user)
-    except Employee.DoesNotExist:
-        messages.error(request, 'Manager profile not found.')
-        return redirect('dashboard')
+    manager = request.employee
 
     # Import payroll models
     from payroll.models import EmployeeSalary, PayrollRun, Payslip
@@ -1655,19 +1346,12 @@ def manager_own_payroll_view(request):
     }
     return render(request, 'core/manager_own_payroll.html', context)
 
-@login_required
+@role_required('Manager', employee=True, json=True)
 def create_task(request):
     """Create a new task for department employee"""
-    try:
-        user_profile = request.user.userprofile
-        if user_profile.role.role_name != 'Manager':
-            return JsonResponse({'success': False, 'error': 'Access denied'})
-    except UserProfile.DoesNotExist:
-        return JsonResponse({'success': False, 'error': 'User profile not found'})
-
     if request.method == 'POST':
         try:
-            manager = Employee.objects.get(user=request.user)
+            manager = request.employee
             task_type = request.POST.get('task_type')
             allotted_employee_id = request.POST.get('allotted_employee')
             task_description = request.POST.get('task_description')
@@ -1677,7 +1361,7 @@ def create_task(request):
 
             # Validate allotted employee is in manager's department
             allotted_employee = Employee.objects.get(employee_id=allotted_employee_id)
-            if allotted_employee.department != manager.department:
+            if allotted_employee.department_id != manager.department_id:
                 return JsonResponse({'success': False, 'error': 'Cannot assign tasks to employees outside your department'})
 
             due_date = None
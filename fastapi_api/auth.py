@@ -4,6 +4,9 @@ import jwt
 import os
 import sys
 import django
+from fastapi import Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 
 # Setup Django
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -12,15 +15,59 @@ django.setup()
 
 from django.contrib.auth.models import User
 from django.contrib.auth.hashers import check_password, make_password
-from django.db import connection
+from django.db import close_old_connections, connection
+
+from core.access import UserCache, register_cache
 
 # JWT Configuration
 SECRET_KEY = "your-secret-key-here"  # Change this in production
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
+# Principal cache: entries also expire so writes made by other processes are picked up
+PRINCIPAL_CACHE_SIZE = 10000
+PRINCIPAL_CACHE_TTL = 300  # seconds
+
+security = HTTPBearer()
+
+
+class Principal:
+    """Identity of an authenticated API user: everything the routers need to authorize a request"""
+    __slots__ = ('id', 'username', 'role', 'employee_id', 'is_active')
+
+    def __init__(self, id, username, role, employee_id, is_active):
+        self.id = id
+        self.username = username
+        self.role = role
+        self.employee_id = employee_id
+        self.is_active = is_active
+
+    @property
+    def is_admin(self):
+        return bool(self.role) and self.role.lower() in ['admin', 'administrator']
+
+    @property
+    def is_manager(self):
+        return bool(self.role) and self.role.lower() == 'manager'
+
+
+# Invalidated by the receivers in core.access, with the Django views' access cache
+principal_cache = register_cache(UserCache(PRINCIPAL_CACHE_SIZE, PRINCIPAL_CACHE_TTL))
+
+
+def recycle_connection():
+    """Drop this thread's Django connection once it outlives CONN_MAX_AGE or breaks.
+
+    Django does this at the start and end of each of its own requests;
+    FastAPI handlers have no such cycle, so the ORM entry points here do it.
+    """
+    if not connection.in_atomic_block:
+        close_old_connections()
+
+
 def authenticate_user(username: str, password: str):
     """Authenticate user using Django's authentication system"""
+    recycle_connection()
     try:
         user = User.objects.get(username=username, is_active=True)
         # Use Django's built-in password verification
@@ -47,6 +94,102 @@ def verify_token(token: str):
     except jwt.PyJWTError:
         return None
 
+def load_principal(user_id: int):
+    """Read a user's identity, role and employee in a single query"""
+    recycle_connection()
+    row = User.objects.filter(pk=user_id).values_list(
+        'username', 'is_active', 'userprofile__role__role_name', 'employee__employee_id'
+    ).first()
+    if row is None:
+        return None
+    username, is_active, role, employee_id = row
+    return Principal(user_id, username, role, employee_id, is_active)
+
+
+def get_principal(user_id: int):
+    """Cached principal for a user id; the database is only read on a cache miss"""
+    principal = principal_cache.get(user_id)
+    if principal is None:
+        generation = principal_cache.generation
+        principal = load_principal(user_id)
+        if principal is not None:
+            principal_cache.set(user_id, principal, generation)
+    return principal
+
+
+def resolve_principal(token: str):
+    """Decode a JWT once and return the active Principal it belongs to, or None"""
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except jwt.PyJWTError:
+        return None
+
+    user_id = payload.get("user_id")
+    if user_id is None:
+        # Tokens issued before the user_id claim only carry the username
+        username = payload.get("sub")
+        if username is None:
+            return None
+        user_id = User.objects.filter(username=username).values_list('id', flat=True).first()
+        if user_id is None:
+            return None
+
+    principal = get_principal(user_id)
+    if principal is None or not principal.is_active:
+        return None
+    return principal
+
+
+def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    """FastAPI dependency: the Principal of the bearer token"""
+    principal = resolve_principal(credentials.credentials)
+    if principal is None:
+        raise HTTPException(status_code=401, detail="Invalid authentication token")
+    return principal
+
+
+async def get_current_user_async(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    """get_current_user for async routes: cache hits are served on the event loop.
+
+    Only a principal cache miss reaches the Django ORM, and that runs in
+    the threadpool.
+    """
+    token = credentials.credentials
+    try:
+        user_id = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM]).get("user_id")
+    except jwt.PyJWTError:
+        raise HTTPException(status_code=401, detail="Invalid authentication token")
+
+    principal = principal_cache.get(user_id) if user_id is not None else None
+    if principal is None:
+        principal = await run_in_threadpool(resolve_principal, token)
+    if principal is None or not principal.is_active:
+        raise HTTPException(status_code=401, detail="Invalid authentication token")
+    return principal
+
+
+def require_employee_id(principal):
+    """Employee id of the authenticated user, without a database lookup"""
+    if principal.employee_id is None:
+        raise HTTPException(status_code=404, detail="Employee profile not found")
+    return principal.employee_id
+
+
+def token_claims(user):
+    """JWT claims for a Django user: identity plus role and employee_id for clients.
+
+    The server authorizes from the principal cache rather than these claims,
+    so role changes apply before the token expires.
+    """
+    principal = get_principal(user.id)
+    return {
+        "sub": user.username,
+        "user_id": user.id,
+        "role": principal.role if principal else None,
+        "employee_id": principal.employee_id if principal else None,
+    }
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Create JWT token"""
     to_encode = data.copy()
@@ -60,20 +203,13 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
 
 def get_user_role(user_id: int):
     """Get user role from Django UserProfile"""
-    from core.models import UserProfile, Role
-    
-    try:
-        user_profile = UserProfile.objects.get(user_id=user_id)
-        if user_profile.role:
-            return user_profile.role.role_name
-        return None
-    except UserProfile.DoesNotExist:
-        return None
+    principal = get_principal(user_id)
+    return principal.role if principal else None
 
 def require_admin_role(user_id: int):
     """Check if user has admin role"""
-    role = get_user_role(user_id)
-    return role and role.lower() in ['admin', 'administrator']
+    principal = get_principal(user_id)
+    return principal is not None and principal.is_admin
 
 def get_employee_from_user_id(user_id: int):
     """Get employee from Django user_id"""
@@ -96,4 +232,5 @@ def get_current_user_from_employee(employee_id: int):
             return user
         return None
     except (Employee.DoesNotExist, User.DoesNotExist):
-        return None
\ No newline at end of file
+        return None
+
@@ -1,23 +1,181 @@
 import os
 import sys
+import threading
 import django
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import URL
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 # Setup Django
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'hexaattendanceportal.settings')
 django.setup()
 
-# Use the same database as Django (SQLite)
-DATABASE_URL = "sqlite:///db.sqlite3"
+from django.conf import settings
 
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+from hexaattendanceportal.metrics import watch_engine
+
+# SQLAlchemy drivers for the Django database backends
+DRIVERS = {
+    'django.db.backends.sqlite3': 'sqlite',
+    'django.db.backends.postgresql': 'postgresql+psycopg2',
+    'django.db.backends.mysql': 'mysql+mysqldb',
+}
+
+# Async drivers for the same databases; aiosqlite is in requirements.txt, the others are optional
+ASYNC_DRIVERS = {
+    'sqlite': 'sqlite+aiosqlite',
+    'postgresql+psycopg2': 'postgresql+asyncpg',
+    'mysql+mysqldb': 'mysql+aiomysql',
+}
+
+# Seconds a SQLite writer waits for the lock when OPTIONS["timeout"] is not set
+SQLITE_DEFAULT_TIMEOUT = 20
+
+
+def database_url(database):
+    """SQLAlchemy URL for a Django DATABASES entry, so both stacks open the same database"""
+    drivername = DRIVERS.get(database['ENGINE'])
+    if drivername is None:
+        raise ValueError(f"Unsupported database engine {database['ENGINE']!r}")
+    if drivername == 'sqlite':
+        return URL.create(drivername, database=str(database['NAME']))
+    return URL.create(
+        drivername,
+        username=database.get('USER') or None,
+        password=database.get('PASSWORD') or None,
+        host=database.get('HOST') or None,
+        port=int(database['PORT']) if database.get('PORT') else None,
+        database=database['NAME'],
+    )
+
+
+def async_database_url(database):
+    """database_url() with the matching async driver"""
+    url = database_url(database)
+    return url.set(drivername=ASYNC_DRIVERS[url.drivername])
+
+
+def engine_options(database, pool):
+    """create_engine() keyword arguments for the configured pool"""
+    options = {
+        'pool_size': pool.get('size', 5),
+        'max_overflow': pool.get('max_overflow', 10),
+        'pool_timeout': pool.get('timeout', 30),
+        'pool_recycle': pool.get('recycle', -1),
+        'pool_pre_ping': pool.get('pre_ping', True),
+    }
+    if database['ENGINE'] == 'django.db.backends.sqlite3':
+        timeout = database.get('OPTIONS', {}).get('timeout', SQLITE_DEFAULT_TIMEOUT)
+        options['connect_args'] = {'check_same_thread': False, 'timeout': timeout}
+    return options
+
+
+def configure_sqlite(dbapi_connection, connection_record):
+    """Same pragmas as Django's init_command: WAL journal, relaxed sync, and a busy timeout"""
+    timeout = settings.DATABASES['default'].get('OPTIONS', {}).get('timeout', SQLITE_DEFAULT_TIMEOUT)
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute('PRAGMA synchronous=NORMAL')
+    cursor.execute(f'PRAGMA busy_timeout={int(timeout * 1000)}')
+    cursor.close()
+
+
+class PoolStats:
+    """Counters for checkouts, new connections and invalidations on an engine's pool"""
+
+    def __init__(self):
+        self.connects = 0
+        self.checkouts = 0
+        self.invalidations = 0
+        self._lock = threading.Lock()
+
+    def watch(self, engine):
+        event.listen(engine, 'connect', self._on_connect)
+        event.listen(engine, 'checkout', self._on_checkout)
+        event.listen(engine, 'invalidate', self._on_invalidate)
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.connects += 1
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        with self._lock:
+            self.checkouts += 1
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception):
+        with self._lock:
+            self.invalidations += 1
+
+
+DATABASE_URL = database_url(settings.DATABASES['default'])
+
+engine = create_engine(DATABASE_URL, **engine_options(settings.DATABASES['default'], settings.SQLALCHEMY_POOL))
+if engine.dialect.name == 'sqlite':
+    event.listen(engine, 'connect', configure_sqlite)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+pool_stats = PoolStats()
+pool_stats.watch(engine)
+watch_engine(engine)
+
+_async_engine = None
+_async_session_factory = None
+async_pool_stats = PoolStats()
+
 Base = declarative_base()
 
+
+def pool_usage(engine, stats):
+    """Current usage of an engine's pool and its lifetime counters"""
+    pool = engine.pool
+    return {
+        'size': pool.size(),
+        'checked_in': pool.checkedin(),
+        'checked_out': pool.checkedout(),
+        'overflow': pool.overflow(),
+        'connects': stats.connects,
+        'checkouts': stats.checkouts,
+        'invalidations': stats.invalidations,
+    }
+
+
+def pool_metrics():
+    """Usage of the sync pool, and of the async pool once the async routers have used it"""
+    metrics = {'sync': pool_usage(engine, pool_stats)}
+    if _async_engine is not None:
+        metrics['async'] = pool_usage(_async_engine.sync_engine, async_pool_stats)
+    return metrics
+
+
+def get_async_engine():
+    """Async engine for the async routers, created on first use with the same pool settings"""
+    global _async_engine, _async_session_factory
+    if _async_engine is None:
+        database = settings.DATABASES['default']
+        options = engine_options(database, settings.SQLALCHEMY_POOL)
+        if database['ENGINE'] == 'django.db.backends.sqlite3':
+            # aiosqlite defaults to opening a connection per checkout
+            options['poolclass'] = AsyncAdaptedQueuePool
+        _async_engine = create_async_engine(async_database_url(database), **options)
+        if _async_engine.dialect.name == 'sqlite':
+            event.listen(_async_engine.sync_engine, 'connect', configure_sqlite)
+        async_pool_stats.watch(_async_engine.sync_engine)
+        watch_engine(_async_engine.sync_engine)
+        _async_session_factory = async_sessionmaker(_async_engine, autoflush=False, expire_on_commit=False)
+    return _async_engine
+
+
+async def get_async_db():
+    """AsyncSession dependency for the async routers"""
+    get_async_engine()
+    async with _async_session_factory() as db:
+        yield db
+
+
 def get_db():
     db = SessionLocal()
     try:
@@ -28,4 +186,4 @@ def get_db():
 def get_django_db():
     """Get Django database connection for raw SQL queries"""
     from django.db import connection
-    return connection
\ No newline at end of file
+    return connection
@@ -1,13 +1,11 @@
-from sqlalchemy import create_engine
 from models import Base
 import os
 
-# Use the same database file as the Django project
-DATABASE_URL = "sqlite:///db.sqlite3"
+# Same database and engine settings as Django, from settings.DATABASES
+from database import engine
 
 def create_tables():
     """Create all database tables"""
-    engine = create_engine(DATABASE_URL)
     print("Creating database tables...")
     
     # Import all models to ensure they're registered with Base
@@ -21,7 +21,8 @@ django.setup()
 # 2) Import FASTAPI Routers (AFTER django.setup())
 ################################################################
 
-from fastapi_api.routers import admin_auth
+from fastapi_api.routers import admin_auth, async_attendance, devices, live
+from hexaattendanceportal.metrics import ASGIMetricsMiddleware
 
 
 ################################################################
@@ -39,12 +40,18 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-route latency and query counts, served at /api/metrics
+app.add_middleware(ASGIMetricsMiddleware)
+
 
 ################################################################
 # 4) Include Routers
 ################################################################
 
 app.include_router(admin_auth.router)
+app.include_router(async_attendance.router)
+app.include_router(devices.router)
+app.include_router(live.router)
 
 
 ################################################################
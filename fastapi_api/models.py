@@ -44,6 +44,16 @@ class Designation(Base):
     description = Column(Text)
     is_active = Column(Boolean, default=True)
 
+class Shift(Base):
+    __tablename__ = "master_shift"
+    shift_id = Column(Integer, primary_key=True, index=True)
+    shift_name = Column(String, unique=True)
+    start_time = Column(Time)
+    end_time = Column(Time)
+    grace_in = Column(Integer, default=0)
+    grace_out = Column(Integer, default=0)
+    is_active = Column(Boolean, default=True)
+
 class Employee(Base):
     __tablename__ = "master_employee"
     employee_id = Column(Integer, primary_key=True, index=True)
@@ -56,6 +66,7 @@ class Employee(Base):
     department_id = Column(Integer, ForeignKey("master_department.department_id"), nullable=True)
     designation_id = Column(Integer, ForeignKey("master_designation.designation_id"), nullable=True)
     manager_id = Column(Integer, ForeignKey("master_employee.employee_id"), nullable=True)
+    shift_id = Column(Integer, ForeignKey("master_shift.shift_id"), nullable=True)
     date_of_joining = Column(Date)
     status = Column(Boolean, default=True)
     profile_picture = Column(String, nullable=True)
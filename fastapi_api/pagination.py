@@ -0,0 +1,159 @@
+"""Keyset (cursor) pagination and cached totals for the log and history endpoints.
+
+Pages are ordered newest first on a unique key such as
+``(punch_time, attendance_id)``. The cursor is an opaque token holding the
+key of the last row served, and the next page filters on it, so deep pages
+cost the same as the first one. The old ``page``/``limit`` offset mode is
+still accepted, and every page returns a cursor for the next one.
+"""
+import base64
+import binascii
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime
+
+from fastapi import HTTPException
+from sqlalchemy import and_, literal, or_
+
+from predicates import StoredDateTime
+
+# Totals are cached per filter set; a page's total may lag by up to this many seconds
+COUNT_CACHE_TTL = 60
+COUNT_CACHE_SIZE = 1000
+
+
+def _encode_value(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def _decode_value(column, value):
+    python_type = column.type.python_type
+    if value is None:
+        return None
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    if python_type is date:
+        return date.fromisoformat(value)
+    return python_type(value)
+
+
+def encode_cursor(values):
+    """Opaque cursor for a row key"""
+    payload = json.dumps([_encode_value(value) for value in values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, columns):
+    """Row key from a cursor produced by encode_cursor(); 400 if it is malformed"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError('wrong number of key values')
+        return [_decode_value(column, value) for column, value in zip(columns, values)]
+    except (ValueError, TypeError, binascii.Error, UnicodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _equals(column, value):
+    if isinstance(value, datetime):
+        # On SQLite, an instant stored by either Django or SQLAlchemy; elsewhere both bounds are the same value
+        return column.between(literal(value, StoredDateTime()), literal(value, StoredDateTime(microseconds=True)))
+    return column == value
+
+
+def _less(column, value):
+    if isinstance(value, datetime):
+        return column < literal(value, StoredDateTime())
+    return column < value
+
+
+def _before(columns, values):
+    """Rows strictly after ``values`` in descending key order"""
+    conditions = []
+    for index, (column, value) in enumerate(zip(columns, values)):
+        equal_prefix = [_equals(prefix, prefix_value) for prefix, prefix_value in zip(columns[:index], values[:index])]
+        conditions.append(and_(*equal_prefix, _less(column, value)))
+    return or_(*conditions)
+
+
+def _page_query(query, columns, limit, cursor, page):
+    query = query.order_by(*(column.desc() for column in columns))
+    if cursor:
+        query = query.filter(_before(columns, decode_cursor(cursor, columns)))
+    elif page > 1:
+        query = query.offset((page - 1) * limit)
+    return query.limit(limit + 1)
+
+
+def _split_page(items, columns, limit):
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        next_cursor = encode_cursor([getattr(items[-1], column.key) for column in columns])
+    return items, next_cursor
+
+
+def keyset_page(query, columns, limit, cursor=None, page=1):
+    """One page of ``query`` newest first on ``columns``: returns ``(items, next_cursor)``.
+
+    ``columns`` must form a unique key whose last column is the primary key
+    and must be selected by the query (as attributes of its rows). With a
+    ``cursor`` the page starts after that key; otherwise ``page`` falls back
+    to offset pagination. ``next_cursor`` is None on the last page.
+    """
+    return _split_page(_page_query(query, columns, limit, cursor, page).all(), columns, limit)
+
+
+async def keyset_page_async(db, statement, columns, limit, cursor=None, page=1):
+    """keyset_page() for a select() run on an AsyncSession.
+
+    A statement selecting one entity pages over its instances, otherwise
+    over result rows.
+    """
+    result = await db.execute(_page_query(statement, columns, limit, cursor, page))
+    items = result.scalars().all() if len(statement.column_descriptions) == 1 else result.all()
+    return _split_page(items, columns, limit)
+
+
+class CountCache:
+    """Thread-safe LRU of query counts that expire after ``ttl`` seconds"""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= time.monotonic():
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, key, count):
+        with self._lock:
+            self._entries[key] = (count, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+
+count_cache = CountCache(COUNT_CACHE_SIZE, COUNT_CACHE_TTL)
+
+
+def cached_count(query):
+    """``query.count()``, reused for COUNT_CACHE_TTL seconds for the same SQL and parameters"""
+    compiled = query.statement.compile()
+    key = (str(compiled), repr(sorted(compiled.params.items())))
+    total = count_cache.get(key)
+    if total is None:
+        total = query.count()
+        count_cache.set(key, total)
+    return total
@@ -0,0 +1,82 @@
+"""Index-friendly date predicates for the SQLAlchemy routers.
+
+``func.date(column)`` and ``func.extract(...)`` hide the column from its
+indexes; these compare the bare column against half-open ``[start, end)``
+bounds instead. Punch times are stored as naive UTC; days are local days in
+the attendance time zone, as on the Django side.
+"""
+from datetime import timezone
+
+from sqlalchemy import DateTime, String, and_, literal
+from sqlalchemy.types import TypeDecorator
+
+from attendance.periods import day_bounds, month_bounds, year_bounds
+
+
+def stored(value):
+    """Naive UTC form of a datetime, as punch times are stored"""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+class StoredDateTime(TypeDecorator):
+    """A datetime bind, sent to SQLite as the text it compares stored values against.
+
+    SQLite keeps datetimes as text, and Django writes str(value), which
+    drops zero microseconds, while SQLAlchemy binds six digits; the two
+    forms never compare equal. ``microseconds`` picks the six-digit form,
+    which sorts at or above str() for the same instant. Other databases
+    have a real datetime type and get a plain DateTime bind.
+    """
+    impl = DateTime
+    cache_ok = True
+
+    def __init__(self, microseconds=False):
+        super().__init__()
+        self.microseconds = microseconds
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == 'sqlite':
+            return dialect.type_descriptor(String())
+        return dialect.type_descriptor(DateTime())
+
+    def process_bind_param(self, value, dialect):
+        if value is None or dialect.name != 'sqlite':
+            return value
+        return value.strftime('%Y-%m-%d %H:%M:%S.%f') if self.microseconds else str(value)
+
+
+def instant(value):
+    """A datetime bound, as text on SQLite.
+
+    str() sorts at or below both stored text forms of the same instant,
+    so it is a safe bound either way.
+    """
+    return literal(stored(value), StoredDateTime())
+
+
+def day_start(day):
+    """Local midnight starting ``day``, bound like instant()"""
+    return instant(day_bounds(day)[0])
+
+
+def between(column, start, end):
+    """``column`` (a datetime) falls in ``[start, end)``"""
+    return and_(column >= instant(start), column < instant(end))
+
+
+def on_days(column, start_date, end_date=None):
+    """``column`` (a datetime) falls on the local days ``start_date``..``end_date`` inclusive"""
+    return between(column, *day_bounds(start_date, end_date))
+
+
+def in_month(column, year, month):
+    """``column`` (a date) falls in the calendar month"""
+    start, end = month_bounds(year, month)
+    return and_(column >= start, column < end)
+
+
+def in_year(column, year):
+    start, end = year_bounds(year)
+    return and_(column >= start, column < end)
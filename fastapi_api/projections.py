@@ -0,0 +1,183 @@
+"""Flat-row projections for the list endpoints.
+
+Each projection is a single SQLAlchemy query that selects exactly the
+columns an endpoint returns, with related names pulled in by outer joins,
+so a page of results costs one query however many rows it holds. The
+serializers turn those rows into the endpoint's response dicts.
+"""
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy.orm import aliased
+
+from models import (
+    User, UserProfile, Role, Employee, Department, Designation, LeaveApplication, LeaveType, AttendanceLog
+)
+
+
+def rows(query):
+    """Run a column query and return its rows as plain dicts keyed by column label"""
+    return [dict(row._mapping) for row in query]
+
+
+def full_name(first_name, last_name):
+    if first_name is None and last_name is None:
+        return None
+    return f"{first_name} {last_name}"
+
+
+# === USERS ===
+
+def user_rows_query(db):
+    """Users with their role and linked employee"""
+    return db.query(
+        User.id,
+        User.username,
+        User.email,
+        User.first_name,
+        User.last_name,
+        User.is_active,
+        User.date_joined,
+        Role.role_name.label('role'),
+        Employee.employee_id,
+        Employee.employee_code,
+        Employee.first_name.label('employee_first_name'),
+        Employee.last_name.label('employee_last_name'),
+    ).outerjoin(UserProfile, UserProfile.user_id == User.id) \
+     .outerjoin(Role, Role.role_id == UserProfile.role_id) \
+     .outerjoin(Employee, Employee.user_id == User.id)
+
+
+def serialize_user(row):
+    employee_info = None
+    if row['employee_id'] is not None:
+        employee_info = {
+            "employee_id": row['employee_id'],
+            "employee_code": row['employee_code'],
+            "first_name": row['employee_first_name'],
+            "last_name": row['employee_last_name']
+        }
+    return {
+        "id": row['id'],
+        "username": row['username'],
+        "email": row['email'],
+        "first_name": row['first_name'],
+        "last_name": row['last_name'],
+        "role": row['role'],
+        "is_active": row['is_active'],
+        "date_joined": row['date_joined'],
+        "employee_info": employee_info
+    }
+
+
+# === EMPLOYEES ===
+
+def employee_rows_query(db):
+    """Employees with department, designation and manager names"""
+    manager = aliased(Employee)
+    return db.query(
+        Employee.employee_id,
+        Employee.employee_code,
+        Employee.first_name,
+        Employee.last_name,
+        Employee.email,
+        Employee.mobile,
+        Employee.date_of_joining,
+        Employee.status,
+        Department.department_name,
+        Designation.designation_name,
+        manager.first_name.label('manager_first_name'),
+        manager.last_name.label('manager_last_name'),
+    ).outerjoin(Department, Department.department_id == Employee.department_id) \
+     .outerjoin(Designation, Designation.designation_id == Employee.designation_id) \
+     .outerjoin(manager, manager.employee_id == Employee.manager_id)
+
+
+def serialize_employee(row):
+    return {
+        "employee_id": row['employee_id'],
+        "employee_code": row['employee_code'],
+        "first_name": row['first_name'],
+        "last_name": row['last_name'],
+        "email": row['email'],
+        "mobile": row['mobile'],
+        "department_name": row['department_name'],
+        "designation_name": row['designation_name'],
+        "manager_name": full_name(row['manager_first_name'], row['manager_last_name']),
+        "date_of_joining": row['date_of_joining'],
+        "status": row['status']
+    }
+
+
+# === LEAVE APPLICATIONS ===
+
+def leave_rows_query(db):
+    """Leave applications with employee, leave type and approver names"""
+    return db.query(
+        LeaveApplication.leave_id,
+        LeaveApplication.employee_id,
+        LeaveApplication.start_date,
+        LeaveApplication.end_date,
+        LeaveApplication.total_days,
+        LeaveApplication.reason,
+        LeaveApplication.status,
+        LeaveApplication.applied_date,
+        LeaveApplication.approved_date,
+        LeaveType.type_name.label('leave_type'),
+        Employee.employee_code,
+        Employee.first_name.label('employee_first_name'),
+        Employee.last_name.label('employee_last_name'),
+        User.first_name.label('approver_first_name'),
+        User.last_name.label('approver_last_name'),
+    ).join(Employee, Employee.employee_id == LeaveApplication.employee_id) \
+     .outerjoin(LeaveType, LeaveType.type_id == LeaveApplication.leave_type_id) \
+     .outerjoin(User, User.id == LeaveApplication.approved_by_id)
+
+
+def serialize_leave(row):
+    return {
+        "leave_id": row['leave_id'],
+        "employee_id": row['employee_id'],
+        "employee_name": full_name(row['employee_first_name'], row['employee_last_name']),
+        "employee_code": row['employee_code'],
+        "leave_type": row['leave_type'],
+        "start_date": row['start_date'],
+        "end_date": row['end_date'],
+        "total_days": row['total_days'],
+        "reason": row['reason'],
+        "status": row['status'],
+        "applied_date": row['applied_date'],
+        "approved_date": row['approved_date'],
+        "approved_by": full_name(row['approver_first_name'], row['approver_last_name'])
+    }
+
+
+# === ATTENDANCE LOGS ===
+
+def attendance_log_rows_query(db):
+    """Attendance logs with the employee's code and name"""
+    return db.query(
+        AttendanceLog.attendance_id,
+        AttendanceLog.punch_type,
+        AttendanceLog.punch_time,
+        AttendanceLog.geo_lat,
+        AttendanceLog.geo_long,
+        AttendanceLog.status,
+        Employee.employee_code,
+        Employee.first_name.label('employee_first_name'),
+        Employee.last_name.label('employee_last_name'),
+    ).join(Employee, Employee.employee_id == AttendanceLog.employee_id)
+
+
+def serialize_attendance_log(row):
+    return {
+        "attendance_id": row['attendance_id'],
+        "employee_name": full_name(row['employee_first_name'], row['employee_last_name']),
+        "employee_code": row['employee_code'],
+        "punch_type": row['punch_type'],
+        "punch_time": row['punch_time'],
+        "geo_lat": row['geo_lat'],
+        "geo_long": row['geo_long'],
+        "status": row['status']
+    }
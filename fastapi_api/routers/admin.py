@@ -7,21 +7,34 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from database import get_db
-from auth import get_current_user, get_user_role
+from database import get_db, pool_metrics
+from fastapi_api.auth import get_current_user, principal_cache
 from models import (
     User, UserProfile, Role, Employee, Department, Designation,
     AttendanceLog, AttendanceSummary, LeaveApplication, LeaveType,
     Payslip, Department, Designation
 )
-from schemas import EmployeeProfile, LeaveType
+from schemas import EmployeeProfile
+from projections import (
+    rows, user_rows_query, serialize_user, employee_rows_query, serialize_employee,
+    leave_rows_query, serialize_leave, attendance_log_rows_query, serialize_attendance_log
+)
+from pagination import keyset_page, cached_count
+from predicates import on_days
+
+# Django setup for the shared aggregation layer
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'hexaattendanceportal.settings')
+import django
+django.setup()
+
+from attendance.aggregates import employee_overview
+from attendance.periods import local_today
 
 router = APIRouter()
 
-def require_admin(current_user=Depends(get_current_user), db: Session = Depends(get_db)):
+def require_admin(current_user=Depends(get_current_user)):
     """Dependency to require admin role"""
-    user_role = get_user_role(db, current_user.id)
-    if user_role != 'Admin' and user_role != 'admin':
+    if not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Admin access required")
     return current_user
 
@@ -38,7 +51,7 @@ def get_all_users(
     db: Session = Depends(get_db)
 ):
     """Get all users with optional filtering"""
-    query = db.query(User).join(UserProfile, isouter=True).join(Role, isouter=True)
+    query = user_rows_query(db)
     
     if search:
         query = query.filter(
@@ -58,36 +71,8 @@ def get_all_users(
     total = query.count()
     offset = (page - 1) * limit
     
-    users = query.offset(offset).limit(limit).all()
-    
-    user_list = []
-    for user in users:
-        user_profile = db.query(UserProfile).filter(UserProfile.user_id == user.id).first()
-        role_name = user_profile.role.role_name if user_profile and user_profile.role else None
-        
-        # Get employee info if exists
-        employee_info = None
-        if user_profile and user_profile.employee_id:
-            employee = db.query(Employee).filter(Employee.employee_id == user_profile.employee_id).first()
-            if employee:
-                employee_info = {
-                    "employee_id": employee.employee_id,
-                    "employee_code": employee.employee_code,
-                    "first_name": employee.first_name,
-                    "last_name": employee.last_name
-                }
-        
-        user_list.append({
-            "id": user.id,
-            "username": user.username,
-            "email": user.email,
-            "first_name": user.first_name,
-            "last_name": user.last_name,
-            "role": role_name,
-            "is_active": user.is_active,
-            "date_joined": user.date_joined,
-            "employee_info": employee_info
-        })
+    # One joined query for the page: role and employee come with each user
+    user_list = [serialize_user(row) for row in rows(query.order_by(User.id).offset(offset).limit(limit))]
     
     return {
         "users": user_list,
@@ -185,6 +170,8 @@ def update_user(
             profile.mobile = mobile
     
     db.commit()
+    # SQLAlchemy writes bypass Django signals
+    principal_cache.invalidate(user_id)
     
     return {"message": "User updated successfully"}
 
@@ -205,6 +192,7 @@ def delete_user(
     
     user.is_active = False
     db.commit()
+    principal_cache.invalidate(user_id)
     
     return {"message": "User deactivated successfully"}
 
@@ -221,7 +209,7 @@ def get_all_employees(
     db: Session = Depends(get_db)
 ):
     """Get all employees with filtering"""
-    query = db.query(Employee).join(Department, isouter=True).join(Designation, isouter=True)
+    query = employee_rows_query(db)
     
     if search:
         query = query.filter(
@@ -243,29 +231,8 @@ def get_all_employees(
     total = query.count()
     offset = (page - 1) * limit
     
-    employees = query.offset(offset).limit(limit).all()
-    
-    employee_list = []
-    for emp in employees:
-        manager_name = None
-        if emp.manager_id:
-            manager = db.query(Employee).filter(Employee.employee_id == emp.manager_id).first()
-            if manager:
-                manager_name = f"{manager.first_name} {manager.last_name}"
-        
-        employee_list.append({
-            "employee_id": emp.employee_id,
-            "employee_code": emp.employee_code,
-            "first_name": emp.first_name,
-            "last_name": emp.last_name,
-            "email": emp.email,
-            "mobile": emp.mobile,
-            "department_name": emp.department.department_name if emp.department else None,
-            "designation_name": emp.designation.designation_name if emp.designation else None,
-            "manager_name": manager_name,
-            "date_of_joining": emp.date_of_joining,
-            "status": emp.status
-        })
+    # Department, designation and manager names are joined in
+    employee_list = [serialize_employee(row) for row in rows(query.order_by(Employee.employee_id).offset(offset).limit(limit))]
     
     return {
         "employees": employee_list,
@@ -326,94 +293,45 @@ def get_company_attendance_overview(
 ):
     """Get company-wide attendance overview"""
     if not start_date:
-        start_date = date.today().replace(day=1)
+        start_date = local_today().replace(day=1)
     if not end_date:
-        end_date = date.today()
-    
-    query = db.query(Employee).join(Department, isouter=True)
-    
-    if department_filter:
-        query = query.filter(Employee.department_id == department_filter)
+        end_date = local_today()
     
-    employees = query.all()
-    
-    attendance_data = []
-    
-    for emp in employees:
-        # Get attendance summary for this period
-        summaries = db.query(AttendanceSummary).filter(
-            and_(
-                AttendanceSummary.employee_id == emp.employee_id,
-                AttendanceSummary.date >= start_date,
-                AttendanceSummary.date <= end_date
-            )
-        ).all()
-        
-        # Calculate statistics
-        total_days = len(summaries)
-        present_days = len([s for s in summaries if s.status == 'present'])
-        absent_days = len([s for s in summaries if s.status == 'absent'])
-        half_days = len([s for s in summaries if s.status == 'half_day'])
-        
-        attendance_data.append({
-            "employee_id": emp.employee_id,
-            "employee_name": f"{emp.first_name} {emp.last_name}",
-            "employee_code": emp.employee_code,
-            "department_name": emp.department.department_name if emp.department else None,
-            "total_days": total_days,
-            "present_days": present_days,
-            "absent_days": absent_days,
-            "half_days": half_days,
-            "attendance_percentage": round((present_days + half_days * 0.5) / total_days * 100, 2) if total_days > 0 else 0
-        })
-    
-    return attendance_data
+    return employee_overview(start_date, end_date, department_id=department_filter)
 
 @router.get("/admin/attendance/logs")
 def get_attendance_logs(
     page: int = 1,
     limit: int = 100,
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
     employee_filter: Optional[int] = Query(None),
     date_filter: Optional[date] = Query(None),
     status_filter: Optional[str] = Query(None),
     current_user=Depends(require_admin),
     db: Session = Depends(get_db)
 ):
-    """Get attendance logs with filtering"""
-    query = db.query(AttendanceLog).join(Employee)
+    """Get attendance logs with filtering, newest first"""
+    query = attendance_log_rows_query(db)
     
     if employee_filter:
         query = query.filter(AttendanceLog.employee_id == employee_filter)
     
     if date_filter:
-        query = query.filter(func.date(AttendanceLog.punch_time) == date_filter)
+        query = query.filter(on_days(AttendanceLog.punch_time, date_filter))
     
     if status_filter:
         query = query.filter(AttendanceLog.status == status_filter)
     
-    total = query.count()
-    offset = (page - 1) * limit
-    
-    logs = query.order_by(AttendanceLog.punch_time.desc()).offset(offset).limit(limit).all()
-    
-    log_list = []
-    for log in logs:
-        log_list.append({
-            "attendance_id": log.attendance_id,
-            "employee_name": f"{log.employee.first_name} {log.employee.last_name}",
-            "employee_code": log.employee.employee_code,
-            "punch_type": log.punch_type,
-            "punch_time": log.punch_time,
-            "geo_lat": log.geo_lat,
-            "geo_long": log.geo_long,
-            "status": log.status
-        })
+    # The total is cached per filter set instead of counted on every page
+    total = cached_count(query)
+    logs, next_cursor = keyset_page(query, [AttendanceLog.punch_time, AttendanceLog.attendance_id], limit, cursor, page)
     
     return {
-        "logs": log_list,
+        "logs": [serialize_attendance_log(log._mapping) for log in logs],
         "total": total,
         "page": page,
-        "limit": limit
+        "limit": limit,
+        "next_cursor": next_cursor
     }
 
 # === LEAVE MANAGEMENT ENDPOINTS ===
@@ -428,11 +346,11 @@ def get_leave_overview(
 ):
     """Get company-wide leave overview"""
     if not start_date:
-        start_date = date.today().replace(day=1)
+        start_date = local_today().replace(day=1)
     if not end_date:
-        end_date = date.today()
+        end_date = local_today()
     
-    query = db.query(LeaveApplication).join(Employee).join(LeaveType)
+    query = leave_rows_query(db)
     
     if status_filter:
         query = query.filter(LeaveApplication.status == status_filter)
@@ -445,18 +363,18 @@ def get_leave_overview(
         )
     )
     
-    leave_applications = query.all()
+    leave_applications = rows(query)
     
     # Calculate statistics
     total_applications = len(leave_applications)
-    approved_leaves = len([l for l in leave_applications if l.status == 'approved'])
-    pending_leaves = len([l for l in leave_applications if l.status == 'pending'])
-    rejected_leaves = len([l for l in leave_applications if l.status == 'rejected'])
+    approved_leaves = len([l for l in leave_applications if l['status'] == 'approved'])
+    pending_leaves = len([l for l in leave_applications if l['status'] == 'pending'])
+    rejected_leaves = len([l for l in leave_applications if l['status'] == 'rejected'])
     
     # Get leave by type
     leave_by_type = {}
     for leave in leave_applications:
-        leave_type_name = leave.leave_type.type_name
+        leave_type_name = leave['leave_type']
         if leave_type_name not in leave_by_type:
             leave_by_type[leave_type_name] = 0
         leave_by_type[leave_type_name] += 1
@@ -483,7 +401,7 @@ def get_leave_applications(
     db: Session = Depends(get_db)
 ):
     """Get all leave applications with filtering"""
-    query = db.query(LeaveApplication).join(Employee).join(LeaveType)
+    query = leave_rows_query(db)
     
     if status_filter:
         query = query.filter(LeaveApplication.status == status_filter)
@@ -494,31 +412,9 @@ def get_leave_applications(
     total = query.count()
     offset = (page - 1) * limit
     
-    applications = query.order_by(LeaveApplication.applied_date.desc()).offset(offset).limit(limit).all()
-    
-    application_list = []
-    for app in applications:
-        # Get approver info
-        approver_name = None
-        if app.approved_by_id:
-            approver = db.query(User).filter(User.id == app.approved_by_id).first()
-            if approver:
-                approver_name = f"{approver.first_name} {approver.last_name}"
-        
-        application_list.append({
-            "leave_id": app.leave_id,
-            "employee_name": f"{app.employee.first_name} {app.employee.last_name}",
-            "employee_code": app.employee.employee_code,
-            "leave_type": app.leave_type.type_name,
-            "start_date": app.start_date,
-            "end_date": app.end_date,
-            "total_days": app.total_days,
-            "reason": app.reason,
-            "status": app.status,
-            "applied_date": app.applied_date,
-            "approved_date": app.approved_date,
-            "approved_by": approver_name
-        })
+    # Employee, leave type and approver names are joined in
+    applications = query.order_by(LeaveApplication.applied_date.desc()).offset(offset).limit(limit)
+    application_list = [serialize_leave(row) for row in rows(applications)]
     
     return {
         "applications": application_list,
@@ -538,9 +434,9 @@ def get_payroll_overview(
 ):
     """Get payroll overview"""
     if not start_date:
-        start_date = date.today().replace(day=1)
+        start_date = local_today().replace(day=1)
     if not end_date:
-        end_date = date.today()
+        end_date = local_today()
     
     # Get all payslips in the date range
     payslips = db.query(Payslip).filter(
@@ -584,7 +480,7 @@ def get_admin_dashboard(current_user=Depends(require_admin), db: Session = Depen
     total_departments = db.query(Department).filter(Department.is_active == True).count()
     
     # Today's attendance statistics
-    today = date.today()
+    today = local_today()
     today_attendance = db.query(AttendanceSummary).filter(AttendanceSummary.date == today).all()
     
     present_today = len([a for a in today_attendance if a.status == 'present'])
@@ -612,4 +508,8 @@ def get_admin_dashboard(current_user=Depends(require_admin), db: Session = Depen
         },
         "pending_leaves": pending_leaves,
         "date": today.isoformat()
-    }
\ No newline at end of file
+    }
+@router.get("/admin/system/database")
+def get_database_pool(current_user=Depends(require_admin)):
+    """SQLAlchemy connection pool usage"""
+    return {"pool": pool_metrics()}
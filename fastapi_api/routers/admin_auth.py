@@ -14,7 +14,7 @@ from django.db import models
 from django.contrib.auth.models import User
 
 # IMPORTS
-from fastapi_api.auth import authenticate_user, create_access_token, verify_token, require_admin_role
+from fastapi_api.auth import authenticate_user, create_access_token, resolve_principal, require_admin_role, token_claims
 from core.models import UserProfile, Role
 from master.models import Employee
 from fastapi_api.schemas import UserLogin, Token, AdminSignup, UserCreate
@@ -26,15 +26,15 @@ security = HTTPBearer()
 # ✔ Validate Admin From Token
 def get_current_admin_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
     token = credentials.credentials
-    user = verify_token(token)
+    principal = resolve_principal(token)
 
-    if not user:
+    if not principal:
         raise HTTPException(status_code=401, detail="Invalid authentication token")
 
-    if not require_admin_role(user.id):
+    if not principal.is_admin:
         raise HTTPException(status_code=403, detail="Admin access required")
 
-    return user
+    return principal
 
 
 # 🔵 API 1: ADMIN LOGIN
@@ -47,7 +47,7 @@ def admin_login(user_credentials: UserLogin):
     if not require_admin_role(user.id):
         raise HTTPException(403, "Admin access required")
 
-    access_token = create_access_token({"sub": user.username, "user_id": user.id})
+    access_token = create_access_token(token_claims(user))
 
     return {"access_token": access_token, "token_type": "bearer"}
 
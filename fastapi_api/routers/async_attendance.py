@@ -0,0 +1,259 @@
+"""Async versions of the busiest endpoints: punching, today, history and dashboards.
+
+The sync routers hold a Starlette threadpool worker for every blocking
+query, so punch bursts exhaust the pool while the CPU idles. These
+handlers await an AsyncSession instead; paths and responses match their
+sync counterparts.
+"""
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from typing import Optional
+from datetime import datetime, date, timedelta
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import get_async_db
+from fastapi_api.auth import get_current_user_async, require_employee_id
+from models import Employee, AttendanceLog, AttendanceSummary, Department, LeaveApplication, Shift, User
+from pagination import keyset_page_async
+from predicates import between, day_start, stored
+
+# Django setup for the work-date bucketing
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'hexaattendanceportal.settings')
+import django
+django.setup()
+
+from attendance.bucketing import CALENDAR_DAY, current_work_date, shift_offset, work_window
+from attendance.periods import local_today
+from attendance.signals import punches_recorded
+from core.derivatives import sized_urls
+from core.media import UploadRejected, media_url, store_upload
+
+router = APIRouter()
+
+async def require_admin(current_user=Depends(get_current_user_async)):
+    """Dependency to require admin role"""
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return current_user
+
+async def require_manager(current_user=Depends(get_current_user_async)):
+    """Dependency to require manager role"""
+    if not current_user.is_manager:
+        raise HTTPException(status_code=403, detail="Manager access required")
+    if current_user.employee_id is None:
+        raise HTTPException(status_code=404, detail="Employee profile not found for manager")
+    return current_user
+
+async def count(db, statement):
+    return await db.scalar(select(func.count()).select_from(statement.subquery()))
+
+# === EMPLOYEE ENDPOINTS ===
+
+@router.post("/employee/attendance/mark")
+async def mark_attendance(
+    punch_type: str = Form(...),
+    punch_time: Optional[str] = Form(None),
+    geo_lat: Optional[float] = Form(None),
+    geo_long: Optional[float] = Form(None),
+    photo: Optional[UploadFile] = File(None),
+    current_user=Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    employee_id = require_employee_id(current_user)
+
+    if punch_time:
+        try:
+            punch_datetime = stored(datetime.fromisoformat(punch_time.replace('Z', '+00:00')))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid punch_time format")
+    else:
+        punch_datetime = datetime.utcnow()
+
+    # Streamed to disk chunk by chunk; processing happens in the media worker
+    selfie_url = ""
+    if photo:
+        try:
+            selfie_url = media_url(await store_upload(photo))
+        except UploadRejected as e:
+            raise HTTPException(status_code=e.status_code, detail=str(e))
+
+    attendance_log = AttendanceLog(
+        employee_id=employee_id,
+        punch_type=punch_type.upper(),
+        punch_time=punch_datetime,
+        geo_lat=geo_lat,
+        geo_long=geo_long,
+        selfie_url=selfie_url,
+        status="approved"
+    )
+    db.add(attendance_log)
+    await db.commit()
+    punches_recorded.send(sender=AttendanceLog, employee_ids={employee_id})
+
+    return {"message": "Attendance marked successfully", "attendance_id": attendance_log.attendance_id}
+
+@router.get("/employee/attendance/today")
+async def get_today_attendance(current_user=Depends(get_current_user_async), db: AsyncSession = Depends(get_async_db)):
+    """Get today's attendance status"""
+    employee_id = require_employee_id(current_user)
+
+    # Today is the employee's current work date; a night shift's started yesterday evening
+    shift = (await db.execute(
+        select(Shift.start_time, Shift.end_time).join(Employee, Employee.shift_id == Shift.shift_id)
+        .where(Employee.employee_id == employee_id)
+    )).first()
+    offset = shift_offset(*shift) if shift else CALENDAR_DAY
+    today = current_work_date(offset)
+
+    today_summary = await db.scalar(select(AttendanceSummary).where(
+        AttendanceSummary.employee_id == employee_id,
+        AttendanceSummary.date == today
+    ))
+    today_logs = (await db.scalars(select(AttendanceLog).where(
+        AttendanceLog.employee_id == employee_id,
+        between(AttendanceLog.punch_time, *work_window(today, offset=offset))
+    ).order_by(AttendanceLog.punch_time))).all()
+    thumbs = await run_in_threadpool(sized_urls, [log.selfie_url for log in today_logs], 'thumb')
+
+    return {
+        "date": today.isoformat(),
+        "status": today_summary.status if today_summary else "not_marked",
+        "summary": {
+            "in_time": today_summary.in_time if today_summary else None,
+            "out_time": today_summary.out_time if today_summary else None,
+            "total_hours": today_summary.total_hours if today_summary else None,
+            "late_by": today_summary.late_by if today_summary else 0
+        },
+        "logs": [
+            {
+                "punch_type": log.punch_type,
+                "punch_time": log.punch_time,
+                "selfie_url": log.selfie_url,
+                "selfie_thumb_url": thumbs.get(log.selfie_url)
+            }
+            for log in today_logs
+        ]
+    }
+
+@router.get("/employee/attendance/history")
+async def get_attendance_history(
+    page: int = 1,
+    limit: int = 50,
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    start_date: Optional[date] = Query(None),
+    end_date: Optional[date] = Query(None),
+    current_user=Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    employee_id = require_employee_id(current_user)
+    employee = (await db.execute(
+        select(Employee.first_name, Employee.last_name).where(Employee.employee_id == employee_id)
+    )).first()
+
+    statement = select(AttendanceLog).where(AttendanceLog.employee_id == employee_id)
+    if start_date:
+        statement = statement.where(AttendanceLog.punch_time >= day_start(start_date))
+    if end_date:
+        statement = statement.where(AttendanceLog.punch_time < day_start(end_date + timedelta(days=1)))
+
+    attendance_logs, next_cursor = await keyset_page_async(
+        db, statement, [AttendanceLog.punch_time, AttendanceLog.attendance_id], limit, cursor, page
+    )
+    thumbs = await run_in_threadpool(sized_urls, [log.selfie_url for log in attendance_logs], 'thumb')
+
+    return {
+        "employee": {
+            "employee_id": employee_id,
+            "employee_name": f"{employee.first_name} {employee.last_name}" if employee else None
+        },
+        "attendance_logs": [
+            {
+                "attendance_id": log.attendance_id,
+                "punch_type": log.punch_type,
+                "punch_time": log.punch_time,
+                "geo_lat": log.geo_lat,
+                "geo_long": log.geo_long,
+                "selfie_url": log.selfie_url,
+                "selfie_thumb_url": thumbs.get(log.selfie_url),
+                "status": log.status
+            }
+            for log in attendance_logs
+        ],
+        "next_cursor": next_cursor
+    }
+
+# === DASHBOARD ENDPOINTS ===
+
+@router.get("/admin/dashboard")
+async def get_admin_dashboard(current_user=Depends(require_admin), db: AsyncSession = Depends(get_async_db)):
+    """Get admin dashboard statistics"""
+    total_users = await count(db, select(User.id))
+    active_users = await count(db, select(User.id).where(User.is_active == True))
+    total_employees = await count(db, select(Employee.employee_id))
+    active_employees = await count(db, select(Employee.employee_id).where(Employee.status == True))
+    total_departments = await count(db, select(Department.department_id).where(Department.is_active == True))
+
+    today = local_today()
+    statuses = dict((await db.execute(
+        select(AttendanceSummary.status, func.count()).where(AttendanceSummary.date == today)
+        .group_by(AttendanceSummary.status)
+    )).all())
+
+    pending_leaves = await count(db, select(LeaveApplication.leave_id).where(LeaveApplication.status == 'pending'))
+
+    return {
+        "users": {
+            "total": total_users,
+            "active": active_users,
+            "inactive": total_users - active_users
+        },
+        "employees": {
+            "total": total_employees,
+            "active": active_employees,
+            "inactive": total_employees - active_employees
+        },
+        "departments": total_departments,
+        "today_attendance": {
+            "present": statuses.get('present', 0),
+            "absent": statuses.get('absent', 0),
+            "total_marked": sum(statuses.values())
+        },
+        "pending_leaves": pending_leaves,
+        "date": today.isoformat()
+    }
+
+@router.get("/manager/dashboard")
+async def get_manager_dashboard(current_user=Depends(require_manager), db: AsyncSession = Depends(get_async_db)):
+    """Get manager dashboard data"""
+    manager_employee_id = current_user.employee_id
+    team = select(Employee.employee_id).where(Employee.manager_id == manager_employee_id)
+
+    team_size = await count(db, team)
+    pending_leaves_count = await count(db, select(LeaveApplication.leave_id).join(Employee).where(
+        Employee.manager_id == manager_employee_id,
+        LeaveApplication.status == 'pending'
+    ))
+
+    today = local_today()
+    statuses = dict((await db.execute(
+        select(AttendanceSummary.status, func.count()).where(
+            AttendanceSummary.employee_id.in_(team),
+            AttendanceSummary.date == today
+        ).group_by(AttendanceSummary.status)
+    )).all())
+
+    return {
+        "team_size": team_size,
+        "pending_leave_requests": pending_leaves_count,
+        "today": {
+            "present": statuses.get('present', 0),
+            "absent": statuses.get('absent', 0),
+            "half_day": statuses.get('half_day', 0),
+            "total_team": team_size
+        },
+        "date": today.isoformat()
+    }
@@ -1,26 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime
 import os
-import uuid
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from database import get_db
-from auth import get_current_user
+from fastapi_api.auth import get_current_user, require_employee_id
 from models import Employee, AttendanceLog, AttendanceSummary
-from schemas import AttendanceLogCreate, AttendanceLog, AttendanceSummary as AttendanceSummarySchema
-# Helper function to get employee from user
-def get_employee_from_user(user, db):
-    from models import Employee
-    employee = db.query(Employee).filter(Employee.user_id == user.id).first()
-    if not employee:
-        from fastapi import HTTPException
-        raise HTTPException(status_code=404, detail="Employee profile not found")
-    return employee
-
+from schemas import AttendanceLogCreate, AttendanceLog as AttendanceLogSchema, AttendanceSummary as AttendanceSummarySchema
+from pagination import keyset_page
+from predicates import stored
+from core.derivatives import sized_urls
+from attendance.signals import punches_recorded
+from core.media import UploadRejected, media_url, read_chunks, store_chunks
 router = APIRouter()
 
 @router.post("/attendance/mark")
@@ -33,32 +28,29 @@ def mark_attendance(
     current_user=Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    employee = get_employee_from_user(current_user, db)
+    employee_id = require_employee_id(current_user)
 
     # Handle punch_time
     if punch_time:
         try:
-            punch_datetime = datetime.fromisoformat(punch_time.replace('Z', '+00:00'))
+            punch_datetime = stored(datetime.fromisoformat(punch_time.replace('Z', '+00:00')))
         except ValueError:
             raise HTTPException(status_code=400, detail="Invalid punch_time format")
     else:
         punch_datetime = datetime.utcnow()
 
-    # Handle photo upload
-    selfie_url = None
+    # Stream the photo into the media store; processing happens in the media worker
+    selfie_url = ""
     if photo:
-        # Ensure media/selfies directory exists
-        os.makedirs("media/selfies", exist_ok=True)
-        file_extension = os.path.splitext(photo.filename)[1]
-        unique_filename = f"{uuid.uuid4()}{file_extension}"
-        file_path = f"media/selfies/{unique_filename}"
-        with open(file_path, "wb") as buffer:
-            buffer.write(photo.file.read())
-        selfie_url = f"/media/selfies/{unique_filename}"
+        try:
+            asset = store_chunks(read_chunks(photo.file), photo.filename, photo.content_type, photo.size)
+        except UploadRejected as e:
+            raise HTTPException(status_code=e.status_code, detail=str(e))
+        selfie_url = media_url(asset)
 
     # Create attendance log
     attendance_log = AttendanceLog(
-        employee_id=employee.employee_id,
+        employee_id=employee_id,
         punch_type=punch_type.upper(),
         punch_time=punch_datetime,
         geo_lat=geo_lat,
@@ -69,45 +61,48 @@ def mark_attendance(
     db.add(attendance_log)
     db.commit()
     db.refresh(attendance_log)
+    punches_recorded.send(sender=AttendanceLog, employee_ids={employee_id})
 
     return {"message": "Attendance marked successfully", "attendance_id": attendance_log.attendance_id}
 
-@router.get("/attendance/history", response_model=List[AttendanceLog])
+@router.get("/attendance/history", response_model=List[AttendanceLogSchema])
 def get_attendance_history(
+    response: Response,
     page: int = 1,
     limit: int = 50,
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page"),
     current_user=Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    employee = get_employee_from_user(current_user, db)
-    offset = (page - 1) * limit
+    employee_id = require_employee_id(current_user)
 
-    attendance_logs = (
-        db.query(AttendanceLog)
-        .filter(AttendanceLog.employee_id == employee.employee_id)
-        .order_by(AttendanceLog.punch_time.desc())
-        .offset(offset)
-        .limit(limit)
-        .all()
+    attendance_logs, next_cursor = keyset_page(
+        db.query(AttendanceLog).filter(AttendanceLog.employee_id == employee_id),
+        [AttendanceLog.punch_time, AttendanceLog.attendance_id], limit, cursor, page
     )
+    thumbs = sized_urls([log.selfie_url for log in attendance_logs], 'thumb')
+    for log in attendance_logs:
+        log.selfie_thumb_url = thumbs.get(log.selfie_url)
+    # The body stays a plain list; the cursor for the next page travels in a header
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     return attendance_logs
 
 @router.get("/attendance/summary", response_model=List[AttendanceSummarySchema])
 def get_attendance_summary(
+    response: Response,
     page: int = 1,
     limit: int = 30,
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page"),
     current_user=Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    employee = get_employee_from_user(current_user, db)
-    offset = (page - 1) * limit
+    employee_id = require_employee_id(current_user)
 
-    summaries = (
-        db.query(AttendanceSummary)
-        .filter(AttendanceSummary.employee_id == employee.employee_id)
-        .order_by(AttendanceSummary.date.desc())
-        .offset(offset)
-        .limit(limit)
-        .all()
+    summaries, next_cursor = keyset_page(
+        db.query(AttendanceSummary).filter(AttendanceSummary.employee_id == employee_id),
+        [AttendanceSummary.date, AttendanceSummary.summary_id], limit, cursor, page
     )
-    return summaries
\ No newline at end of file
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return summaries
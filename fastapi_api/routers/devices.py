@@ -0,0 +1,41 @@
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+import json
+import sys
+import os
+
+# Django setup
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'hexaattendanceportal.settings')
+import django
+django.setup()
+
+from attendance.ingest import ingest_punches, parse_ndjson
+from master.models import Device
+
+router = APIRouter()
+
+
+def _ingest(serial_number, punches):
+    device = Device.objects.filter(serial_number=serial_number).first()
+    if not device:
+        raise HTTPException(404, f"Unknown device {serial_number!r}")
+    return ingest_punches(device, punches)
+
+
+# 🔵 BULK PUNCH INGESTION (JSON ARRAY OR NDJSON)
+@router.post("/api/devices/{serial_number}/punches")
+async def ingest_device_punches(serial_number: str, request: Request):
+    body = await request.body()
+    try:
+        if request.headers.get("content-type", "").startswith("application/x-ndjson"):
+            punches = parse_ndjson(body)
+        else:
+            punches = json.loads(body or b"[]")
+            if isinstance(punches, dict):
+                punches = punches.get("punches", [])
+        if not isinstance(punches, list):
+            raise ValueError("Body must be a JSON array of punches")
+        return await run_in_threadpool(_ingest, serial_number, punches)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
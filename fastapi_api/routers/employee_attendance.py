@@ -2,24 +2,23 @@ from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Q
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, func
 from typing import List, Optional
-from datetime import datetime, date
+from datetime import datetime, date, timedelta
 import os
-import uuid
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from database import get_db
-from auth import get_current_user, get_user_role
-from models import Employee, AttendanceLog, AttendanceSummary, Department, Designation
-from schemas import AttendanceLogCreate, AttendanceLog, AttendanceSummary as AttendanceSummarySchema
-# Helper function to get employee from user
-def get_employee_from_user(user, db):
-    employee = db.query(Employee).filter(Employee.user_id == user.id).first()
-    if not employee:
-        raise HTTPException(status_code=404, detail="Employee profile not found")
-    return employee
-
+from fastapi_api.auth import get_current_user, require_employee_id
+from models import Employee, AttendanceLog, AttendanceSummary, Department, Designation, Shift
+from schemas import AttendanceLogCreate, AttendanceSummary as AttendanceSummarySchema
+from pagination import keyset_page
+from predicates import between, day_start, in_month, stored
+from attendance.bucketing import CALENDAR_DAY, current_work_date, shift_offset, work_window
+from attendance.periods import local_today
+from core.derivatives import sized_urls
+from attendance.signals import punches_recorded
+from core.media import UploadRejected, media_url, read_chunks, store_chunks
 router = APIRouter()
 
 @router.post("/employee/attendance/mark")
@@ -32,32 +31,29 @@ def mark_attendance(
     current_user=Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    employee = get_employee_from_user(current_user, db)
+    employee_id = require_employee_id(current_user)
 
     # Handle punch_time
     if punch_time:
         try:
-            punch_datetime = datetime.fromisoformat(punch_time.replace('Z', '+00:00'))
+            punch_datetime = stored(datetime.fromisoformat(punch_time.replace('Z', '+00:00')))
         except ValueError:
             raise HTTPException(status_code=400, detail="Invalid punch_time format")
     else:
         punch_datetime = datetime.utcnow()
 
-    # Handle photo upload
-    selfie_url = None
+    # Stream the photo into the media store; processing happens in the media worker
+    selfie_url = ""
     if photo:
-        # Ensure media/selfies directory exists
-        os.makedirs("media/selfies", exist_ok=True)
-        file_extension = os.path.splitext(photo.filename)[1]
-        unique_filename = f"{uuid.uuid4()}{file_extension}"
-        file_path = f"media/selfies/{unique_filename}"
-        with open(file_path, "wb") as buffer:
-            buffer.write(photo.file.read())
-        selfie_url = f"/media/selfies/{unique_filename}"
+        try:
+            asset = store_chunks(read_chunks(photo.file), photo.filename, photo.content_type, photo.size)
+        except UploadRejected as e:
+            raise HTTPException(status_code=e.status_code, detail=str(e))
+        selfie_url = media_url(asset)
 
     # Create attendance log
     attendance_log = AttendanceLog(
-        employee_id=employee.employee_id,
+        employee_id=employee_id,
         punch_type=punch_type.upper(),
         punch_time=punch_datetime,
         geo_lat=geo_lat,
@@ -68,6 +64,7 @@ def mark_attendance(
     db.add(attendance_log)
     db.commit()
     db.refresh(attendance_log)
+    punches_recorded.send(sender=AttendanceLog, employee_ids={employee_id})
 
     return {"message": "Attendance marked successfully", "attendance_id": attendance_log.attendance_id}
 
@@ -75,26 +72,30 @@ def mark_attendance(
 def get_attendance_history(
     page: int = 1,
     limit: int = 50,
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
     start_date: Optional[date] = Query(None),
     end_date: Optional[date] = Query(None),
     current_user=Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    employee = get_employee_from_user(current_user, db)
-    offset = (page - 1) * limit
+    employee_id = require_employee_id(current_user)
+    employee = db.query(Employee).filter(Employee.employee_id == employee_id).first()
 
-    query = db.query(AttendanceLog).filter(AttendanceLog.employee_id == employee.employee_id)
+    query = db.query(AttendanceLog).filter(AttendanceLog.employee_id == employee_id)
     
     if start_date:
-        query = query.filter(func.date(AttendanceLog.punch_time) >= start_date)
+        query = query.filter(AttendanceLog.punch_time >= day_start(start_date))
     if end_date:
-        query = query.filter(func.date(AttendanceLog.punch_time) <= end_date)
+        query = query.filter(AttendanceLog.punch_time < day_start(end_date + timedelta(days=1)))
 
-    attendance_logs = query.order_by(AttendanceLog.punch_time.desc()).offset(offset).limit(limit).all()
+    attendance_logs, next_cursor = keyset_page(
+        query, [AttendanceLog.punch_time, AttendanceLog.attendance_id], limit, cursor, page
+    )
+    thumbs = sized_urls([log.selfie_url for log in attendance_logs], 'thumb')
     
     return {
         "employee": {
-            "employee_id": employee.employee_id,
+            "employee_id": employee_id,
             "employee_name": f"{employee.first_name} {employee.last_name}"
         },
         "attendance_logs": [
@@ -105,44 +106,44 @@ def get_attendance_history(
                 "geo_lat": log.geo_lat,
                 "geo_long": log.geo_long,
                 "selfie_url": log.selfie_url,
+                "selfie_thumb_url": thumbs.get(log.selfie_url),
                 "status": log.status
             }
             for log in attendance_logs
-        ]
+        ],
+        "next_cursor": next_cursor
     }
 
 @router.get("/employee/attendance/summary")
 def get_attendance_summary(
     page: int = 1,
     limit: int = 30,
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
     month: Optional[int] = Query(None, description="Month (1-12)"),
     year: Optional[int] = Query(None, description="Year"),
     current_user=Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    employee = get_employee_from_user(current_user, db)
-    offset = (page - 1) * limit
+    employee_id = require_employee_id(current_user)
 
     # Default to current month if not specified
     if not month:
-        month = datetime.utcnow().month
+        month = local_today().month
     if not year:
-        year = datetime.utcnow().year
+        year = local_today().year
 
-    summaries = db.query(AttendanceSummary).filter(
+    summaries, next_cursor = keyset_page(db.query(AttendanceSummary).filter(
         and_(
-            AttendanceSummary.employee_id == employee.employee_id,
-            func.extract('month', AttendanceSummary.date) == month,
-            func.extract('year', AttendanceSummary.date) == year
+            AttendanceSummary.employee_id == employee_id,
+            in_month(AttendanceSummary.date, year, month)
         )
-    ).order_by(AttendanceSummary.date.desc()).offset(offset).limit(limit).all()
+    ), [AttendanceSummary.date, AttendanceSummary.summary_id], limit, cursor, page)
     
     # Calculate month statistics
     month_summaries = db.query(AttendanceSummary).filter(
         and_(
-            AttendanceSummary.employee_id == employee.employee_id,
-            func.extract('month', AttendanceSummary.date) == month,
-            func.extract('year', AttendanceSummary.date) == year
+            AttendanceSummary.employee_id == employee_id,
+            in_month(AttendanceSummary.date, year, month)
         )
     ).all()
     
@@ -163,19 +164,26 @@ def get_attendance_summary(
             "leave_days": leave_days,
             "attendance_percentage": round((present_days + half_days * 0.5) / total_days * 100, 2) if total_days > 0 else 0
         },
-        "summaries": summaries
+        "summaries": summaries,
+        "next_cursor": next_cursor
     }
 
 @router.get("/employee/attendance/today")
 def get_today_attendance(current_user=Depends(get_current_user), db: Session = Depends(get_db)):
     """Get today's attendance status"""
-    employee = get_employee_from_user(current_user, db)
-    today = date.today()
+    employee_id = require_employee_id(current_user)
+
+    # Today is the employee's current work date; a night shift's started yesterday evening
+    shift = db.query(Shift.start_time, Shift.end_time).join(
+        Employee, Employee.shift_id == Shift.shift_id
+    ).filter(Employee.employee_id == employee_id).first()
+    offset = shift_offset(*shift) if shift else CALENDAR_DAY
+    today = current_work_date(offset)
     
     # Get today's attendance summary
     today_summary = db.query(AttendanceSummary).filter(
         and_(
-            AttendanceSummary.employee_id == employee.employee_id,
+            AttendanceSummary.employee_id == employee_id,
             AttendanceSummary.date == today
         )
     ).first()
@@ -183,10 +191,11 @@ def get_today_attendance(current_user=Depends(get_current_user), db: Session = D
     # Get today's attendance logs
     today_logs = db.query(AttendanceLog).filter(
         and_(
-            AttendanceLog.employee_id == employee.employee_id,
-            func.date(AttendanceLog.punch_time) == today
+            AttendanceLog.employee_id == employee_id,
+            between(AttendanceLog.punch_time, *work_window(today, offset=offset))
         )
     ).order_by(AttendanceLog.punch_time).all()
+    thumbs = sized_urls([log.selfie_url for log in today_logs], 'thumb')
     
     return {
         "date": today.isoformat(),
@@ -201,7 +210,8 @@ def get_today_attendance(current_user=Depends(get_current_user), db: Session = D
             {
                 "punch_type": log.punch_type,
                 "punch_time": log.punch_time,
-                "selfie_url": log.selfie_url
+                "selfie_url": log.selfie_url,
+                "selfie_thumb_url": thumbs.get(log.selfie_url)
             }
             for log in today_logs
         ]
@@ -215,17 +225,17 @@ def get_attendance_statistics(
     db: Session = Depends(get_db)
 ):
     """Get attendance statistics for a date range"""
-    employee = get_employee_from_user(current_user, db)
+    employee_id = require_employee_id(current_user)
     
     # Default to last 30 days if no dates provided
     if not end_date:
-        end_date = date.today()
+        end_date = local_today()
     if not start_date:
         start_date = end_date.replace(day=1)
     
     summaries = db.query(AttendanceSummary).filter(
         and_(
-            AttendanceSummary.employee_id == employee.employee_id,
+            AttendanceSummary.employee_id == employee_id,
             AttendanceSummary.date >= start_date,
             AttendanceSummary.date <= end_date
         )
@@ -8,17 +8,20 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from database import get_db
-from auth import get_current_user, get_user_role
+from fastapi_api.auth import get_current_user, require_employee_id
 from models import Employee, LeaveApplication, LeaveType, User
-from schemas import LeaveApplicationCreate, LeaveApplication, LeaveType as LeaveTypeSchema
+from schemas import LeaveApplicationCreate, LeaveType as LeaveTypeSchema
+from projections import rows, leave_rows_query, serialize_leave
+from predicates import in_month, in_year
 
-router = APIRouter()
+# Django setup for the report rollups
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'hexaattendanceportal.settings')
+import django
+django.setup()
+
+from reports.rollups import refresh_leave_years
 
-def get_employee_from_user(user, db):
-    employee = db.query(Employee).filter(Employee.user_id == user.id).first()
-    if not employee:
-        raise HTTPException(status_code=404, detail="Employee profile not found")
-    return employee
+router = APIRouter()
 
 @router.post("/employee/leave/apply")
 def apply_leave(
@@ -26,7 +29,7 @@ def apply_leave(
     current_user=Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    employee = get_employee_from_user(current_user, db)
+    employee_id = require_employee_id(current_user)
 
     # Validate leave type exists
     leave_type = db.query(LeaveType).filter(LeaveType.type_id == leave.leave_type_id).first()
@@ -40,7 +43,7 @@ def apply_leave(
     # Check for overlapping leave applications
     overlapping_leave = db.query(LeaveApplication).filter(
         and_(
-            LeaveApplication.employee_id == employee.employee_id,
+            LeaveApplication.employee_id == employee_id,
             LeaveApplication.status.in_(['pending', 'approved']),
             or_(
                 and_(
@@ -64,7 +67,7 @@ def apply_leave(
 
     # Create leave application
     leave_application = LeaveApplication(
-        employee_id=employee.employee_id,
+        employee_id=employee_id,
         leave_type_id=leave.leave_type_id,
         start_date=leave.start_date,
         end_date=leave.end_date,
@@ -75,6 +78,7 @@ def apply_leave(
     db.add(leave_application)
     db.commit()
     db.refresh(leave_application)
+    refresh_leave_years({leave_application.applied_date.year})
 
     return {"message": "Leave application submitted successfully", "leave_id": leave_application.leave_id}
 
@@ -86,41 +90,19 @@ def get_leave_status(
     current_user=Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    employee = get_employee_from_user(current_user, db)
+    employee_id = require_employee_id(current_user)
     offset = (page - 1) * limit
 
-    query = db.query(LeaveApplication).filter(LeaveApplication.employee_id == employee.employee_id)
+    query = leave_rows_query(db).filter(LeaveApplication.employee_id == employee_id)
     
     if status_filter:
         query = query.filter(LeaveApplication.status == status_filter)
 
-    leave_applications = query.order_by(LeaveApplication.applied_date.desc()).offset(offset).limit(limit).all()
-    
-    leave_list = []
-    for leave in leave_applications:
-        # Get leave type name
-        leave_type = db.query(LeaveType).filter(LeaveType.type_id == leave.leave_type_id).first()
-        leave_type_name = leave_type.type_name if leave_type else None
-        
-        # Get approver info
-        approver_name = None
-        if leave.approved_by_id:
-            approver = db.query(User).filter(User.id == leave.approved_by_id).first()
-            if approver:
-                approver_name = f"{approver.first_name} {approver.last_name}"
-        
-        leave_list.append({
-            "leave_id": leave.leave_id,
-            "leave_type": leave_type_name,
-            "start_date": leave.start_date,
-            "end_date": leave.end_date,
-            "total_days": leave.total_days,
-            "reason": leave.reason,
-            "status": leave.status,
-            "applied_date": leave.applied_date,
-            "approved_date": leave.approved_date,
-            "approved_by": approver_name
-        })
+    # Leave type and approver names are joined in
+    leave_list = [
+        serialize_leave(row)
+        for row in rows(query.order_by(LeaveApplication.applied_date.desc()).offset(offset).limit(limit))
+    ]
     
     return {
         "leaves": leave_list,
@@ -145,15 +127,15 @@ def get_leave_types(current_user=Depends(get_current_user), db: Session = Depend
 @router.get("/employee/leave/balance")
 def get_leave_balance(current_user=Depends(get_current_user), db: Session = Depends(get_db)):
     """Get current leave balance"""
-    employee = get_employee_from_user(current_user, db)
+    employee_id = require_employee_id(current_user)
     current_year = datetime.utcnow().year
     
     # Get all approved leaves for current year
     approved_leaves = db.query(LeaveApplication).filter(
         and_(
-            LeaveApplication.employee_id == employee.employee_id,
+            LeaveApplication.employee_id == employee_id,
             LeaveApplication.status == 'approved',
-            func.extract('year', LeaveApplication.start_date) == current_year
+            in_year(LeaveApplication.start_date, current_year)
         )
     ).all()
     
@@ -190,7 +172,7 @@ def get_leave_calendar(
     db: Session = Depends(get_db)
 ):
     """Get leave calendar for a specific month"""
-    employee = get_employee_from_user(current_user, db)
+    employee_id = require_employee_id(current_user)
     
     # Default to current month if not specified
     if not month:
@@ -201,9 +183,8 @@ def get_leave_calendar(
     # Get leaves for the specified month
     leaves = db.query(LeaveApplication).filter(
         and_(
-            LeaveApplication.employee_id == employee.employee_id,
-            func.extract('month', LeaveApplication.start_date) == month,
-            func.extract('year', LeaveApplication.start_date) == year
+            LeaveApplication.employee_id == employee_id,
+            in_month(LeaveApplication.start_date, year, month)
         )
     ).all()
     
@@ -6,17 +6,16 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from database import get_db
-from auth import get_current_user
+from fastapi_api.auth import get_current_user, require_employee_id
 from models import LeaveApplication, LeaveType
 from schemas import LeaveApplicationCreate, LeaveApplication, LeaveType as LeaveTypeSchema
-# Helper function to get employee from user
-def get_employee_from_user(user, db):
-    from models import Employee
-    employee = db.query(Employee).filter(Employee.user_id == user.id).first()
-    if not employee:
-        from fastapi import HTTPException
-        raise HTTPException(status_code=404, detail="Employee profile not found")
-    return employee
+
+# Django setup for the report rollups
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'hexaattendanceportal.settings')
+import django
+django.setup()
+
+from reports.rollups import refresh_leave_years
 
 router = APIRouter()
 
@@ -26,7 +25,7 @@ def apply_leave(
     current_user=Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    employee = get_employee_from_user(current_user, db)
+    employee_id = require_employee_id(current_user)
 
     # Validate leave type exists
     leave_type = db.query(LeaveType).filter(LeaveType.type_id == leave.leave_type_id).first()
@@ -35,7 +34,7 @@ def apply_leave(
 
     # Create leave application
     leave_application = LeaveApplication(
-        employee_id=employee.employee_id,
+        employee_id=employee_id,
         leave_type_id=leave.leave_type_id,
         start_date=leave.start_date,
         end_date=leave.end_date,
@@ -46,6 +45,7 @@ def apply_leave(
     db.add(leave_application)
     db.commit()
     db.refresh(leave_application)
+    refresh_leave_years({leave_application.applied_date.year})
 
     return {"message": "Leave application submitted successfully", "leave_id": leave_application.leave_id}
 
@@ -56,12 +56,12 @@ def get_leave_status(
     current_user=Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    employee = get_employee_from_user(current_user, db)
+    employee_id = require_employee_id(current_user)
     offset = (page - 1) * limit
 
     leave_applications = (
         db.query(LeaveApplication)
-        .filter(LeaveApplication.employee_id == employee.employee_id)
+        .filter(LeaveApplication.employee_id == employee_id)
         .order_by(LeaveApplication.applied_date.desc())
         .offset(offset)
         .limit(limit)
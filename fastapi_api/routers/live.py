@@ -0,0 +1,133 @@
+"""Server-Sent Events feed of today's attendance counts.
+
+A single broadcaster per process refreshes attendance.live's counters
+every LIVE_ATTENDANCE_INTERVAL seconds, or at once when a punch is
+recorded in this process, and wakes the open streams. Each stream sends
+its department's or team's counts only when they change, so a viewer
+costs a dictionary read rather than an aggregation query. The
+broadcaster stops when the last stream closes.
+"""
+import asyncio
+import contextvars
+import json
+import logging
+import os
+import sys
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi_api.auth import get_current_user_async
+
+# Django setup for the live counter store
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'hexaattendanceportal.settings')
+import django
+django.setup()
+
+from django.conf import settings
+
+from attendance.live import COMPANY, department_scope, live_attendance, team_scope
+from attendance.signals import punches_recorded
+
+logger = logging.getLogger(__name__)
+
+# Seconds of silence after which a comment line is sent to keep proxies from closing the stream
+KEEPALIVE = 15
+
+router = APIRouter()
+
+
+class Broadcaster:
+    """Runs the shared refresh loop while anyone is watching and wakes the streams"""
+
+    def __init__(self, live):
+        self.live = live
+        self.viewers = 0
+        self.loop = None
+        self.task = None
+        self.wakeup = None
+        self.changed = None
+
+    def poke(self, sender=None, **kwargs):
+        """punches_recorded receiver; may be called from any thread"""
+        if self.task is not None and not self.task.done():
+            self.loop.call_soon_threadsafe(self.wakeup.set)
+
+    def start(self):
+        if self.task is None or self.task.done():
+            self.loop = asyncio.get_running_loop()
+            self.wakeup = asyncio.Event()
+            self.changed = asyncio.Condition()
+            # A fresh context, or the loop would keep charging its queries to the first viewer's request
+            self.task = self.loop.create_task(self.run(), context=contextvars.Context())
+
+    async def run(self):
+        while self.viewers:
+            try:
+                await run_in_threadpool(self.live.refresh)
+            except Exception:
+                logger.exception('Live attendance refresh failed')
+            async with self.changed:
+                self.changed.notify_all()
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), settings.LIVE_ATTENDANCE_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self.wakeup.clear()
+
+    async def stream(self, request, scope):
+        """SSE lines with the counts for ``scope``: one ``counts`` event per change"""
+        self.viewers += 1
+        self.start()
+        changed = self.changed
+        try:
+            sent = None
+            while not await request.is_disconnected():
+                counts = self.live.snapshot(scope)
+                if counts is not None and counts != sent:
+                    sent = counts
+                    yield f'event: counts\ndata: {json.dumps(counts)}\n\n'
+                async with changed:
+                    try:
+                        await asyncio.wait_for(changed.wait(), KEEPALIVE)
+                    except asyncio.TimeoutError:
+                        yield ': keepalive\n\n'
+        finally:
+            self.viewers -= 1
+
+
+broadcaster = Broadcaster(live_attendance)
+punches_recorded.connect(broadcaster.poke, dispatch_uid='live_attendance_broadcaster')
+
+
+def event_stream(request, scope):
+    return StreamingResponse(
+        broadcaster.stream(request, scope),
+        media_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+
+
+@router.get("/admin/attendance/live")
+async def admin_live_attendance(
+    request: Request,
+    department_id: Optional[int] = Query(None, description="Limit the counts to one department"),
+    current_user=Depends(get_current_user_async)
+):
+    """Stream today's present/late/absent counts for the company or a department"""
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return event_stream(request, department_scope(department_id) if department_id else COMPANY)
+
+
+@router.get("/manager/attendance/live")
+async def manager_live_attendance(request: Request, current_user=Depends(get_current_user_async)):
+    """Stream today's present/late/absent counts for the manager's team"""
+    if not current_user.is_manager:
+        raise HTTPException(status_code=403, detail="Manager access required")
+    if current_user.employee_id is None:
+        raise HTTPException(status_code=404, detail="Employee profile not found for manager")
+    return event_stream(request, team_scope(current_user.employee_id))
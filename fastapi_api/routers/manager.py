@@ -8,31 +8,35 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from database import get_db
-from auth import get_current_user, get_user_role
+from fastapi_api.auth import get_current_user
 from models import (
     Employee, UserProfile, AttendanceLog, AttendanceSummary, 
     LeaveApplication, LeaveType, User, Department, Designation
 )
-from schemas import EmployeeProfile, AttendanceLog, LeaveApplication, LeaveType
+from schemas import EmployeeProfile
+from projections import rows, employee_rows_query, serialize_employee, leave_rows_query, serialize_leave
+from predicates import on_days
+
+# Django setup for the shared aggregation layer
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'hexaattendanceportal.settings')
+import django
+django.setup()
+
+from attendance.aggregates import employee_overview
+from attendance.periods import local_today
+from reports.rollups import refresh_leave_years
 
 router = APIRouter()
 
-def get_manager_employee(current_user, db):
-    """Get the employee record for the current manager user"""
-    # Get employee record for this manager
-    employee = db.query(Employee).filter(Employee.user_id == current_user.id).first()
-    if not employee:
+def get_manager_employee_id(current_user):
+    """Get the employee id of the current manager user"""
+    if current_user.employee_id is None:
         raise HTTPException(status_code=404, detail="Employee profile not found for manager")
-    return employee
+    return current_user.employee_id
 
-def is_manager(current_user, db):
-    """Check if current user is a manager"""
-    user_role = get_user_role(db, current_user.id)
-    return user_role in ['Manager', 'manager']
-
-def require_manager(current_user=Depends(get_current_user), db: Session = Depends(get_db)):
+def require_manager(current_user=Depends(get_current_user)):
     """Dependency to require manager role"""
-    if not is_manager(current_user, db):
+    if not current_user.is_manager:
         raise HTTPException(status_code=403, detail="Manager access required")
     return current_user
 
@@ -47,9 +51,9 @@ def get_manager_employees(
     db: Session = Depends(get_db)
 ):
     """Get all employees under this manager"""
-    manager_employee = get_manager_employee(current_user, db)
+    manager_employee_id = get_manager_employee_id(current_user)
     
-    query = db.query(Employee).filter(Employee.manager_id == manager_employee.employee_id)
+    query = employee_rows_query(db).filter(Employee.manager_id == manager_employee_id)
     
     if search:
         query = query.filter(
@@ -62,33 +66,8 @@ def get_manager_employees(
     total = query.count()
     offset = (page - 1) * limit
     
-    employees = query.offset(offset).limit(limit).all()
-    
-    # Get department and designation names
-    employee_list = []
-    for emp in employees:
-        dept_name = None
-        desig_name = None
-        
-        if emp.department_id:
-            dept = db.query(Department).filter(Department.department_id == emp.department_id).first()
-            dept_name = dept.department_name if dept else None
-            
-        if emp.designation_id:
-            desig = db.query(Designation).filter(Designation.designation_id == emp.designation_id).first()
-            desig_name = desig.designation_name if desig else None
-        
-        employee_list.append({
-            "employee_id": emp.employee_id,
-            "employee_code": emp.employee_code,
-            "first_name": emp.first_name,
-            "last_name": emp.last_name,
-            "email": emp.email,
-            "mobile": emp.mobile,
-            "department_name": dept_name,
-            "designation_name": desig_name,
-            "status": emp.status
-        })
+    # Department and designation names are joined in
+    employee_list = [serialize_employee(row) for row in rows(query.order_by(Employee.employee_id).offset(offset).limit(limit))]
     
     return {
         "employees": employee_list,
@@ -104,43 +83,20 @@ def get_employee_details(
     db: Session = Depends(get_db)
 ):
     """Get detailed information about a specific employee under this manager"""
-    manager_employee = get_manager_employee(current_user, db)
+    manager_employee_id = get_manager_employee_id(current_user)
     
     # Verify employee is under this manager
-    employee = db.query(Employee).filter(
+    employee = rows(employee_rows_query(db).filter(
         and_(
             Employee.employee_id == employee_id,
-            Employee.manager_id == manager_employee.employee_id
+            Employee.manager_id == manager_employee_id
         )
-    ).first()
+    ).limit(1))
     
     if not employee:
         raise HTTPException(status_code=404, detail="Employee not found or not under your management")
     
-    # Get department and designation names
-    dept_name = None
-    desig_name = None
-    
-    if employee.department_id:
-        dept = db.query(Department).filter(Department.department_id == employee.department_id).first()
-        dept_name = dept.department_name if dept else None
-        
-    if employee.designation_id:
-        desig = db.query(Designation).filter(Designation.designation_id == employee.designation_id).first()
-        desig_name = desig.designation_name if desig else None
-    
-    return {
-        "employee_id": employee.employee_id,
-        "employee_code": employee.employee_code,
-        "first_name": employee.first_name,
-        "last_name": employee.last_name,
-        "email": employee.email,
-        "mobile": employee.mobile,
-        "department_name": dept_name,
-        "designation_name": desig_name,
-        "date_of_joining": employee.date_of_joining,
-        "status": employee.status
-    }
+    return serialize_employee(employee[0])
 
 # === ATTENDANCE MANAGEMENT ENDPOINTS ===
 
@@ -152,47 +108,15 @@ def get_team_attendance_overview(
     db: Session = Depends(get_db)
 ):
     """Get attendance overview for all team members"""
-    manager_employee = get_manager_employee(current_user, db)
+    manager_employee_id = get_manager_employee_id(current_user)
     
     # Default to current month if dates not provided
     if not start_date:
-        start_date = date.today().replace(day=1)
+        start_date = local_today().replace(day=1)
     if not end_date:
-        end_date = date.today()
+        end_date = local_today()
     
-    # Get employees under this manager
-    employees = db.query(Employee).filter(Employee.manager_id == manager_employee.employee_id).all()
-    
-    attendance_data = []
-    
-    for emp in employees:
-        # Get attendance summary for this period
-        summaries = db.query(AttendanceSummary).filter(
-            and_(
-                AttendanceSummary.employee_id == emp.employee_id,
-                AttendanceSummary.date >= start_date,
-                AttendanceSummary.date <= end_date
-            )
-        ).all()
-        
-        # Calculate statistics
-        total_days = len(summaries)
-        present_days = len([s for s in summaries if s.status == 'present'])
-        absent_days = len([s for s in summaries if s.status == 'absent'])
-        half_days = len([s for s in summaries if s.status == 'half_day'])
-        
-        attendance_data.append({
-            "employee_id": emp.employee_id,
-            "employee_name": f"{emp.first_name} {emp.last_name}",
-            "employee_code": emp.employee_code,
-            "total_days": total_days,
-            "present_days": present_days,
-            "absent_days": absent_days,
-            "half_days": half_days,
-            "attendance_percentage": round((present_days + half_days * 0.5) / total_days * 100, 2) if total_days > 0 else 0
-        })
-    
-    return attendance_data
+    return employee_overview(start_date, end_date, manager_id=manager_employee_id)
 
 @router.get("/manager/attendance/{employee_id}")
 def get_employee_attendance_details(
@@ -203,13 +127,13 @@ def get_employee_attendance_details(
     db: Session = Depends(get_db)
 ):
     """Get detailed attendance records for a specific employee"""
-    manager_employee = get_manager_employee(current_user, db)
+    manager_employee_id = get_manager_employee_id(current_user)
     
     # Verify employee is under this manager
     employee = db.query(Employee).filter(
         and_(
             Employee.employee_id == employee_id,
-            Employee.manager_id == manager_employee.employee_id
+            Employee.manager_id == manager_employee_id
         )
     ).first()
     
@@ -218,15 +142,14 @@ def get_employee_attendance_details(
     
     # Default to current month
     if not start_date:
-        start_date = date.today().replace(day=1)
+        start_date = local_today().replace(day=1)
     if not end_date:
-        end_date = date.today()
+        end_date = local_today()
     
     attendance_logs = db.query(AttendanceLog).filter(
         and_(
             AttendanceLog.employee_id == employee_id,
-            func.date(AttendanceLog.punch_time) >= start_date,
-            func.date(AttendanceLog.punch_time) <= end_date
+            on_days(AttendanceLog.punch_time, start_date, end_date)
         )
     ).order_by(AttendanceLog.punch_time.desc()).all()
     
@@ -259,38 +182,20 @@ def get_pending_leave_applications(
     db: Session = Depends(get_db)
 ):
     """Get pending leave applications for manager approval"""
-    manager_employee = get_manager_employee(current_user, db)
+    manager_employee_id = get_manager_employee_id(current_user)
     
     # Get pending leaves for employees under this manager
-    pending_leaves = db.query(LeaveApplication).join(Employee).filter(
+    pending_leaves = leave_rows_query(db).filter(
         and_(
-            Employee.manager_id == manager_employee.employee_id,
+            Employee.manager_id == manager_employee_id,
             LeaveApplication.status == 'pending'
         )
     ).order_by(LeaveApplication.applied_date.desc()).offset(
         (page - 1) * limit
-    ).limit(limit).all()
+    ).limit(limit)
     
-    leave_list = []
-    for leave in pending_leaves:
-        # Get leave type name
-        leave_type = db.query(LeaveType).filter(LeaveType.type_id == leave.leave_type_id).first()
-        leave_type_name = leave_type.type_name if leave_type else None
-        
-        leave_list.append({
-            "leave_id": leave.leave_id,
-            "employee_id": leave.employee_id,
-            "employee_name": f"{leave.employee.first_name} {leave.employee.last_name}",
-            "employee_code": leave.employee.employee_code,
-            "leave_type": leave_type_name,
-            "start_date": leave.start_date,
-            "end_date": leave.end_date,
-            "total_days": leave.total_days,
-            "reason": leave.reason,
-            "applied_date": leave.applied_date
-        })
-    
-    return leave_list
+    # Employee and leave type names are joined in
+    return [serialize_leave(row) for row in rows(pending_leaves)]
 
 @router.post("/manager/leaves/{leave_id}/approve")
 def approve_leave_application(
@@ -299,13 +204,13 @@ def approve_leave_application(
     db: Session = Depends(get_db)
 ):
     """Approve a leave application"""
-    manager_employee = get_manager_employee(current_user, db)
+    manager_employee_id = get_manager_employee_id(current_user)
     
     # Get the leave application and verify it belongs to an employee under this manager
     leave = db.query(LeaveApplication).join(Employee).filter(
         and_(
             LeaveApplication.leave_id == leave_id,
-            Employee.manager_id == manager_employee.employee_id,
+            Employee.manager_id == manager_employee_id,
             LeaveApplication.status == 'pending'
         )
     ).first()
@@ -320,6 +225,7 @@ def approve_leave_application(
     
     db.commit()
     db.refresh(leave)
+    refresh_leave_years({leave.applied_date.year})
     
     return {"message": "Leave application approved successfully"}
 
@@ -331,13 +237,13 @@ def reject_leave_application(
     db: Session = Depends(get_db)
 ):
     """Reject a leave application"""
-    manager_employee = get_manager_employee(current_user, db)
+    manager_employee_id = get_manager_employee_id(current_user)
     
     # Get the leave application and verify it belongs to an employee under this manager
     leave = db.query(LeaveApplication).join(Employee).filter(
         and_(
             LeaveApplication.leave_id == leave_id,
-            Employee.manager_id == manager_employee.employee_id,
+            Employee.manager_id == manager_employee_id,
             LeaveApplication.status == 'pending'
         )
     ).first()
@@ -352,6 +258,7 @@ def reject_leave_application(
     
     db.commit()
     db.refresh(leave)
+    refresh_leave_years({leave.applied_date.year})
     
     return {"message": "Leave application rejected successfully"}
 
@@ -363,24 +270,24 @@ def get_manager_dashboard(
     db: Session = Depends(get_db)
 ):
     """Get manager dashboard data"""
-    manager_employee = get_manager_employee(current_user, db)
+    manager_employee_id = get_manager_employee_id(current_user)
     
     # Get team size
-    team_size = db.query(Employee).filter(Employee.manager_id == manager_employee.employee_id).count()
+    team_size = db.query(Employee).filter(Employee.manager_id == manager_employee_id).count()
     
     # Get pending leave applications count
     pending_leaves_count = db.query(LeaveApplication).join(Employee).filter(
         and_(
-            Employee.manager_id == manager_employee.employee_id,
+            Employee.manager_id == manager_employee_id,
             LeaveApplication.status == 'pending'
         )
     ).count()
     
     # Get today's attendance statistics
-    today = date.today()
+    today = local_today()
     
     # Get all team members
-    team_employees = db.query(Employee).filter(Employee.manager_id == manager_employee.employee_id).all()
+    team_employees = db.query(Employee).filter(Employee.manager_id == manager_employee_id).all()
     employee_ids = [emp.employee_id for emp in team_employees]
     
     if employee_ids:
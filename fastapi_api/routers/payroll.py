@@ -6,18 +6,9 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from database import get_db
-from auth import get_current_user
+from fastapi_api.auth import get_current_user, require_employee_id
 from models import Payslip
 from schemas import Payslip as PayslipSchema
-# Helper function to get employee from user
-def get_employee_from_user(user, db):
-    from models import Employee
-    employee = db.query(Employee).filter(Employee.user_id == user.id).first()
-    if not employee:
-        from fastapi import HTTPException
-        raise HTTPException(status_code=404, detail="Employee profile not found")
-    return employee
-
 router = APIRouter()
 
 @router.get("/payroll/payslips", response_model=List[PayslipSchema])
@@ -27,12 +18,12 @@ def get_payslips(
     current_user=Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    employee = get_employee_from_user(current_user, db)
+    employee_id = require_employee_id(current_user)
     offset = (page - 1) * limit
 
     payslips = (
         db.query(Payslip)
-        .filter(Payslip.employee_id == employee.employee_id)
+        .filter(Payslip.employee_id == employee_id)
         .order_by(Payslip.generated_date.desc())
         .offset(offset)
         .limit(limit)
@@ -6,13 +6,13 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from database import get_db
-from auth import get_current_user
+from fastapi_api.auth import get_current_user, require_employee_id
 from models import Employee, Department, Designation
 from schemas import EmployeeProfile
 # Helper function to get employee from user
 def get_employee_from_user(user, db):
     from models import Employee
-    employee = db.query(Employee).filter(Employee.user_id == user.id).first()
+    employee = db.query(Employee).filter(Employee.employee_id == require_employee_id(user)).first()
     if not employee:
         from fastapi import HTTPException
         raise HTTPException(status_code=404, detail="Employee profile not found")
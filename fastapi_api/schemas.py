@@ -62,6 +62,7 @@ class AttendanceLog(AttendanceLogBase):
     attendance_id: int
     employee_id: int
     status: str
+    selfie_thumb_url: Optional[str] = None
 
     class Config:
         from_attributes = True
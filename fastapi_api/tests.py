@@ -0,0 +1,457 @@
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+from contextlib import contextmanager
+from datetime import date, datetime
+
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool, StaticPool
+
+from attendance.ingest import MAX_BATCH_SIZE
+from core.access import user_caches
+from hexaattendanceportal.metrics import QueryStats, _request_stats
+from master.models import Device, Employee as EmployeeRecord
+from fastapi_api.auth import Principal, get_current_user_async, principal_cache
+from fastapi_api.main import app as main_app
+from fastapi_api.routers.live import Broadcaster
+from fastapi_api.routers import (
+    admin, async_attendance, attendance, devices, employee_attendance, employee_leave, manager
+)
+
+# Router modules put fastapi_api on sys.path, so these are the models they query
+from database import Base, database_url, engine_options, get_async_db
+from models import (
+    User, UserProfile, Role, Employee, Department, Designation, LeaveApplication, LeaveType, AttendanceLog,
+    AttendanceSummary
+)
+from pagination import _before
+from predicates import StoredDateTime, in_month, in_year, on_days
+
+# Every list endpoint must stay within this many queries, whatever the page size
+MAX_QUERIES = 2
+
+
+@contextmanager
+def count_queries(engine):
+    """Count the SQL statements executed on ``engine`` inside the block"""
+    executed = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield executed
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+
+class ApiTestCase(SimpleTestCase):
+    """Routers served from an in-memory database, with authentication stubbed out"""
+
+    def setUp(self):
+        self.engine = create_engine('sqlite://', connect_args={'check_same_thread': False}, poolclass=StaticPool)
+        Base.metadata.create_all(self.engine)
+        self.db = sessionmaker(bind=self.engine)()
+
+        app = FastAPI()
+        for router in (admin, manager, employee_leave, employee_attendance, attendance):
+            app.include_router(router.router)
+            app.dependency_overrides[router.get_db] = lambda: self.db
+        app.dependency_overrides[admin.require_admin] = lambda: Principal(1, 'admin', 'Admin', None, True)
+        app.dependency_overrides[manager.require_manager] = lambda: Principal(2, 'manager', 'Manager', 1, True)
+        app.dependency_overrides[employee_leave.get_current_user] = lambda: Principal(3, 'employee', 'Employee', 2, True)
+        self.client = TestClient(app)
+
+        self.db.add_all([
+            Role(role_id=1, role_name='Admin'),
+            Role(role_id=2, role_name='Employee'),
+            Department(department_id=1, department_name='Engineering'),
+            Designation(designation_id=1, designation_name='Engineer'),
+            LeaveType(type_id=1, type_name='Casual Leave'),
+            User(id=1, username='admin', email='admin@example.com', first_name='Ada', last_name='Admin'),
+            Employee(employee_id=1, employee_code='M001', first_name='Mira', last_name='Manager',
+                     email='m001@example.com', department_id=1, designation_id=1, date_of_joining=date(2024, 1, 1)),
+        ])
+        self.db.commit()
+        self.next_id = 2
+
+    def tearDown(self):
+        self.db.close()
+        self.engine.dispose()
+
+
+class ListEndpointQueryCountTests(ApiTestCase):
+    """List endpoints return flat joined rows in a constant number of queries"""
+
+    def add_employees(self, count):
+        """Employees reporting to the manager, each with a user, profile and two leave applications"""
+        for _ in range(count):
+            n = self.next_id
+            self.next_id += 1
+            self.db.add_all([
+                User(id=n, username=f'user{n}', email=f'user{n}@example.com', first_name='User', last_name=str(n)),
+                UserProfile(id=n, user_id=n, role_id=2),
+                Employee(employee_id=n, user_id=n, employee_code=f'E{n:03d}', first_name='Emp', last_name=str(n),
+                         email=f'e{n}@example.com', department_id=1, designation_id=1, manager_id=1,
+                         date_of_joining=date(2024, 1, 1)),
+                LeaveApplication(employee_id=n, leave_type_id=1, start_date=date(2025, 1, 6), end_date=date(2025, 1, 7),
+                                 total_days=2, reason='Trip', status='pending', applied_date=datetime(2025, 1, 1)),
+                LeaveApplication(employee_id=2, leave_type_id=1, start_date=date(2025, 2, 3), end_date=date(2025, 2, 3),
+                                 total_days=1, reason='Errand', status='approved', approved_by_id=1,
+                                 applied_date=datetime(2025, 1, 2)),
+            ])
+        self.db.commit()
+
+    def query_counts(self, url):
+        """Queries for ``url`` with a small and a large data set"""
+        counts = []
+        for count in (3, 30):
+            self.add_employees(count)
+            with count_queries(self.engine) as executed:
+                response = self.client.get(url, params={'limit': 100})
+            self.assertEqual(response.status_code, 200, response.text)
+            counts.append(len(executed))
+        return counts
+
+    def assertBounded(self, url):
+        small, large = self.query_counts(url)
+        self.assertEqual(small, large)
+        self.assertLessEqual(large, MAX_QUERIES)
+
+    def test_admin_users(self):
+        self.assertBounded('/admin/users')
+
+    def test_admin_employees(self):
+        self.assertBounded('/admin/employees')
+
+    def test_admin_leave_applications(self):
+        self.assertBounded('/admin/leaves/applications')
+
+    def test_manager_employees(self):
+        self.assertBounded('/manager/employees')
+
+    def test_manager_pending_leaves(self):
+        self.assertBounded('/manager/leaves/pending')
+
+    def test_employee_leave_status(self):
+        self.assertBounded('/employee/leave/status')
+
+    def test_rows_are_flat_and_joined(self):
+        self.add_employees(1)
+        users = self.client.get('/admin/users').json()['users']
+        employee_user = next(user for user in users if user['id'] == 2)
+        self.assertEqual(employee_user['role'], 'Employee')
+        self.assertEqual(employee_user['employee_info']['employee_code'], 'E002')
+
+        employees = self.client.get('/admin/employees').json()['employees']
+        employee = next(employee for employee in employees if employee['employee_id'] == 2)
+        self.assertEqual(employee['department_name'], 'Engineering')
+        self.assertEqual(employee['manager_name'], 'Mira Manager')
+
+        leaves = self.client.get('/employee/leave/status').json()['leaves']
+        approved = next(leave for leave in leaves if leave['status'] == 'approved')
+        self.assertEqual(approved['leave_type'], 'Casual Leave')
+        self.assertEqual(approved['approved_by'], 'Ada Admin')
+
+
+class CursorPaginationTests(ApiTestCase):
+    """Log and history endpoints page on (punch_time, attendance_id) with opaque cursors"""
+
+    def setUp(self):
+        super().setUp()
+        self.client.app.dependency_overrides[attendance.get_current_user] = lambda: Principal(2, 'manager', 'Manager', 1, True)
+        # Pairs of punches share a timestamp so the id breaks ties
+        self.db.add_all([
+            AttendanceLog(attendance_id=n, employee_id=1, punch_type='IN', status='approved',
+                          punch_time=datetime(2025, 1, 1 + n // 2, 9, 0))
+            for n in range(1, 24)
+        ])
+        self.db.commit()
+
+    def walk(self, url, key):
+        ids, cursor = [], None
+        while True:
+            params = {'limit': 5}
+            if cursor:
+                params['cursor'] = cursor
+            body = self.client.get(url, params=params).json()
+            ids += [log['attendance_id'] for log in body[key]]
+            cursor = body['next_cursor']
+            if cursor is None:
+                return ids, body
+
+    def test_cursor_walk_matches_offset_pages(self):
+        ids, body = self.walk('/admin/attendance/logs', 'logs')
+        self.assertEqual(len(ids), 23)
+        self.assertEqual(body['total'], 23)
+
+        offset_ids = []
+        for page in range(1, 6):
+            logs = self.client.get('/admin/attendance/logs', params={'limit': 5, 'page': page}).json()['logs']
+            offset_ids += [log['attendance_id'] for log in logs]
+        self.assertEqual(ids, offset_ids)
+        self.assertEqual(ids, sorted(ids, key=lambda n: (1 + n // 2, n), reverse=True))
+
+    def test_offset_page_returns_cursor_to_continue(self):
+        body = self.client.get('/admin/attendance/logs', params={'limit': 5, 'page': 2}).json()
+        following = self.client.get('/admin/attendance/logs', params={'limit': 5, 'cursor': body['next_cursor']}).json()
+        third = self.client.get('/admin/attendance/logs', params={'limit': 5, 'page': 3}).json()
+        self.assertEqual(following['logs'], third['logs'])
+
+    def test_history_list_carries_cursor_in_header(self):
+        app_ids, cursor = [], None
+        while True:
+            params = {'limit': 10, 'cursor': cursor} if cursor else {'limit': 10}
+            response = self.client.get('/attendance/history', params=params)
+            app_ids += [log['attendance_id'] for log in response.json()]
+            cursor = response.headers.get('X-Next-Cursor')
+            if not cursor:
+                break
+        self.assertEqual(len(app_ids), 23)
+        self.assertEqual(len(set(app_ids)), 23)
+
+    def test_invalid_cursor_is_rejected(self):
+        response = self.client.get('/admin/attendance/logs', params={'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 400)
+
+
+class DatetimeBindTests(SimpleTestCase):
+    """Datetime bounds are compared as stored text on SQLite only"""
+
+    def sql(self, clause, dialect):
+        return str(clause.compile(dialect=dialect, compile_kwargs={'literal_binds': True}))
+
+    moment = datetime(2025, 1, 6, 9, 0)
+
+    def test_bound_values(self):
+        self.assertEqual(StoredDateTime().process_bind_param(self.moment, sqlite.dialect()), '2025-01-06 09:00:00')
+        self.assertEqual(
+            StoredDateTime(microseconds=True).process_bind_param(self.moment, sqlite.dialect()), '2025-01-06 09:00:00.000000'
+        )
+        self.assertEqual(StoredDateTime(microseconds=True).process_bind_param(self.moment, postgresql.dialect()), self.moment)
+
+    def test_cursor_key(self):
+        clause = _before([AttendanceLog.punch_time, AttendanceLog.attendance_id], [self.moment, 5])
+        self.assertIn(
+            "punch_time BETWEEN '2025-01-06 09:00:00' AND '2025-01-06 09:00:00.000000'", self.sql(clause, sqlite.dialect())
+        )
+        self.assertIn(
+            "punch_time BETWEEN '2025-01-06 09:00:00' AND '2025-01-06 09:00:00' AND", self.sql(clause, postgresql.dialect())
+        )
+
+    def test_day_bounds(self):
+        clause = on_days(AttendanceLog.punch_time, date(2025, 1, 6))
+        self.assertEqual(
+            [type(bind.type).__name__ for bind in (clause.clauses[0].right, clause.clauses[1].right)], ['StoredDateTime'] * 2
+        )
+        # Local midnight in Asia/Kolkata, as naive UTC
+        self.assertIn("punch_time >= '2025-01-05 18:30:00'", self.sql(clause, sqlite.dialect()))
+        self.assertEqual(
+            clause.clauses[0].right.type.process_bind_param(clause.clauses[0].right.value, postgresql.dialect()),
+            datetime(2025, 1, 5, 18, 30),
+        )
+
+
+class AsyncRouterTests(SimpleTestCase):
+    """The async endpoints answer exactly like the sync ones they replace"""
+
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(handle)
+        self.engine = create_engine(f'sqlite:///{self.path}')
+        Base.metadata.create_all(self.engine)
+        self.db = sessionmaker(bind=self.engine)()
+        self.async_engine = create_async_engine(f'sqlite+aiosqlite:///{self.path}', poolclass=NullPool)
+        async_session = async_sessionmaker(self.async_engine, expire_on_commit=False)
+
+        async def get_test_async_db():
+            async with async_session() as db:
+                yield db
+
+        admin_user = Principal(1, 'admin', 'Admin', 1, True)
+        app = FastAPI()
+        app.include_router(employee_attendance.router, prefix='/sync')
+        app.include_router(admin.router, prefix='/sync')
+        app.include_router(async_attendance.router, prefix='/async')
+        app.dependency_overrides[employee_attendance.get_db] = lambda: self.db
+        app.dependency_overrides[get_async_db] = get_test_async_db
+        app.dependency_overrides[employee_attendance.get_current_user] = lambda: admin_user
+        app.dependency_overrides[get_current_user_async] = lambda: admin_user
+        self.client = TestClient(app)
+
+        self.db.add_all([
+            Role(role_id=1, role_name='Admin'),
+            Department(department_id=1, department_name='Engineering'),
+            User(id=1, username='admin', email='admin@example.com', first_name='Ada', last_name='Admin'),
+            Employee(employee_id=1, employee_code='M001', first_name='Mira', last_name='Manager',
+                     email='m001@example.com', department_id=1, date_of_joining=date(2024, 1, 1)),
+        ] + [
+            AttendanceLog(attendance_id=n, employee_id=1, punch_type='IN', status='approved', selfie_url='',
+                          punch_time=datetime(2025, 1, 1 + n // 2, 9, 0))
+            for n in range(1, 12)
+        ])
+        self.db.commit()
+
+    def tearDown(self):
+        self.client.close()
+        self.db.close()
+        self.engine.dispose()
+        os.remove(self.path)
+
+    def assertSameResponse(self, path, **params):
+        sync = self.client.get('/sync' + path, params=params)
+        response = self.client.get('/async' + path, params=params)
+        self.assertEqual(sync.status_code, 200, sync.text)
+        self.assertEqual(response.json(), sync.json())
+        return response.json()
+
+    def test_history_pages_match(self):
+        body = self.assertSameResponse('/employee/attendance/history', limit=4)
+        self.assertSameResponse('/employee/attendance/history', limit=4, cursor=body['next_cursor'])
+
+    def test_today_and_dashboard_match(self):
+        self.assertSameResponse('/employee/attendance/today')
+        self.assertSameResponse('/admin/dashboard')
+
+    def test_async_routes_are_served_by_the_app(self):
+        served = {route.path: route.endpoint for route in main_app.routes if hasattr(route, 'endpoint')}
+        for route in async_attendance.router.routes:
+            self.assertIs(served.get(route.path), route.endpoint, route.path)
+
+    def test_async_punch_is_stored(self):
+        response = self.client.post('/async/employee/attendance/mark', data={
+            'punch_type': 'out', 'punch_time': '2025-01-10T18:30:00+05:30'
+        })
+        self.assertEqual(response.status_code, 200, response.text)
+        log = self.db.get(AttendanceLog, response.json()['attendance_id'])
+        self.assertEqual((log.punch_type, log.punch_time), ('OUT', datetime(2025, 1, 10, 13, 0)))
+
+
+class DevicePunchTests(TransactionTestCase):
+    """The device route hands JSON and NDJSON batches to attendance.ingest"""
+
+    def setUp(self):
+        Device.objects.create(device_name='Gate', serial_number='SN1', ip_address='10.0.0.1')
+        EmployeeRecord.objects.create(employee_code='E1', first_name='E', last_name='X', email='e1@example.com',
+                                      date_of_joining=date(2024, 1, 1))
+        app = FastAPI()
+        app.include_router(devices.router)
+        self.client = TestClient(app)
+
+    def tearDown(self):
+        self.client.close()
+
+    def punch(self, punch_type='IN', employee_code='E1'):
+        return {'employee_code': employee_code, 'punch_type': punch_type, 'punch_time': '2025-01-06T09:00:00+05:30'}
+
+    def test_json_array_and_object(self):
+        response = self.client.post('/api/devices/SN1/punches', json=[self.punch(), self.punch(employee_code='E9')])
+        self.assertEqual(response.status_code, 200, response.text)
+        self.assertEqual([row['status'] for row in response.json()['results']], ['created', 'error'])
+        response = self.client.post('/api/devices/SN1/punches', json={'punches': [self.punch(), self.punch('OUT')]})
+        self.assertEqual([row['status'] for row in response.json()['results']], ['duplicate', 'created'])
+
+    def test_ndjson(self):
+        body = '\n'.join(json.dumps(punch) for punch in (self.punch(), self.punch('OUT'), self.punch('OUT')))
+        response = self.client.post('/api/devices/SN1/punches', content=body,
+                                    headers={'content-type': 'application/x-ndjson'})
+        self.assertEqual(response.status_code, 200, response.text)
+        self.assertEqual((response.json()['created'], response.json()['duplicates']), (2, 1))
+
+    def test_bad_requests(self):
+        response = self.client.post('/api/devices/SN1/punches', content='{"employee_code": ',
+                                    headers={'content-type': 'application/x-ndjson'})
+        self.assertEqual((response.status_code, response.json()['detail']), (400, 'Invalid JSON on line 1'))
+        response = self.client.post('/api/devices/SN1/punches', json=[self.punch()] * (MAX_BATCH_SIZE + 1))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.post('/api/devices/SN9/punches', json=[self.punch()]).status_code, 404)
+
+
+class PrincipalCacheTests(SimpleTestCase):
+
+    def test_invalidated_by_the_core_access_receivers(self):
+        self.assertIn(principal_cache, user_caches)
+
+
+class LiveBroadcasterTests(SimpleTestCase):
+
+    def test_refresh_loop_does_not_inherit_the_first_viewers_context(self):
+        seen = []
+
+        class Live:
+            def refresh(self):
+                seen.append(_request_stats.get())
+
+        async def first_viewer():
+            broadcaster = Broadcaster(Live())
+            _request_stats.set(QueryStats(None))
+            broadcaster.viewers = 1
+            broadcaster.start()
+            while not seen:
+                await asyncio.sleep(0.01)
+            broadcaster.viewers = 0
+            broadcaster.poke()
+            await broadcaster.task
+
+        asyncio.run(first_viewer())
+        self.assertEqual(seen, [None])
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN is SQLite specific')
+class PredicatePlanTests(TestCase):
+    """Router date predicates search the indexes created by the Django migrations"""
+
+    def plan(self, query):
+        sql = str(query.statement.compile(dialect=sqlite.dialect(), compile_kwargs={'literal_binds': True}))
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+            return ' '.join(row[-1] for row in cursor.fetchall())
+
+    def setUp(self):
+        self.db = sessionmaker()()
+
+    def test_punches_on_days(self):
+        plan = self.plan(self.db.query(AttendanceLog).filter(
+            AttendanceLog.employee_id == 1, on_days(AttendanceLog.punch_time, date(2025, 1, 1), date(2025, 1, 31))
+        ))
+        self.assertIn('USING INDEX attlog_employee_time_idx', plan)
+
+    def test_summaries_in_month(self):
+        plan = self.plan(self.db.query(AttendanceSummary).filter(
+            AttendanceSummary.employee_id == 1, in_month(AttendanceSummary.date, 2025, 1)
+        ))
+        self.assertNotIn('SCAN attendance_attendancesummary', plan)
+
+    def test_leave_in_year(self):
+        plan = self.plan(self.db.query(LeaveApplication).filter(
+            LeaveApplication.employee_id == 1, in_year(LeaveApplication.start_date, 2025)
+        ))
+        self.assertIn('USING INDEX leave_emp_start_status_idx', plan)
+
+
+class DatabaseConfigTests(SimpleTestCase):
+    """The SQLAlchemy engine is configured from Django's DATABASES"""
+
+    def test_sqlite_url_and_pool(self):
+        database = {'ENGINE': 'django.db.backends.sqlite3', 'NAME': '/srv/app/db.sqlite3', 'OPTIONS': {'timeout': 20}}
+        self.assertEqual(database_url(database).render_as_string(), 'sqlite:////srv/app/db.sqlite3')
+        options = engine_options(database, {'size': 3, 'recycle': 600})
+        self.assertEqual((options['pool_size'], options['pool_recycle']), (3, 600))
+        self.assertEqual(options['connect_args'], {'check_same_thread': False, 'timeout': 20})
+
+    def test_server_url(self):
+        database = {'ENGINE': 'django.db.backends.postgresql', 'NAME': 'hexa', 'USER': 'app', 'PASSWORD': 's3cret',
+                    'HOST': 'db', 'PORT': '5432'}
+        self.assertEqual(database_url(database).render_as_string(hide_password=False),
+                         'postgresql+psycopg2://app:s3cret@db:5432/hexa')
+        self.assertNotIn('connect_args', engine_options(database, {}))
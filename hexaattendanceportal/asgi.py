@@ -13,21 +13,28 @@ import sys
 # Add the fastapi_api directory to Python path
 sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'fastapi_api'))
 
-from django.core.asgi import get_asgi_application
-from fastapi import FastAPI
-from fastapi.middleware.wsgi import WSGIMiddleware
+from fastapi.responses import PlainTextResponse
+from starlette.routing import Mount
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'hexaattendanceportal.settings')
 
-# Import the FastAPI app from fastapi_api/main.py
-from fastapi_app.main import app as fastapi_app
+# Import the FastAPI app from fastapi_api/main.py; it sets up Django and mounts it at "/"
+from fastapi_api.main import app as fastapi_app, django_app
+from hexaattendanceportal.metrics import registry
 
 @fastapi_app.get("/api/health")
 def health_check():
     return {"status": "ok"}
 
-# Mount Django under FastAPI
-fastapi_app.mount("/", WSGIMiddleware(get_asgi_application()))
+@fastapi_app.get("/api/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Per-route request metrics in the Prometheus text format"""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+# Routes are matched in order and Django's mount at "/" matches everything, so keep it last
+django_mount = next(route for route in fastapi_app.routes if isinstance(route, Mount) and route.app is django_app)
+fastapi_app.router.routes.remove(django_mount)
+fastapi_app.router.routes.append(django_mount)
 
 # Entry point for uvicorn
 application = fastapi_app
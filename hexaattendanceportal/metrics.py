@@ -0,0 +1,294 @@
+"""Per-route request metrics for the Django views and the FastAPI routers.
+
+Each request records its wall time, the time spent in database queries,
+the number of queries and the response size, keyed by stack, method and
+route template (``attendance/mark/``, ``/employee/attendance/history``),
+never the raw path, so the number of series stays fixed.
+
+Quantiles come from the most recent METRICS_WINDOW samples of each route;
+sums and counts are cumulative, as Prometheus expects. Recording a
+request costs a few appends under one lock and a query a perf_counter()
+pair; sorting happens only when /api/metrics is scraped.
+
+Queries are attributed through a context variable holding the current
+request's QueryStats: Django connections get an execute wrapper and
+SQLAlchemy engines a pair of cursor events that add to it. Sampled
+requests also carry a core.querywatch.QueryTrace, which fingerprints
+each statement to catch N+1 patterns and slow queries.
+"""
+import logging
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from sqlalchemy import event
+from starlette.concurrency import run_in_threadpool
+
+from core.querywatch import start_trace
+
+logger = logging.getLogger(__name__)
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+_request_stats = ContextVar('request_stats', default=None)
+
+
+class QueryStats:
+    """Database queries made while handling one request"""
+
+    __slots__ = ('count', 'seconds', 'trace')
+
+    def __init__(self, trace=None):
+        self.count = 0
+        self.seconds = 0.0
+        self.trace = trace
+
+    def add(self, seconds, sql, params, source):
+        self.count += 1
+        self.seconds += seconds
+        if self.trace is not None:
+            self.trace.record(sql, params, seconds, source)
+
+
+class RollingSummary:
+    """Cumulative count and sum, plus the latest ``window`` samples for quantiles"""
+
+    __slots__ = ('count', 'total', 'samples')
+
+    def __init__(self, window):
+        self.count = 0
+        self.total = 0.0
+        self.samples = deque(maxlen=window)
+
+    def observe(self, value):
+        self.count += 1
+        self.total += value
+        self.samples.append(value)
+
+
+def quantiles(samples):
+    ordered = sorted(samples)
+    return [(q, ordered[min(len(ordered) - 1, int(len(ordered) * q))]) for q in QUANTILES] if ordered else []
+
+
+class RouteMetrics:
+    __slots__ = ('duration', 'db_time', 'queries', 'size', 'statuses')
+
+    def __init__(self, window):
+        self.duration = RollingSummary(window)
+        self.db_time = RollingSummary(window)
+        self.queries = RollingSummary(window)
+        self.size = RollingSummary(window)
+        self.statuses = {}
+
+
+# (metric name, RouteMetrics attribute, help text) for each summary
+SUMMARIES = [
+    ('http_request_duration_seconds', 'duration', 'Wall time to produce the response'),
+    ('http_request_db_seconds', 'db_time', 'Time spent in database queries'),
+    ('http_request_queries', 'queries', 'Database queries per request'),
+    ('http_response_size_bytes', 'size', 'Response body size'),
+]
+
+
+def _labels(**labels):
+    def escape(value):
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return '{' + ','.join(f'{name}="{escape(value)}"' for name, value in labels.items()) + '}'
+
+
+class MetricsRegistry:
+
+    def __init__(self, window=None):
+        self.window = window
+        self.routes = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stack, method, route, status, duration, queries, size):
+        key = (stack, method, route)
+        with self._lock:
+            metrics = self.routes.get(key)
+            if metrics is None:
+                metrics = self.routes[key] = RouteMetrics(self.window or settings.METRICS_WINDOW)
+            metrics.duration.observe(duration)
+            metrics.db_time.observe(queries.seconds)
+            metrics.queries.observe(queries.count)
+            metrics.size.observe(size)
+            metrics.statuses[status] = metrics.statuses.get(status, 0) + 1
+
+    def totals(self):
+        """(requests, queries, database seconds) recorded so far over every route"""
+        with self._lock:
+            return (
+                sum(metrics.duration.count for metrics in self.routes.values()),
+                sum(metrics.queries.total for metrics in self.routes.values()),
+                sum(metrics.db_time.total for metrics in self.routes.values()),
+            )
+
+    def render(self):
+        """Prometheus text exposition format (version 0.0.4)"""
+        # Copy under the lock, sort outside it
+        with self._lock:
+            routes = [
+                (key, dict(metrics.statuses), {
+                    attribute: (summary.count, summary.total, list(summary.samples))
+                    for _, attribute, _ in SUMMARIES
+                    for summary in [getattr(metrics, attribute)]
+                })
+                for key, metrics in sorted(self.routes.items())
+            ]
+
+        lines = [
+            '# HELP http_requests_total Requests handled, by response status',
+            '# TYPE http_requests_total counter',
+        ]
+        for (stack, method, route), statuses, _ in routes:
+            for status, count in sorted(statuses.items()):
+                labels = _labels(stack=stack, method=method, route=route, status=status)
+                lines.append(f'http_requests_total{labels} {count}')
+
+        for name, attribute, help_text in SUMMARIES:
+            lines.append(f'# HELP {name} {help_text}; quantiles over the latest requests of each route')
+            lines.append(f'# TYPE {name} summary')
+            for (stack, method, route), _, summaries in routes:
+                count, total, samples = summaries[attribute]
+                for quantile, value in quantiles(samples):
+                    labels = _labels(stack=stack, method=method, route=route, quantile=quantile)
+                    lines.append(f'{name}{labels} {value:g}')
+                labels = _labels(stack=stack, method=method, route=route)
+                lines.append(f'{name}_sum{labels} {total:g}')
+                lines.append(f'{name}_count{labels} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+# === QUERY ATTRIBUTION ===
+
+def record_query(execute, sql, params, many, context):
+    """Django execute wrapper adding each query's time to the current request"""
+    stats = _request_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.add(time.perf_counter() - started, sql, None if many else params, 'django')
+
+
+def instrument(db_connection):
+    if record_query not in db_connection.execute_wrappers:
+        db_connection.execute_wrappers.append(record_query)
+
+
+@receiver(connection_created)
+def instrument_new_connection(sender, connection, **kwargs):
+    # Covers connections opened by worker threads, e.g. Django ORM calls from FastAPI endpoints
+    instrument(connection)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _request_stats.get() is not None:
+        conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _request_stats.get()
+    if stats is not None and conn.info.get('query_started'):
+        seconds = time.perf_counter() - conn.info['query_started'].pop()
+        stats.add(seconds, statement, None if executemany else parameters, 'sqlalchemy')
+
+
+def watch_engine(engine):
+    """Attribute an SQLAlchemy engine's queries to the current request (pass ``sync_engine`` for async engines)"""
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+
+
+def finish_trace(trace, stack, method, route):
+    """Report a flagged trace; a failure is logged rather than failing the request it describes"""
+    try:
+        trace.finish(stack, method, route)
+    except Exception:
+        logger.exception('Query report for %s %s %s failed', stack, method, route)
+
+
+# === MIDDLEWARE ===
+
+class RequestMetricsMiddleware:
+    """Django middleware recording every view under its URL pattern"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        instrument(connection)
+        stats = QueryStats(start_trace())
+        token = _request_stats.set(stats)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_stats.reset(token)
+        duration = time.perf_counter() - started
+
+        match = request.resolver_match
+        route = match.route if match else 'unmatched'
+        if response.streaming:
+            size = int(response.get('Content-Length') or 0)
+        else:
+            size = len(response.content)
+        registry.observe('django', request.method, route, response.status_code, duration, stats, size)
+        if stats.trace is not None and stats.trace.flagged():
+            finish_trace(stats.trace, 'django', request.method, route)
+        return response
+
+
+class ASGIMetricsMiddleware:
+    """ASGI middleware recording requests served by FastAPI routes.
+
+    Requests falling through to the mounted Django app carry no FastAPI
+    route and are left to RequestMetricsMiddleware.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats(start_trace())
+        token = _request_stats.set(stats)
+        response = {'status': 500, 'size': 0}
+
+        async def send_wrapper(message):
+            if message['type'] == 'http.response.start':
+                response['status'] = message['status']
+            elif message['type'] == 'http.response.body':
+                response['size'] += len(message.get('body', b''))
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_stats.reset(token)
+            route = scope.get('route')
+            if route is not None:
+                registry.observe(
+                    'fastapi', scope['method'], route.path, response['status'],
+                    time.perf_counter() - started, stats, response['size'],
+                )
+        if route is not None and stats.trace is not None and stats.trace.flagged():
+            # EXPLAIN and the report write are blocking; keep them off the event loop
+            await run_in_threadpool(finish_trace, stats.trace, 'fastapi', scope['method'], route.path)
+
@@ -41,6 +41,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'hexaattendanceportal.metrics.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -80,6 +81,17 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        # Keep connections open between requests, checking them before reuse
+        'CONN_MAX_AGE': 60,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            # Seconds a writer waits for the lock instead of failing with "database is locked"
+            'timeout': 20,
+            # Take the write lock when a transaction starts, not halfway through it
+            'transaction_mode': 'IMMEDIATE',
+            # WAL lets readers and one writer work concurrently; NORMAL sync is safe in WAL mode
+            'init_command': 'PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL;',
+        },
     }
 }
 
@@ -127,6 +139,12 @@ STATICFILES_DIRS = [
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Uploads are stored under their SHA-256, sharded two levels deep (core/storage.py)
+STORAGES = {
+    'default': {'BACKEND': 'core.storage.ContentAddressedStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
 # Custom user model - commented out to avoid issues
 # AUTH_USER_MODEL = 'core.UserProfile'
 
@@ -152,3 +170,49 @@ SOCIALACCOUNT_PROVIDERS = {
     },
 }
 
+
+# Report jobs: seconds a finished report artifact is kept and reused for identical requests
+REPORT_ARTIFACT_TTL = 24 * 60 * 60
+
+# Payroll: worker processes used to compute large payroll runs (0 or 1 = compute serially)
+PAYROLL_PARALLEL_WORKERS = 0
+
+# Payroll: seconds after which a run still in processing counts as abandoned and may be resumed
+PAYROLL_STALE_AFTER = 60 * 60
+
+# Payroll: prorate basic and earnings by paid days in the pay period (loss of pay)
+PAYROLL_PRORATE_ATTENDANCE = True
+
+# Attendance: seconds the summary engine keeps rechecking ids skipped below its high-water mark, for
+# punches whose transactions commit out of id order (the largest expected transaction duration)
+SUMMARY_LATE_COMMIT_WINDOW = 10 * 60
+
+# Attendance: time zone punches are bucketed into days in (punches are stored in UTC)
+ATTENDANCE_TIME_ZONE = 'Asia/Kolkata'
+
+# FastAPI: SQLAlchemy connection pool for DATABASES['default']
+SQLALCHEMY_POOL = {
+    'size': 5,
+    'max_overflow': 10,
+    'timeout': 30,
+    'recycle': 1800,
+    'pre_ping': True,
+}
+
+# Media uploads: largest accepted selfie, and the chunk size uploads are streamed to disk in
+MEDIA_UPLOAD_MAX_BYTES = 10 * 1024 * 1024
+MEDIA_UPLOAD_CHUNK_SIZE = 64 * 1024
+
+# Live dashboards: seconds between catch-up refreshes of the live attendance counts
+LIVE_ATTENDANCE_INTERVAL = 5
+
+# Request metrics: recent requests per route that /api/metrics quantiles are computed over
+METRICS_WINDOW = 1024
+
+# Query inspection: share of requests traced, executions of one statement per request that flag an N+1, slow statement threshold
+QUERY_TRACE_SAMPLE_RATE = 1.0 if DEBUG else 0.01
+QUERY_REPEAT_THRESHOLD = 10
+SLOW_QUERY_MS = 200
+
+# Benchmarks: SQLite file the benchmark command generates its synthetic dataset in, kept apart from DATABASES
+BENCHMARK_DATABASE = os.path.join(BASE_DIR, 'benchmark.sqlite3')
@@ -0,0 +1,24 @@
+# Generated by Django 5.1.2 on 2026-10-18 13:25
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leave', '0001_initial'),
+        ('master', '0005_employee_manager'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='leaveapplication',
+            index=models.Index(fields=['employee', 'start_date', 'status'], name='leave_emp_start_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='leaveapplication',
+            index=models.Index(fields=['status', 'start_date'], name='leave_status_start_idx'),
+        ),
+    ]
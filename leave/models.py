@@ -28,5 +28,11 @@ class LeaveApplication(models.Model):
     applied_date = models.DateTimeField(auto_now_add=True)
     approved_date = models.DateTimeField(null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['employee', 'start_date', 'status'], name='leave_emp_start_status_idx'),
+            models.Index(fields=['status', 'start_date'], name='leave_status_start_idx'),
+        ]
+
     def __str__(self):
         return f"{self.employee.employee_code} - {self.leave_type.type_name} ({self.start_date} to {self.end_date})"
@@ -5,6 +5,7 @@ from django.http import JsonResponse
 from django.contrib.auth.decorators import login_required
 from .models import Department, Designation, Shift, Employee, Device, Holiday, Task, TaskSubmission
 from .forms import TaskForm  # We'll create this form
+from core.derivatives import sized_urls
 
 @login_required
 def master_view(request):
@@ -63,7 +64,10 @@ def create_task(request):
 def task_detail(request, task_id):
     """View task details and submissions"""
     task = get_object_or_404(Task, pk=task_id)
-    submissions = TaskSubmission.objects.filter(task=task).select_related('submitted_by')
+    submissions = list(TaskSubmission.objects.filter(task=task).select_related('submitted_by'))
+    selfies = sized_urls([s.selfie.url for s in submissions if s.selfie], 'medium')
+    for submission in submissions:
+        submission.selfie_medium_url = selfies[submission.selfie.url] if submission.selfie else ''
     return render(request, 'master/task_detail.html', {
         'task': task,
         'submissions': submissions
@@ -0,0 +1,165 @@
+"""Pure payslip arithmetic on plain salary rows.
+
+Nothing here touches Django or the database, so the functions can run in
+worker processes that only receive pickled rows.
+"""
+from decimal import Decimal, ROUND_HALF_UP
+
+CENT = Decimal('0.01')
+HUNDRED = Decimal('100')
+TOTAL_FIELDS = ('total_employees', 'total_gross_pay', 'total_deductions', 'total_net_pay')
+
+
+def money(value):
+    """Round a Decimal amount to paise"""
+    return value.quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def compute_payslip(row):
+    """Compute one payslip from a salary row; every component amount is computed once.
+
+    When the row carries attendance as ``(paid_days, working_days)`` the
+    basic salary and fixed earnings are prorated by paid/working days (loss
+    of pay) and percentage components follow the earned basic; fixed
+    deductions are not prorated.
+    """
+    _, employee_id, basic_salary, components, attendance = row
+
+    def earned(amount):
+        if attendance is None:
+            return amount
+        paid_days, working_days = attendance
+        return money(amount * paid_days / working_days) if working_days else Decimal('0.00')
+
+    earned_basic = earned(basic_salary)
+    total_earnings = earned_basic
+    total_deductions = Decimal('0')
+    details = []
+
+    for component_id, component_type, amount, is_percentage, percentage_of_basic in components:
+        if is_percentage:
+            amount = money(percentage_of_basic / HUNDRED * earned_basic)
+        elif component_type == 'earning':
+            amount = earned(amount)
+        if component_type == 'earning':
+            total_earnings += amount
+        else:
+            total_deductions += amount
+        details.append((component_id, amount))
+
+    return {
+        'employee_id': employee_id,
+        'basic_salary': basic_salary,
+        'total_earnings': money(total_earnings),
+        'total_deductions': money(total_deductions),
+        'net_pay': money(total_earnings - total_deductions),
+        'paid_days': attendance[0] if attendance else None,
+        'working_days': attendance[1] if attendance else None,
+        'details': details,
+    }
+
+
+def summarize(payslips):
+    """Run totals for a list of computed payslips"""
+    return {
+        'total_employees': len(payslips),
+        'total_gross_pay': sum((p['total_earnings'] for p in payslips), Decimal('0')),
+        'total_deductions': sum((p['total_deductions'] for p in payslips), Decimal('0')),
+        'total_net_pay': sum((p['net_pay'] for p in payslips), Decimal('0')),
+    }
+
+
+def add_totals(a, b):
+    return {field: a[field] + b[field] for field in TOTAL_FIELDS}
+
+
+def compute_shard(rows):
+    """Payslips for one shard of salary rows plus the shard's totals"""
+    payslips = [compute_payslip(row) for row in rows]
+    return payslips, summarize(payslips)
+
+
+# === INTEGER-PAISE TRANSPORT FOR WORKER PROCESSES ===
+# Pickling Decimal objects costs more than computing the payslips, so shards
+# cross the process boundary as integer paise. Percentages of basic are
+# integer hundredths of a percent; the integer maths below reproduces
+# compute_payslip() exactly, including ROUND_HALF_UP.
+
+def to_paise(value):
+    # Salary fields have two decimal places, so this is exact
+    return int(value * 100)
+
+
+def from_paise(value):
+    return Decimal(value).scaleb(-2)
+
+
+def _round_half_up(numerator, denominator):
+    if numerator < 0:
+        return -((-numerator + denominator // 2) // denominator)
+    return (numerator + denominator // 2) // denominator
+
+
+def encode_row(row):
+    salary_id, employee_id, basic_salary, components, attendance = row
+    return (employee_id, to_paise(basic_salary), tuple(
+        (component_id, component_type == 'earning', to_paise(amount),
+         to_paise(percentage_of_basic) if is_percentage else None)
+        for component_id, component_type, amount, is_percentage, percentage_of_basic in components
+    ), (int(attendance[0] * 2), attendance[1]) if attendance else None)
+
+
+def compute_encoded_shard(rows):
+    """Process-pool entry point: integer-paise payslips for one shard of encoded rows and the shard's totals"""
+    payslips = []
+    gross = total_deductions = 0
+    for employee_id, basic, components, attendance in rows:
+        if attendance is None:
+            earned = lambda amount: amount
+        else:
+            # paid days travel as half-days so the ratio stays integral
+            paid_halves, working_days = attendance
+            earned = lambda amount: _round_half_up(amount * paid_halves, working_days * 2) if working_days else 0
+
+        earned_basic = earned(basic)
+        earnings = earned_basic
+        deductions = 0
+        details = []
+        for component_id, is_earning, amount, percentage in components:
+            if percentage is not None:
+                # basic (paise) * percentage (hundredths) / 100 / 100
+                amount = _round_half_up(earned_basic * percentage, 10000)
+            elif is_earning:
+                amount = earned(amount)
+            if is_earning:
+                earnings += amount
+            else:
+                deductions += amount
+            details.append((component_id, amount))
+        payslips.append((employee_id, basic, earnings, deductions, attendance, details))
+        gross += earnings
+        total_deductions += deductions
+    return payslips, (len(payslips), gross, total_deductions)
+
+
+def decode_totals(count, gross, deductions):
+    return {
+        'total_employees': count,
+        'total_gross_pay': from_paise(gross),
+        'total_deductions': from_paise(deductions),
+        'total_net_pay': from_paise(gross - deductions),
+    }
+
+
+def decode_payslip(payslip):
+    employee_id, basic, earnings, deductions, attendance, details = payslip
+    return {
+        'employee_id': employee_id,
+        'basic_salary': from_paise(basic),
+        'total_earnings': from_paise(earnings),
+        'total_deductions': from_paise(deductions),
+        'net_pay': from_paise(earnings - deductions),
+        'paid_days': Decimal(attendance[0]) / 2 if attendance else None,
+        'working_days': attendance[1] if attendance else None,
+        'details': [(component_id, from_paise(amount)) for component_id, amount in details],
+    }
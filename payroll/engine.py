@@ -0,0 +1,181 @@
+import math
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Prefetch, Q, Sum
+from django.utils import timezone
+
+from attendance.summaries import run_summary_engine
+from .calculation import add_totals, compute_encoded_shard, compute_shard, decode_payslip, decode_totals, encode_row
+from .models import EmployeeSalary, SalaryComponentValue, PayrollRun, Payslip, PayslipDetail
+from .proration import attendance_for_period
+
+# Below this many employees the pool start-up costs more than it saves
+PARALLEL_MIN_ROWS = 2000
+SHARDS_PER_WORKER = 4
+
+def load_salary_rows(exclude_employee_ids=(), attendance=None):
+    """Read every active salary and its component values as plain tuples.
+
+    Two queries in total: the salaries and one prefetch of their component
+    values with the component joined in. Rows are
+    ``(salary_id, employee_id, basic_salary, components, attendance)`` where each
+    component is ``(component_id, component_type, amount, is_percentage, percentage_of_basic)``
+    and attendance is the employee's ``(paid_days, working_days)`` from
+    ``attendance`` (None when the run is not prorated).
+    """
+    attendance = attendance or {}
+    salaries = EmployeeSalary.objects.filter(is_active=True).exclude(
+        employee_id__in=exclude_employee_ids
+    ).prefetch_related(
+        Prefetch('salarycomponentvalue_set', queryset=SalaryComponentValue.objects.select_related('component').order_by('component_id'))
+    ).order_by('salary_id')
+
+    return [
+        (
+            salary.salary_id,
+            salary.employee_id,
+            salary.basic_salary,
+            [
+                (value.component_id, value.component.component_type, value.amount, value.is_percentage, value.percentage_of_basic)
+                for value in salary.salarycomponentvalue_set.all()
+            ],
+            attendance.get(salary.employee_id),
+        )
+        for salary in salaries
+    ]
+
+
+def compute_parallel(rows, workers):
+    """Shard salary rows across a process pool and compute them with exact arithmetic.
+
+    Shards are contiguous slices of the salary_id-ordered rows and are sent
+    as integer paise (see payroll.calculation). Results come back in
+    submission order, so the payslips stay ordered for a single bulk
+    commit, and the run totals are reduced from the shard results.
+    """
+    encoded = [encode_row(row) for row in rows]
+    size = max(1, math.ceil(len(encoded) / (workers * SHARDS_PER_WORKER)))
+    shards = [encoded[start:start + size] for start in range(0, len(encoded), size)]
+
+    # spawn, not fork: children must not inherit the parent's DB connections
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+        results = list(pool.map(compute_encoded_shard, shards))
+
+    payslips = [decode_payslip(payslip) for shard, _ in results for payslip in shard]
+    count, gross, deductions = (sum(column) for column in zip(*(shard_totals for _, shard_totals in results)))
+    return payslips, decode_totals(count, gross, deductions)
+
+
+def compute_payslips(rows, workers=0):
+    """Compute payslips serially, or in a process pool for large runs when ``workers`` > 1"""
+    if workers > 1 and len(rows) >= PARALLEL_MIN_ROWS:
+        return compute_parallel(rows, workers)
+    return compute_shard(rows)
+
+
+def write_payslips(payroll_run, payslips, batch_size=1000):
+    """Insert computed payslips and their details with two bulk inserts"""
+    objects = [
+        Payslip(
+            payroll_run=payroll_run,
+            employee_id=payslip['employee_id'],
+            basic_salary=payslip['basic_salary'],
+            total_earnings=payslip['total_earnings'],
+            total_deductions=payslip['total_deductions'],
+            net_pay=payslip['net_pay'],
+            working_days=payslip['working_days'],
+            paid_days=payslip['paid_days'],
+        )
+        for payslip in payslips
+    ]
+    Payslip.objects.bulk_create(objects, batch_size=batch_size)
+
+    PayslipDetail.objects.bulk_create([
+        PayslipDetail(payslip_id=obj.payslip_id, component_id=component_id, amount=amount)
+        for obj, payslip in zip(objects, payslips)
+        for component_id, amount in payslip['details']
+    ], batch_size=batch_size)
+
+
+def claim_run(payroll_run):
+    """Atomically move a run to ``processing`` for this attempt; False when another attempt holds it.
+
+    Draft runs can be claimed, and so can runs left in processing by an
+    attempt that failed or has not finished within PAYROLL_STALE_AFTER.
+    The conditional UPDATE means two submits never both go ahead.
+    """
+    now = timezone.now()
+    claimed = PayrollRun.objects.filter(pk=payroll_run.pk).filter(
+        Q(status='draft')
+        | Q(status='processing', started_at__isnull=True)
+        | Q(status='processing', started_at__lt=now - timedelta(seconds=settings.PAYROLL_STALE_AFTER))
+    ).update(status='processing', started_at=now)
+    if claimed:
+        payroll_run.status = 'processing'
+        payroll_run.started_at = now
+    return bool(claimed)
+
+
+def process_payroll_run(payroll_run, batch_size=1000, workers=None):
+    """Compute and store every payslip of a run.
+
+    The run is marked ``processing`` first, payslips are computed in memory
+    (across ``workers`` processes, default ``settings.PAYROLL_PARALLEL_WORKERS``)
+    and written in a single transaction, and the run is then completed.
+    With ``settings.PAYROLL_PRORATE_ATTENDANCE`` earnings are prorated by
+    the paid days each employee has in the run's pay period; punches the
+    summary worker has not folded in yet are summarised first, so a lagging
+    or stopped worker cannot dock pay.
+    A run left in ``processing`` by a failed or abandoned attempt can be
+    processed again: employees that already have a payslip in it are
+    skipped. Raises ValueError when the run is not draft, or is being
+    processed by another attempt. Returns the number of payslips created.
+    """
+    if payroll_run.status not in ('draft', 'processing'):
+        raise ValueError(f'Payroll run is {payroll_run.get_status_display().lower()}, not draft')
+    if workers is None:
+        workers = settings.PAYROLL_PARALLEL_WORKERS
+    if not claim_run(payroll_run):
+        raise ValueError('Payroll run is already being processed')
+
+    try:
+        return _process_claimed_run(payroll_run, batch_size, workers)
+    except Exception:
+        # Release the claim so the run can be resumed straight away
+        PayrollRun.objects.filter(pk=payroll_run.pk, status='processing').update(started_at=None)
+        raise
+
+
+def _process_claimed_run(payroll_run, batch_size, workers):
+    existing = Payslip.objects.filter(payroll_run=payroll_run)
+    previous = existing.aggregate(
+        total_employees=Count('payslip_id'),
+        total_gross_pay=Sum('total_earnings'),
+        total_deductions=Sum('total_deductions'),
+        total_net_pay=Sum('net_pay'),
+    )
+    attendance = None
+    if settings.PAYROLL_PRORATE_ATTENDANCE:
+        run_summary_engine()
+        period = payroll_run.period
+        attendance = attendance_for_period(period.start_date, period.end_date)
+    rows = load_salary_rows(exclude_employee_ids=existing.values_list('employee_id', flat=True), attendance=attendance)
+    payslips, totals = compute_payslips(rows, workers)
+
+    # Payslips already stored by an interrupted attempt count towards the run
+    totals = add_totals(totals, {field: value or 0 for field, value in previous.items()})
+
+    try:
+        with transaction.atomic():
+            write_payslips(payroll_run, payslips, batch_size)
+            payroll_run.status = 'completed'
+            for field, value in totals.items():
+                setattr(payroll_run, field, value)
+            payroll_run.save()
+    except IntegrityError:
+        raise ValueError('Payslips of this run were written by another attempt; process it again to finish it')
+    return len(payslips)
@@ -0,0 +1,57 @@
+import os
+import random
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+
+from payroll.calculation import compute_shard
+from payroll.engine import compute_parallel
+
+
+def synthetic_rows(count, components, seed):
+    """Salary rows shaped like load_salary_rows() output, without touching the database"""
+    rng = random.Random(seed)
+    rows = []
+    for salary_id in range(1, count + 1):
+        basic = Decimal(rng.randrange(2000000, 20000000)) / 100
+        values = []
+        for component_id in range(1, components + 1):
+            component_type = 'earning' if component_id % 3 else 'deduction'
+            if component_id % 2:
+                values.append((component_id, component_type, Decimal('0'), True, Decimal(rng.randrange(100, 2500)) / 100))
+            else:
+                values.append((component_id, component_type, Decimal(rng.randrange(10000, 500000)) / 100, False, None))
+        # 22 working days with loss of pay in half-day steps
+        attendance = (Decimal(rng.randrange(30, 45)) / 2, 22)
+        rows.append((salary_id, salary_id, basic, values, attendance))
+    return rows
+
+
+class Command(BaseCommand):
+    help = 'Compare serial and process-pool payroll computation wall time at several employee counts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--counts', default='1000,10000,50000', help='Comma-separated employee counts')
+        parser.add_argument('--components', type=int, default=20, help='Salary components per employee')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Processes for the parallel mode')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        workers = options['workers']
+        self.stdout.write(f"{'employees':>10} {'serial (s)':>12} {f'{workers} procs (s)':>14} {'speedup':>8}")
+
+        for count in [int(c) for c in options['counts'].split(',')]:
+            rows = synthetic_rows(count, options['components'], options['seed'])
+
+            started = time.perf_counter()
+            serial_payslips, serial_totals = compute_shard(rows)
+            serial = time.perf_counter() - started
+
+            started = time.perf_counter()
+            parallel_payslips, parallel_totals = compute_parallel(rows, workers)
+            parallel = time.perf_counter() - started
+
+            if serial_totals != parallel_totals or serial_payslips != parallel_payslips:
+                self.stderr.write(f'Parallel results differ from serial at {count} employees')
+            self.stdout.write(f'{count:>10} {serial:>12.3f} {parallel:>14.3f} {serial / parallel:>7.2f}x')
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.2 on 2026-10-18 13:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payroll', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payslip',
+            name='paid_days',
+            field=models.DecimalField(blank=True, decimal_places=1, max_digits=5, null=True),
+        ),
+        migrations.AddField(
+            model_name='payslip',
+            name='working_days',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.2 on 2026-10-18 14:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payroll', '0002_payslip_paid_days_payslip_working_days'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payrollrun',
+            name='started_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -64,6 +64,8 @@ class PayrollRun(models.Model):
     period = models.ForeignKey(PayrollPeriod, on_delete=models.CASCADE)
     run_date = models.DateTimeField(default=timezone.now)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='draft')
+    # When the attempt now in ``processing`` claimed the run
+    started_at = models.DateTimeField(null=True, blank=True)
     total_employees = models.IntegerField(default=0)
     total_gross_pay = models.DecimalField(max_digits=15, decimal_places=2, default=0)
     total_deductions = models.DecimalField(max_digits=15, decimal_places=2, default=0)
@@ -81,6 +83,8 @@ class Payslip(models.Model):
     total_earnings = models.DecimalField(max_digits=12, decimal_places=2)
     total_deductions = models.DecimalField(max_digits=12, decimal_places=2)
     net_pay = models.DecimalField(max_digits=12, decimal_places=2)
+    working_days = models.IntegerField(null=True, blank=True)
+    paid_days = models.DecimalField(max_digits=5, decimal_places=1, null=True, blank=True)
     generated_date = models.DateTimeField(default=timezone.now)
 
     class Meta:
@@ -0,0 +1,103 @@
+from bisect import bisect_left, bisect_right
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.db.models import Count, F, Q
+
+from attendance.models import AttendanceSummary
+from attendance.periods import local_today
+from leave.models import LeaveApplication
+from master.models import Employee, Holiday
+from settings.models import WorkWeek
+
+WEEKDAYS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+DEFAULT_WORKING_DAYS = {'monday', 'tuesday', 'wednesday', 'thursday', 'friday'}
+# Credit a summary status gives towards paid days
+STATUS_CREDIT = {'present': Decimal('1'), 'leave': Decimal('1'), 'half_day': Decimal('0.5')}
+
+
+def working_dates(start_date, end_date):
+    """Sorted working dates of a period: WorkWeek working days minus holidays.
+
+    Days missing from WorkWeek fall back to a Monday-Friday week.
+    """
+    configured = dict(WorkWeek.objects.values_list('day', 'is_working_day'))
+    working_weekdays = {
+        index for index, day in enumerate(WEEKDAYS)
+        if configured.get(day, day in DEFAULT_WORKING_DAYS)
+    }
+    holidays = set(Holiday.objects.filter(
+        holiday_date__gte=start_date, holiday_date__lte=end_date
+    ).values_list('holiday_date', flat=True))
+
+    dates = []
+    current = start_date
+    while current <= end_date:
+        if current.weekday() in working_weekdays and current not in holidays:
+            dates.append(current)
+        current += timedelta(days=1)
+    return dates
+
+
+def attendance_for_period(start_date, end_date, today=None):
+    """``{employee_id: (paid_days, working_days)}`` for every employee with an active salary.
+
+    Built from a fixed number of grouped queries regardless of head count:
+    working days come from WorkWeek and Holiday (counted from each
+    employee's joining date), paid days from present/leave (1) and
+    half-day (0.5) summaries on working dates, topped up to a full day by
+    approved leave. Working days after ``today`` have not happened yet and
+    are treated as paid.
+    """
+    today = today or local_today()
+    dates = working_dates(start_date, end_date)
+
+    joining = dict(Employee.objects.filter(
+        employeesalary__is_active=True
+    ).values_list('employee_id', 'date_of_joining'))
+
+    # Paid-day credit from summaries since joining, one grouped row per employee
+    credits = {
+        row['employee']: row['full_days'] + Decimal('0.5') * row['half_days']
+        for row in AttendanceSummary.objects.filter(
+            date__in=dates, date__gte=F('employee__date_of_joining')
+        ).values('employee').annotate(
+            full_days=Count('summary_id', filter=Q(status__in=['present', 'leave'])),
+            half_days=Count('summary_id', filter=Q(status='half_day')),
+        ).order_by()
+    }
+
+    # Approved leave covers working dates without a full-day summary
+    leave_dates = {}
+    for employee_id, leave_start, leave_end in LeaveApplication.objects.filter(
+        status='approved', start_date__lte=end_date, end_date__gte=start_date
+    ).values_list('employee_id', 'start_date', 'end_date'):
+        if employee_id not in joining:
+            continue
+        covered = dates[bisect_left(dates, max(leave_start, joining[employee_id])):bisect_right(dates, leave_end)]
+        leave_dates.setdefault(employee_id, set()).update(d for d in covered if d <= today)
+
+    all_leave_dates = set().union(*leave_dates.values())
+    if all_leave_dates:
+        day_status = {
+            (employee_id, work_date): status
+            for employee_id, work_date, status in AttendanceSummary.objects.filter(
+                employee_id__in=list(leave_dates),
+                date__gte=min(all_leave_dates),
+                date__lte=max(all_leave_dates),
+            ).values_list('employee_id', 'date', 'status')
+        }
+        for employee_id, days in leave_dates.items():
+            for work_date in days:
+                credit = STATUS_CREDIT.get(day_status.get((employee_id, work_date)), Decimal('0'))
+                credits[employee_id] = credits.get(employee_id, Decimal('0')) + (1 - credit)
+
+    first_future = bisect_right(dates, today)
+    attendance = {}
+    for employee_id, joined in joining.items():
+        first = bisect_left(dates, joined)
+        working_days = len(dates) - first
+        future_days = len(dates) - max(first, first_future)
+        paid_days = min(credits.get(employee_id, Decimal('0')) + future_days, working_days)
+        attendance[employee_id] = (paid_days, working_days)
+    return attendance
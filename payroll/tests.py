@@ -1,3 +1,209 @@
-from django.test import TestCase
+import random
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone as django_timezone
+
+from attendance.models import AttendanceLog, AttendanceSummary
+from leave.models import LeaveApplication, LeaveType
+from master.models import Employee, Holiday
+from .calculation import compute_encoded_shard, compute_shard, decode_payslip, decode_totals, encode_row
+from .engine import compute_parallel, process_payroll_run
+from .models import EmployeeSalary, PayrollPeriod, PayrollRun, Payslip, SalaryComponent, SalaryComponentValue
+from .proration import attendance_for_period
+
+
+def employee(code, joined=date(2024, 1, 1), basic_salary=Decimal('31000')):
+    """An employee with an active salary"""
+    record = Employee.objects.create(
+        employee_code=code, first_name=code, last_name='X', email=f'{code}@example.com', date_of_joining=joined
+    )
+    EmployeeSalary.objects.create(employee=record, basic_salary=basic_salary)
+    return record
+
+
+def summaries(record, statuses):
+    AttendanceSummary.objects.bulk_create([
+        AttendanceSummary(employee=record, date=work_date, status=status) for work_date, status in statuses.items()
+    ])
+
+
+def ist(day, hour):
+    # IST is UTC+05:30
+    return datetime(day.year, day.month, day.day, hour, tzinfo=timezone.utc) - timedelta(hours=5, minutes=30)
+
+
+def random_row(rng, salary_id):
+    """A salary row with random amounts in paise, components and attendance"""
+    cents = lambda low, high: Decimal(rng.randint(low, high)).scaleb(-2)
+    components = []
+    for component_id in rng.sample(range(1, 20), rng.randint(0, 6)):
+        is_percentage = rng.random() < 0.4
+        components.append((
+            component_id, rng.choice(['earning', 'deduction']), cents(0, 2_000_000),
+            is_percentage, cents(1, 10_000) if is_percentage else None,
+        ))
+    attendance = None
+    if rng.random() < 0.8:
+        working_days = rng.randint(0, 31)
+        attendance = (Decimal(rng.randint(0, working_days * 2)) / 2, working_days)
+    return (salary_id, salary_id + 1000, cents(100_000, 50_000_000), components, attendance)
+
+
+class PayslipArithmeticTests(SimpleTestCase):
+    """The integer-paise worker path reproduces the Decimal payslips exactly"""
+
+    def setUp(self):
+        rng = random.Random(20250106)
+        self.rows = [random_row(rng, salary_id) for salary_id in range(1, 2001)]
+
+    def test_encoded_shard_matches_compute_payslip(self):
+        payslips, (count, gross, deductions) = compute_encoded_shard([encode_row(row) for row in self.rows])
+        expected, totals = compute_shard(self.rows)
+        self.assertEqual([decode_payslip(payslip) for payslip in payslips], expected)
+        self.assertEqual(decode_totals(count, gross, deductions), totals)
+
+    def test_parallel_run_matches_serial(self):
+        rows = self.rows[:40]
+        self.assertEqual(compute_parallel(rows, 2), compute_shard(rows))
+
+
+class ProrationTests(TestCase):
+    """Paid days over Mon 6 - Fri 17 January 2025, with the 8th a holiday and the 15th today"""
+
+    start = date(2025, 1, 6)
+    end = date(2025, 1, 17)
+    today = date(2025, 1, 15)
+
+    def setUp(self):
+        Holiday.objects.create(holiday_date=date(2025, 1, 8), description='Holiday')
+        self.leave_type = LeaveType.objects.create(type_name='Casual Leave')
+
+    def leave(self, record, start, end, status='approved'):
+        LeaveApplication.objects.create(
+            employee=record, leave_type=self.leave_type, start_date=start, end_date=end,
+            total_days=(end - start).days + 1, reason='-', status=status,
+        )
+
+    def test_working_days_skip_weekends_and_holidays(self):
+        record = employee('E1')
+        self.assertEqual(attendance_for_period(self.start, self.end, self.today)[record.pk][1], 9)
+
+    def test_half_days_count_half(self):
+        record = employee('E1')
+        summaries(record, {date(2025, 1, 6): 'present', date(2025, 1, 7): 'half_day', date(2025, 1, 9): 'absent'})
+        paid_days, _ = attendance_for_period(self.start, self.end, self.today)[record.pk]
+        # 6th and half the 7th, plus the 16th and 17th, which have not happened yet
+        self.assertEqual(paid_days, Decimal('3.5'))
+
+    def test_approved_leave_tops_up_half_and_absent_days(self):
+        record = employee('E1')
+        summaries(record, {date(2025, 1, 9): 'half_day', date(2025, 1, 10): 'absent', date(2025, 1, 13): 'present'})
+        # Covers the holiday and a weekend, which are not working days anyway
+        self.leave(record, date(2025, 1, 8), date(2025, 1, 10))
+        self.leave(record, date(2025, 1, 14), date(2025, 1, 14), status='pending')
+        paid_days, _ = attendance_for_period(self.start, self.end, self.today)[record.pk]
+        # 9th and 10th on leave, the 13th present, the 16th and 17th to come
+        self.assertEqual(paid_days, Decimal('5'))
+
+    def test_joining_mid_period_counts_days_from_joining(self):
+        record = employee('E1', joined=date(2025, 1, 14))
+        summaries(record, {date(2025, 1, 10): 'present', date(2025, 1, 14): 'present'})
+        self.assertEqual(attendance_for_period(self.start, self.end, self.today)[record.pk], (Decimal('3'), 4))
+
+    def test_future_days_are_paid(self):
+        record = employee('E1')
+        self.assertEqual(attendance_for_period(self.start, self.end, date(2025, 1, 1))[record.pk], (Decimal('9'), 9))
+        self.assertEqual(attendance_for_period(self.start, self.end, date(2025, 2, 1))[record.pk], (Decimal('0'), 9))
+
+    def test_employees_without_an_active_salary_are_left_out(self):
+        record = employee('E1')
+        EmployeeSalary.objects.filter(employee=record).update(is_active=False)
+        self.assertNotIn(record.pk, attendance_for_period(self.start, self.end, self.today))
+
+
+class PayrollRunProrationTests(TestCase):
+
+    def test_punches_not_yet_summarised_are_paid(self):
+        record = employee('E1')
+        for day in (date(2025, 1, 6), date(2025, 1, 7)):
+            AttendanceLog.objects.create(employee=record, punch_type='IN', punch_time=ist(day, 9), status='approved')
+            AttendanceLog.objects.create(employee=record, punch_type='OUT', punch_time=ist(day, 17), status='approved')
+        period = PayrollPeriod.objects.create(period_name='Week 2', start_date=date(2025, 1, 6), end_date=date(2025, 1, 10))
+
+        process_payroll_run(PayrollRun.objects.create(period=period))
+        payslip = record.payslip_set.get()
+        self.assertEqual((payslip.paid_days, payslip.working_days), (Decimal('2'), 5))
+
+
+@override_settings(PAYROLL_PRORATE_ATTENDANCE=False)
+class PayrollEngineTests(TestCase):
+    """Runs are claimed once, completed with their totals, and resumed after a failed attempt"""
+
+    def setUp(self):
+        hra = SalaryComponent.objects.create(component_name='HRA', component_type='earning')
+        tax = SalaryComponent.objects.create(component_name='Professional Tax', component_type='deduction')
+        self.first = employee('E1', basic_salary=Decimal('31000'))
+        self.second = employee('E2', basic_salary=Decimal('20000'))
+        for record in (self.first, self.second):
+            salary = record.employeesalary
+            SalaryComponentValue.objects.create(
+                employee_salary=salary, component=hra, amount=0, is_percentage=True, percentage_of_basic=Decimal('40')
+            )
+            SalaryComponentValue.objects.create(employee_salary=salary, component=tax, amount=Decimal('200'))
+        period = PayrollPeriod.objects.create(period_name='January 2025', start_date=date(2025, 1, 1), end_date=date(2025, 1, 31))
+        self.run = PayrollRun.objects.create(period=period)
+
+    def assertCompleted(self, run):
+        run.refresh_from_db()
+        self.assertEqual(run.status, 'completed')
+        self.assertEqual(
+            (run.total_employees, run.total_gross_pay, run.total_deductions, run.total_net_pay),
+            (2, Decimal('71400'), Decimal('400'), Decimal('71000')),
+        )
+
+    def test_draft_run_is_completed(self):
+        self.assertEqual(process_payroll_run(self.run), 2)
+        self.assertCompleted(self.run)
+        payslip = Payslip.objects.get(employee=self.first)
+        self.assertEqual((payslip.total_earnings, payslip.net_pay), (Decimal('43400'), Decimal('43200')))
+        self.assertEqual(payslip.payslipdetail_set.count(), 2)
+
+    def test_interrupted_run_resumes_with_the_missing_employees(self):
+        PayrollRun.objects.filter(pk=self.run.pk).update(status='processing')
+        Payslip.objects.create(
+            payroll_run=self.run, employee=self.first, basic_salary=Decimal('31000'),
+            total_earnings=Decimal('43400'), total_deductions=Decimal('200'), net_pay=Decimal('43200'),
+        )
+        self.run.refresh_from_db()
+        self.assertEqual(process_payroll_run(self.run), 1)
+        self.assertCompleted(self.run)
+
+    def test_second_submit_is_refused(self):
+        # Both requests loaded the run while it was a draft
+        duplicate = PayrollRun.objects.get(pk=self.run.pk)
+        process_payroll_run(self.run)
+        with self.assertRaisesMessage(ValueError, 'already being processed'):
+            process_payroll_run(duplicate)
+        self.assertEqual(Payslip.objects.count(), 2)
+
+    def test_run_held_by_a_live_attempt_is_refused_until_stale(self):
+        PayrollRun.objects.filter(pk=self.run.pk).update(status='processing', started_at=django_timezone.now())
+        self.run.refresh_from_db()
+        with self.assertRaisesMessage(ValueError, 'already being processed'):
+            process_payroll_run(self.run)
+
+        PayrollRun.objects.filter(pk=self.run.pk).update(started_at=django_timezone.now() - timedelta(hours=2))
+        self.run.refresh_from_db()
+        self.assertEqual(process_payroll_run(self.run), 2)
+
+    def test_failed_attempt_releases_the_run(self):
+        with mock.patch('payroll.engine.compute_payslips', side_effect=RuntimeError('worker died')):
+            with self.assertRaises(RuntimeError):
+                process_payroll_run(self.run)
+        self.run.refresh_from_db()
+        self.assertEqual((self.run.status, self.run.started_at), ('processing', None))
+        self.assertEqual(process_payroll_run(self.run), 2)
+        self.assertCompleted(self.run)
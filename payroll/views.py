@@ -9,6 +9,7 @@ from .models import (
     PayrollPeriod, PayrollRun, Payslip, PayslipDetail
 )
 from master.models import Employee
+from . import engine
 from .forms import (
     SalaryComponentForm, EmployeeSalaryForm, SalaryComponentValueForm,
     PayrollPeriodForm, PayrollRunForm
@@ -249,76 +250,19 @@ def create_payroll_run(request):
 @login_required
 def process_payroll_run(request, run_id):
     payroll_run = get_object_or_404(PayrollRun, run_id=run_id)
-    if payroll_run.status != 'draft':
+    if payroll_run.status not in ('draft', 'processing'):
         messages.error(request, 'Payroll run is not in draft status.')
         return redirect('payroll_runs')
 
-    # Get all active employee salaries
-    employee_salaries = EmployeeSalary.objects.filter(is_active=True).select_related('employee')
-
-    total_employees = 0
-    total_gross_pay = 0
-    total_deductions = 0
-    total_net_pay = 0
-
-    for emp_salary in employee_salaries:
-        # Calculate earnings and deductions
-        component_values = SalaryComponentValue.objects.filter(employee_salary=emp_salary).select_related('component')
-
-        basic_salary = emp_salary.basic_salary
-        total_earnings = basic_salary
-        total_deductions_val = 0
-
-        for comp_val in component_values:
-            if comp_val.is_percentage:
-                amount = (comp_val.percentage_of_basic / 100) * basic_salary
-            else:
-                amount = comp_val.amount
-
-            if comp_val.component.component_type == 'earning':
-                total_earnings += amount
-            else:
-                total_deductions_val += amount
-
-        net_pay = total_earnings - total_deductions_val
-
-        # Create payslip
-        payslip = Payslip.objects.create(
-            payroll_run=payroll_run,
-            employee=emp_salary.employee,
-            basic_salary=basic_salary,
-            total_earnings=total_earnings,
-            total_deductions=total_deductions_val,
-            net_pay=net_pay
-        )
-
-        # Create payslip details
-        for comp_val in component_values:
-            if comp_val.is_percentage:
-                amount = (comp_val.percentage_of_basic / 100) * basic_salary
-            else:
-                amount = comp_val.amount
-
-            PayslipDetail.objects.create(
-                payslip=payslip,
-                component=comp_val.component,
-                amount=amount
-            )
-
-        total_employees += 1
-        total_gross_pay += total_earnings
-        total_deductions += total_deductions_val
-        total_net_pay += net_pay
-
-    # Update payroll run
-    payroll_run.status = 'completed'
-    payroll_run.total_employees = total_employees
-    payroll_run.total_gross_pay = total_gross_pay
-    payroll_run.total_deductions = total_deductions
-    payroll_run.total_net_pay = total_net_pay
-    payroll_run.save()
+    # Compute all payslips in memory and bulk insert them; a run left in
+    # processing resumes with the employees that have no payslip yet
+    try:
+        created = engine.process_payroll_run(payroll_run)
+    except ValueError as e:
+        messages.error(request, f'{e}.')
+        return redirect('payroll_runs')
 
-    messages.success(request, f'Payroll run processed successfully for {total_employees} employees.')
+    messages.success(request, f'Payroll run processed successfully for {payroll_run.total_employees} employees ({created} new payslips).')
     return redirect('payroll_runs')
 
 @login_required
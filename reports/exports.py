@@ -0,0 +1,201 @@
+import csv
+import tempfile
+
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils import timezone
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+from attendance.models import AttendanceLog
+from attendance.periods import attendance_timezone, on_days
+from .rollups import department_report, employee_report
+
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+PUNCH_HEADERS = [
+    'Employee Code', 'Employee Name', 'Department', 'Punch Type', 'Punch Time',
+    'Device', 'Latitude', 'Longitude', 'Status',
+]
+
+
+class Styled:
+    """A cell value with font options, rendered bold in XLSX and as plain text in CSV"""
+
+    def __init__(self, value, **font):
+        self.value = value
+        self.font = font or {'bold': True}
+
+
+class Echo:
+    """Pseudo-buffer whose write() returns the line instead of storing it"""
+
+    def write(self, value):
+        return value
+
+
+def _plain(row):
+    return [cell.value if isinstance(cell, Styled) else cell for cell in row]
+
+
+def stream_csv(rows, filename):
+    """Stream rows to the client as CSV one line at a time"""
+    writer = csv.writer(Echo())
+    response = StreamingHttpResponse(
+        (writer.writerow(_plain(row)) for row in rows),
+        content_type='text/csv'
+    )
+    response['Content-Disposition'] = f'attachment; filename={filename}'
+    return response
+
+
+def write_xlsx(rows, fileobj, sheet_title='Report'):
+    """Write rows with openpyxl's write-only mode.
+
+    Write-only worksheets flush rows to a temporary file as they are
+    appended, so memory stays flat however many rows the export has.
+    """
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(sheet_title)
+    for row in rows:
+        cells = []
+        for value in row:
+            if isinstance(value, Styled):
+                cell = WriteOnlyCell(ws, value=value.value)
+                cell.font = Font(**value.font)
+                value = cell
+            cells.append(value)
+        ws.append(cells)
+    wb.save(fileobj)
+
+
+def stream_xlsx(rows, filename, sheet_title='Report'):
+    """Build a write-only workbook in a temporary file and send it in chunks"""
+    artifact = tempfile.TemporaryFile()
+    write_xlsx(rows, artifact, sheet_title)
+    artifact.seek(0)
+    return FileResponse(artifact, as_attachment=True, filename=filename, content_type=XLSX_CONTENT_TYPE)
+
+
+def write_csv(rows, fileobj):
+    """Write rows to a text file object as CSV"""
+    writer = csv.writer(fileobj)
+    for row in rows:
+        writer.writerow(_plain(row))
+
+
+TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 14),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+    ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black)
+])
+
+
+def write_pdf(rows, fileobj):
+    """Lay rows out as a reportlab document.
+
+    A row holding a single styled cell becomes a heading, a row of styled
+    cells starts a table with that header, and an empty row ends the table.
+    """
+    styles = getSampleStyleSheet()
+    elements = []
+    table = []
+
+    def flush():
+        if table:
+            pdf_table = Table(list(table), repeatRows=1)
+            pdf_table.setStyle(TABLE_STYLE)
+            elements.append(pdf_table)
+            elements.append(Spacer(1, 24))
+            table.clear()
+
+    for row in rows:
+        if not row:
+            flush()
+        elif len(row) == 1 and isinstance(row[0], Styled):
+            flush()
+            style = styles['Title'] if row[0].font.get('size', 0) >= 14 else styles['Heading2']
+            elements.append(Paragraph(str(row[0].value), style))
+        else:
+            if all(isinstance(cell, Styled) for cell in row):
+                flush()
+            table.append(['' if value is None else str(value) for value in _plain(row)])
+    flush()
+
+    SimpleDocTemplate(fileobj, pagesize=letter).build(elements)
+
+
+def attendance_report_rows(today):
+    """Department-wise and employee-wise report rows for the month up to ``today``"""
+    start_of_month = today.replace(day=1)
+
+    yield [Styled(f"Attendance Report - {today.strftime('%B %Y')}", bold=True, size=14)]
+    yield []
+
+    # Department-wise report
+    yield [Styled("Department-wise Attendance Report")]
+    yield [Styled(header) for header in ['Department', 'Total Days', 'Present', 'Absent', 'Late', 'Attendance %']]
+    for dept in department_report(start_of_month, today):
+        attendance_pct = round((dept['present_days'] / dept['total_days']) * 100, 1) if dept['total_days'] > 0 else 0
+        yield [
+            dept['department_name'],
+            dept['total_days'],
+            dept['present_days'],
+            dept['absent_days'],
+            dept['late_days'],
+            f"{attendance_pct}%"
+        ]
+
+    # Employee-wise report
+    yield []
+    yield [Styled("Employee-wise Attendance Report")]
+    yield [Styled(header) for header in ['Employee', 'Total', 'Present', 'Absent', 'Late', 'Attendance %']]
+    for emp in employee_report(start_of_month):
+        attendance_pct = round((emp['present_days'] / emp['total_days']) * 100, 1) if emp['total_days'] > 0 else 0
+        yield [
+            f"{emp['employee_code']} - {emp['first_name']}",
+            emp['total_days'],
+            emp['present_days'],
+            emp['absent_days'],
+            emp['late_days'],
+            f"{attendance_pct}%"
+        ]
+
+
+def punch_rows(start_date, end_date, department_id=None, chunk_size=2000):
+    """Raw AttendanceLog rows for an inclusive local date range, header first.
+
+    Rows are read with a server-side iterator so only ``chunk_size`` punches
+    are held in memory at a time.
+    """
+    yield [Styled(header) for header in PUNCH_HEADERS]
+
+    logs = AttendanceLog.objects.filter(**on_days('punch_time', start_date, end_date))
+    if department_id:
+        logs = logs.filter(employee__department_id=department_id)
+    logs = logs.order_by('punch_time', 'attendance_id').values_list(
+        'employee__employee_code', 'employee__first_name', 'employee__last_name',
+        'employee__department__department_name', 'punch_type', 'punch_time',
+        'device__device_name', 'geo_lat', 'geo_long', 'status'
+    )
+
+    for code, first_name, last_name, department, punch_type, punch_time, device, lat, long, status in logs.iterator(chunk_size=chunk_size):
+        yield [
+            code,
+            f"{first_name} {last_name}",
+            department or '',
+            punch_type,
+            timezone.localtime(punch_time, attendance_timezone()).strftime('%Y-%m-%d %H:%M:%S'),
+            device or '',
+            lat,
+            long,
+            status,
+        ]
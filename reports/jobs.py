@@ -0,0 +1,150 @@
+import hashlib
+import io
+import json
+import tempfile
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from attendance.periods import local_today
+
+from .exports import attendance_report_rows, punch_rows, write_csv, write_pdf, write_xlsx
+from .models import ReportJob
+
+REPORT_TYPES = ('attendance', 'punches')
+FORMATS = ('pdf', 'xlsx', 'csv')
+
+
+def normalize_params(report_type, params):
+    """Validate a report spec and return its canonical params, or raise ValueError"""
+    if report_type not in REPORT_TYPES:
+        raise ValueError(f'Unknown report type {report_type!r}')
+
+    today = local_today()
+    if report_type == 'attendance':
+        report_date = date.fromisoformat(params['date']) if params.get('date') else today
+        return {'date': report_date.isoformat()}
+
+    start_date = date.fromisoformat(params['start_date']) if params.get('start_date') else today.replace(day=1)
+    end_date = date.fromisoformat(params['end_date']) if params.get('end_date') else today
+    if end_date < start_date:
+        raise ValueError('end_date must not be before start_date')
+    department_id = int(params['department']) if params.get('department') else None
+    return {'start_date': start_date.isoformat(), 'end_date': end_date.isoformat(), 'department': department_id}
+
+
+def spec_hash(report_type, report_format, params):
+    spec = json.dumps({'type': report_type, 'format': report_format, 'params': params}, sort_keys=True)
+    return hashlib.sha256(spec.encode('utf-8')).hexdigest()
+
+
+def submit_report(report_type, report_format, params, user=None):
+    """Queue a report, or reuse a pending job or unexpired artifact for the same spec.
+
+    Returns ``(job, created)``.
+    """
+    if report_format not in FORMATS:
+        raise ValueError(f'Unknown format {report_format!r}')
+    params = normalize_params(report_type, params)
+    digest = spec_hash(report_type, report_format, params)
+
+    with transaction.atomic():
+        existing = ReportJob.objects.filter(spec_hash=digest).filter(
+            Q(status__in=['queued', 'running']) | Q(status='done', expires_at__gt=timezone.now())
+        ).order_by('-job_id').first()
+        if existing:
+            return existing, False
+
+        job = ReportJob.objects.create(
+            report_type=report_type,
+            format=report_format,
+            params=params,
+            spec_hash=digest,
+            requested_by=user,
+        )
+    return job, True
+
+
+def claim_next_job():
+    """Atomically move the oldest queued job to running; None when the queue is empty.
+
+    The conditional UPDATE means concurrent workers never pick the same job.
+    """
+    while True:
+        job_id = ReportJob.objects.filter(status='queued').order_by('job_id').values_list('job_id', flat=True).first()
+        if job_id is None:
+            return None
+        claimed = ReportJob.objects.filter(job_id=job_id, status='queued').update(
+            status='running', started_at=timezone.now()
+        )
+        if claimed:
+            return ReportJob.objects.get(job_id=job_id)
+
+
+def _report_rows(job):
+    params = job.params
+    if job.report_type == 'attendance':
+        return attendance_report_rows(date.fromisoformat(params['date']))
+    return punch_rows(date.fromisoformat(params['start_date']), date.fromisoformat(params['end_date']), params.get('department'))
+
+
+def artifact_name(job):
+    if job.report_type == 'attendance':
+        suffix = job.params['date'].replace('-', '')
+    else:
+        suffix = f"{job.params['start_date']}_{job.params['end_date']}".replace('-', '')
+    return f"{job.report_type}_report_{suffix}.{job.format}"
+
+
+def run_job(job):
+    """Render the job's artifact into media storage and mark it done or failed"""
+    try:
+        with tempfile.TemporaryFile() as artifact:
+            rows = _report_rows(job)
+            if job.format == 'csv':
+                text = io.TextIOWrapper(artifact, encoding='utf-8', newline='')
+                write_csv(rows, text)
+                text.flush()
+                text.detach()
+            elif job.format == 'xlsx':
+                write_xlsx(rows, artifact, 'Report')
+            else:
+                write_pdf(rows, artifact)
+            artifact.seek(0)
+            job.artifact.save(f"{job.spec_hash[:12]}_{artifact_name(job)}", File(artifact), save=False)
+
+        job.status = 'done'
+        job.expires_at = timezone.now() + timedelta(seconds=settings.REPORT_ARTIFACT_TTL)
+    except Exception as e:
+        job.status = 'failed'
+        job.error = str(e)
+    job.finished_at = timezone.now()
+    job.save(update_fields=['artifact', 'status', 'error', 'expires_at', 'finished_at'])
+    return job
+
+
+def purge_expired_artifacts():
+    """Delete artifacts past their TTL; returns the number of jobs expired"""
+    expired = ReportJob.objects.filter(status='done', expires_at__lte=timezone.now())
+    count = 0
+    for job in expired:
+        if job.artifact:
+            # Storage is content-addressed: jobs with identical output share one file
+            if ReportJob.objects.filter(artifact=job.artifact.name).exclude(pk=job.pk).exists():
+                job.artifact = ''
+            else:
+                job.artifact.delete(save=False)
+        job.status = 'expired'
+        job.save(update_fields=['artifact', 'status'])
+        count += 1
+    return count
+
+
+def requeue_stale_jobs(timeout):
+    """Put back jobs whose worker died mid-run (running for longer than ``timeout`` seconds)"""
+    cutoff = timezone.now() - timedelta(seconds=timeout)
+    return ReportJob.objects.filter(status='running', started_at__lt=cutoff).update(status='queued', started_at=None)
@@ -0,0 +1,14 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from reports.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = 'Recompute the report rollup tables from AttendanceSummary and LeaveApplication'
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        rebuild_rollups()
+        self.stdout.write(f'Rollups rebuilt in {time.perf_counter() - started:.2f}s')
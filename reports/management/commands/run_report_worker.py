@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from reports.jobs import claim_next_job, purge_expired_artifacts, requeue_stale_jobs, run_job
+
+
+class Command(BaseCommand):
+    help = 'Process queued report jobs and evict expired report artifacts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Drain the queue once and exit')
+        parser.add_argument('--interval', type=float, default=2.0, help='Seconds to sleep when the queue is empty')
+        parser.add_argument('--stale-after', type=int, default=30 * 60, help='Requeue jobs running longer than this many seconds')
+
+    def handle(self, *args, **options):
+        while True:
+            requeue_stale_jobs(options['stale_after'])
+            purged = purge_expired_artifacts()
+            if purged:
+                self.stdout.write(f'Expired {purged} report artifacts')
+
+            job = claim_next_job()
+            while job:
+                started = time.perf_counter()
+                run_job(job)
+                self.stdout.write(f'Job {job.job_id} {job.status} in {time.perf_counter() - started:.2f}s')
+                job = claim_next_job()
+
+            if options['once']:
+                break
+            close_old_connections()
+            time.sleep(options['interval'])
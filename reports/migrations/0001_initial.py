@@ -0,0 +1,68 @@
+# Generated by Django 5.1.2 on 2026-10-18 13:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('leave', '0001_initial'),
+        ('master', '0005_employee_manager'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DepartmentDailyRollup',
+            fields=[
+                ('rollup_id', models.AutoField(primary_key=True, serialize=False)),
+                ('day', models.DateField()),
+                ('total_days', models.IntegerField(default=0)),
+                ('present_days', models.IntegerField(default=0)),
+                ('absent_days', models.IntegerField(default=0)),
+                ('half_days', models.IntegerField(default=0)),
+                ('leave_days', models.IntegerField(default=0)),
+                ('late_days', models.IntegerField(default=0)),
+                ('total_hours', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('department', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, to='master.department')),
+            ],
+            options={
+                'unique_together': {('department', 'day')},
+            },
+        ),
+        migrations.CreateModel(
+            name='EmployeeMonthlyRollup',
+            fields=[
+                ('rollup_id', models.AutoField(primary_key=True, serialize=False)),
+                ('month', models.DateField(help_text='First day of the month')),
+                ('total_days', models.IntegerField(default=0)),
+                ('present_days', models.IntegerField(default=0)),
+                ('absent_days', models.IntegerField(default=0)),
+                ('half_days', models.IntegerField(default=0)),
+                ('leave_days', models.IntegerField(default=0)),
+                ('late_days', models.IntegerField(default=0)),
+                ('total_hours', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='master.employee')),
+            ],
+            options={
+                'unique_together': {('employee', 'month')},
+            },
+        ),
+        migrations.CreateModel(
+            name='LeaveTypeYearlyRollup',
+            fields=[
+                ('rollup_id', models.AutoField(primary_key=True, serialize=False)),
+                ('year', models.IntegerField()),
+                ('total_applications', models.IntegerField(default=0)),
+                ('approved', models.IntegerField(default=0)),
+                ('pending', models.IntegerField(default=0)),
+                ('rejected', models.IntegerField(default=0)),
+                ('leave_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='leave.leavetype')),
+            ],
+            options={
+                'unique_together': {('leave_type', 'year')},
+            },
+        ),
+    ]
@@ -1,3 +1,86 @@
 from django.db import models
+from master.models import Employee, Department
+from leave.models import LeaveType
+from django.contrib.auth.models import User
 
-# Create your models here.
+class DepartmentDailyRollup(models.Model):
+    rollup_id = models.AutoField(primary_key=True)
+    department = models.ForeignKey(Department, on_delete=models.CASCADE, null=True)
+    day = models.DateField()
+    total_days = models.IntegerField(default=0)
+    present_days = models.IntegerField(default=0)
+    absent_days = models.IntegerField(default=0)
+    half_days = models.IntegerField(default=0)
+    leave_days = models.IntegerField(default=0)
+    late_days = models.IntegerField(default=0)
+    total_hours = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+
+    class Meta:
+        unique_together = ('department', 'day')
+
+    def __str__(self):
+        return f"{self.department} - {self.day}"
+
+class EmployeeMonthlyRollup(models.Model):
+    rollup_id = models.AutoField(primary_key=True)
+    employee = models.ForeignKey(Employee, on_delete=models.CASCADE)
+    month = models.DateField(help_text="First day of the month")
+    total_days = models.IntegerField(default=0)
+    present_days = models.IntegerField(default=0)
+    absent_days = models.IntegerField(default=0)
+    half_days = models.IntegerField(default=0)
+    leave_days = models.IntegerField(default=0)
+    late_days = models.IntegerField(default=0)
+    total_hours = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+
+    class Meta:
+        unique_together = ('employee', 'month')
+
+    def __str__(self):
+        return f"{self.employee.employee_code} - {self.month:%B %Y}"
+
+class LeaveTypeYearlyRollup(models.Model):
+    rollup_id = models.AutoField(primary_key=True)
+    leave_type = models.ForeignKey(LeaveType, on_delete=models.CASCADE)
+    year = models.IntegerField()
+    total_applications = models.IntegerField(default=0)
+    approved = models.IntegerField(default=0)
+    pending = models.IntegerField(default=0)
+    rejected = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('leave_type', 'year')
+
+    def __str__(self):
+        return f"{self.leave_type.type_name} - {self.year}"
+
+class ReportJob(models.Model):
+    job_id = models.AutoField(primary_key=True)
+    report_type = models.CharField(max_length=20, choices=[
+        ('attendance', 'Attendance Report'),
+        ('punches', 'Raw Punches')
+    ])
+    format = models.CharField(max_length=10, choices=[
+        ('pdf', 'PDF'),
+        ('xlsx', 'Excel'),
+        ('csv', 'CSV')
+    ])
+    params = models.JSONField(default=dict, blank=True)
+    spec_hash = models.CharField(max_length=64, db_index=True, help_text="SHA-256 of type, format and params")
+    status = models.CharField(max_length=20, choices=[
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+        ('expired', 'Expired')
+    ], default='queued')
+    artifact = models.FileField(upload_to='reports/', blank=True)
+    error = models.TextField(blank=True)
+    requested_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    expires_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.report_type} ({self.format}) - {self.status}"
@@ -0,0 +1,155 @@
+from datetime import date
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import ExtractYear, TruncMonth
+
+from attendance.aggregates import summary_aggregates
+from attendance.models import AttendanceSummary
+from leave.models import LeaveApplication
+from .models import DepartmentDailyRollup, EmployeeMonthlyRollup, LeaveTypeYearlyRollup
+
+ROLLUP_COUNT_FIELDS = ['total_days', 'present_days', 'absent_days', 'half_days', 'leave_days', 'late_days', 'total_hours']
+LEAVE_COUNT_FIELDS = ['total_applications', 'approved', 'pending', 'rejected']
+CHUNK_SIZE = 500
+
+
+def _chunks(items, size=CHUNK_SIZE):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _counts(row):
+    counts = {field: row[field] for field in ROLLUP_COUNT_FIELDS}
+    counts['total_hours'] = counts['total_hours'] or 0
+    return counts
+
+
+def refresh_department_days(days):
+    """Recompute every department's rollup row for the given days"""
+    for chunk in _chunks(set(days)):
+        rows = AttendanceSummary.objects.filter(date__in=chunk).values(
+            'employee__department', 'date'
+        ).annotate(**summary_aggregates()).order_by()
+
+        with transaction.atomic():
+            DepartmentDailyRollup.objects.filter(day__in=chunk).delete()
+            DepartmentDailyRollup.objects.bulk_create([
+                DepartmentDailyRollup(department_id=row['employee__department'], day=row['date'], **_counts(row))
+                for row in rows
+            ])
+
+
+def refresh_employee_months(pairs):
+    """Recompute the rollup rows for a set of (employee_id, first-of-month) pairs"""
+    for chunk in _chunks(set(pairs)):
+        wanted = set(chunk)
+        months = [month for _, month in chunk]
+        last = max(months)
+        month_end = date(last.year + last.month // 12, last.month % 12 + 1, 1)
+
+        rows = AttendanceSummary.objects.filter(
+            employee_id__in={employee_id for employee_id, _ in chunk},
+            date__gte=min(months),
+            date__lt=month_end,
+        ).annotate(month=TruncMonth('date')).values('employee', 'month').annotate(**summary_aggregates()).order_by()
+
+        rollups = [
+            EmployeeMonthlyRollup(employee_id=row['employee'], month=row['month'], **_counts(row))
+            for row in rows if (row['employee'], row['month']) in wanted
+        ]
+        empty = wanted - {(rollup.employee_id, rollup.month) for rollup in rollups}
+
+        with transaction.atomic():
+            EmployeeMonthlyRollup.objects.bulk_create(
+                rollups,
+                update_conflicts=True,
+                unique_fields=['employee', 'month'],
+                update_fields=ROLLUP_COUNT_FIELDS,
+            )
+            if empty:
+                stale = Q()
+                for employee_id, month in empty:
+                    stale |= Q(employee_id=employee_id, month=month)
+                EmployeeMonthlyRollup.objects.filter(stale).delete()
+
+
+def refresh_leave_years(years):
+    """Recompute every leave type's rollup row for the given years"""
+    years = set(years)
+    if not years:
+        return
+
+    rows = LeaveApplication.objects.annotate(year=ExtractYear('applied_date')).filter(
+        year__in=years
+    ).values('leave_type', 'year').annotate(
+        total_applications=Count('leave_id'),
+        approved=Count('leave_id', filter=Q(status='approved')),
+        pending=Count('leave_id', filter=Q(status='pending')),
+        rejected=Count('leave_id', filter=Q(status='rejected'))
+    ).order_by()
+
+    with transaction.atomic():
+        LeaveTypeYearlyRollup.objects.filter(year__in=years).delete()
+        LeaveTypeYearlyRollup.objects.bulk_create([
+            LeaveTypeYearlyRollup(
+                leave_type_id=row['leave_type'],
+                year=row['year'],
+                **{field: row[field] for field in LEAVE_COUNT_FIELDS}
+            )
+            for row in rows
+        ])
+
+
+def refresh_for_summaries(pairs):
+    """Bring the attendance rollups up to date after (employee_id, date) summaries changed"""
+    pairs = set(pairs)
+    if not pairs:
+        return
+    refresh_department_days({work_date for _, work_date in pairs})
+    refresh_employee_months({(employee_id, work_date.replace(day=1)) for employee_id, work_date in pairs})
+
+
+def rebuild_rollups():
+    """Recompute every rollup row from scratch"""
+    DepartmentDailyRollup.objects.all().delete()
+    EmployeeMonthlyRollup.objects.all().delete()
+    refresh_department_days(AttendanceSummary.objects.values_list('date', flat=True).distinct())
+    refresh_employee_months(
+        AttendanceSummary.objects.annotate(month=TruncMonth('date')).values_list('employee', 'month').distinct()
+    )
+    LeaveTypeYearlyRollup.objects.all().delete()
+    refresh_leave_years(
+        LeaveApplication.objects.annotate(year=ExtractYear('applied_date')).values_list('year', flat=True).distinct()
+    )
+
+
+# === REPORT QUERIES ===
+
+def department_report(start_date, end_date):
+    """Department-wise attendance totals for a date range, summed from daily rollups"""
+    return DepartmentDailyRollup.objects.filter(
+        day__gte=start_date,
+        day__lte=end_date
+    ).values(department_name=F('department__department_name')).annotate(
+        **{field: Sum(field) for field in ROLLUP_COUNT_FIELDS}
+    ).order_by('department_name')
+
+
+def employee_report(month):
+    """Employee-wise attendance totals for the month starting at ``month``"""
+    return EmployeeMonthlyRollup.objects.filter(month=month).values(
+        *ROLLUP_COUNT_FIELDS,
+        employee_code=F('employee__employee_code'),
+        first_name=F('employee__first_name'),
+        last_name=F('employee__last_name'),
+    ).order_by('employee_code')
+
+
+def leave_report(year):
+    """Leave applications per leave type for a year"""
+    return LeaveTypeYearlyRollup.objects.filter(year=year).values(
+        *LEAVE_COUNT_FIELDS,
+        type_name=F('leave_type__type_name'),
+    ).order_by('type_name')
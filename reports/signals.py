@@ -0,0 +1,29 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from attendance.models import AttendanceSummary
+from attendance.signals import summaries_refreshed
+from leave.models import LeaveApplication
+from .rollups import refresh_for_summaries, refresh_leave_years
+
+
+@receiver(summaries_refreshed)
+def update_rollups_for_engine(sender, pairs, **kwargs):
+    """Summary engine rebuilt a batch of employee-days with a bulk upsert"""
+    refresh_for_summaries(pairs)
+
+
+@receiver(post_save, sender=AttendanceSummary)
+@receiver(post_delete, sender=AttendanceSummary)
+def update_rollups_for_summary(sender, instance, **kwargs):
+    """A single summary was edited or removed"""
+    refresh_for_summaries({(instance.employee_id, instance.date)})
+
+
+@receiver(post_save, sender=LeaveApplication)
+@receiver(post_delete, sender=LeaveApplication)
+def update_rollups_for_leave(sender, instance, **kwargs):
+    """A leave application was created, approved, rejected or removed"""
+    if instance.applied_date:
+        refresh_leave_years({timezone.localtime(instance.applied_date).year})
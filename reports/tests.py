@@ -1,3 +1,296 @@
-from django.test import TestCase
+import csv
+import io
+import os
+import shutil
+import tempfile
+from datetime import date, datetime, time, timedelta, timezone
+from unittest import mock
 
-# Create your tests here.
+from django.db.models import QuerySet
+from django.test import TestCase, override_settings
+from django.utils import timezone as django_timezone
+from openpyxl import load_workbook
+
+from attendance.models import AttendanceLog, AttendanceSummary
+from attendance.summaries import run_summary_engine
+from leave.models import LeaveApplication, LeaveType
+from master.models import Department, Device, Employee, Shift
+from .exports import PUNCH_HEADERS, XLSX_CONTENT_TYPE, punch_rows, stream_csv, stream_xlsx
+from .jobs import claim_next_job, purge_expired_artifacts, requeue_stale_jobs, run_job, submit_report
+from .models import DepartmentDailyRollup, EmployeeMonthlyRollup, LeaveTypeYearlyRollup, ReportJob
+from .rollups import LEAVE_COUNT_FIELDS, ROLLUP_COUNT_FIELDS, rebuild_rollups
+
+STATUS_FIELDS = {'present': 'present_days', 'absent': 'absent_days', 'half_day': 'half_days', 'leave': 'leave_days'}
+
+
+def direct_counts(key):
+    """Rollup counts summed in Python over every AttendanceSummary, grouped by ``key(summary)``"""
+    totals = {}
+    for summary in AttendanceSummary.objects.select_related('employee'):
+        counts = totals.setdefault(key(summary), dict.fromkeys(ROLLUP_COUNT_FIELDS, 0))
+        counts['total_days'] += 1
+        counts[STATUS_FIELDS[summary.status]] += 1
+        counts['late_days'] += summary.late_by > 0
+        counts['total_hours'] += summary.total_hours or 0
+    return totals
+
+
+def rollup_counts(rollups, key):
+    return {key(rollup): {field: getattr(rollup, field) for field in ROLLUP_COUNT_FIELDS} for rollup in rollups}
+
+
+def ist(day, hour, minute=0):
+    # IST is UTC+05:30
+    return datetime(day.year, day.month, day.day, hour, minute, tzinfo=timezone.utc) - timedelta(hours=5, minutes=30)
+
+
+class RollupTests(TestCase):
+    """Rollups kept up to date by reports.signals match a direct aggregate over the source rows"""
+
+    def setUp(self):
+        shift = Shift.objects.create(shift_name='General', start_time=time(9, 0), end_time=time(17, 0))
+        engineering = Department.objects.create(department_name='Engineering')
+        sales = Department.objects.create(department_name='Sales')
+        self.employees = [
+            Employee.objects.create(
+                employee_code=code, first_name=code, last_name='X', email=f'{code}@example.com',
+                department=department, shift=shift, date_of_joining=date(2024, 1, 1),
+            )
+            for code, department in (('E1', engineering), ('E2', engineering), ('E3', sales), ('E4', None))
+        ]
+        self.leave_type = LeaveType.objects.create(type_name='Casual Leave')
+
+    def punch(self, employee, day, punch_in, punch_out=None):
+        AttendanceLog.objects.create(employee=employee, punch_type='IN', punch_time=ist(day, *punch_in), status='approved')
+        if punch_out:
+            AttendanceLog.objects.create(
+                employee=employee, punch_type='OUT', punch_time=ist(day, *punch_out), status='approved'
+            )
+
+    def rollups(self):
+        return (
+            rollup_counts(DepartmentDailyRollup.objects.all(), lambda rollup: (rollup.department_id, rollup.day)),
+            rollup_counts(EmployeeMonthlyRollup.objects.all(), lambda rollup: (rollup.employee_id, rollup.month)),
+        )
+
+    def assertRollupsMatch(self):
+        self.assertEqual(self.rollups(), (
+            direct_counts(lambda summary: (summary.employee.department_id, summary.date)),
+            direct_counts(lambda summary: (summary.employee_id, summary.date.replace(day=1))),
+        ))
+
+    def assertLeaveRollupsMatch(self):
+        expected = {}
+        for leave in LeaveApplication.objects.all():
+            counts = expected.setdefault((leave.leave_type_id, leave.applied_date.year), dict.fromkeys(LEAVE_COUNT_FIELDS, 0))
+            counts['total_applications'] += 1
+            counts[leave.status] += 1
+        self.assertEqual({
+            (rollup.leave_type_id, rollup.year): {field: getattr(rollup, field) for field in LEAVE_COUNT_FIELDS}
+            for rollup in LeaveTypeYearlyRollup.objects.all()
+        }, expected)
+
+    def test_punches_and_summary_changes(self):
+        first, second, third, unassigned = self.employees
+        # Across a month end, with late arrivals and a half day
+        self.punch(first, date(2025, 1, 30), (9, 0), (17, 30))
+        self.punch(first, date(2025, 1, 31), (9, 40), (17, 0))
+        self.punch(first, date(2025, 2, 3), (9, 0), (11, 0))
+        self.punch(second, date(2025, 1, 31), (9, 5), (18, 0))
+        self.punch(third, date(2025, 1, 31), (10, 0))
+        self.punch(unassigned, date(2025, 2, 3), (9, 0), (17, 0))
+        run_summary_engine()
+        self.assertEqual(AttendanceSummary.objects.count(), 6)
+        self.assertRollupsMatch()
+
+        # A later punch turns a present day into a half day
+        AttendanceLog.objects.create(
+            employee=third, punch_type='OUT', punch_time=ist(date(2025, 1, 31), 12), status='approved'
+        )
+        run_summary_engine()
+        self.assertEqual(AttendanceSummary.objects.get(employee=third).status, 'half_day')
+        self.assertRollupsMatch()
+
+        # Summaries edited and removed one at a time
+        summary = AttendanceSummary.objects.get(employee=second, date=date(2025, 1, 31))
+        summary.status = 'leave'
+        summary.save()
+        AttendanceSummary.objects.create(employee=second, date=date(2025, 2, 3), status='absent')
+        AttendanceSummary.objects.get(employee=first, date=date(2025, 1, 30)).delete()
+        self.assertRollupsMatch()
+
+        # Kept in step incrementally, they equal a rebuild from scratch
+        before = self.rollups()
+        rebuild_rollups()
+        self.assertEqual(self.rollups(), before)
+
+    def test_leave_status_changes(self):
+        first, second = self.employees[:2]
+        sick = LeaveType.objects.create(type_name='Sick Leave')
+        leaves = [
+            LeaveApplication.objects.create(
+                employee=employee, leave_type=leave_type, start_date=date(2025, 1, 6), end_date=date(2025, 1, 7),
+                total_days=2, reason='-',
+            )
+            for employee, leave_type in ((first, self.leave_type), (second, self.leave_type), (first, sick))
+        ]
+        self.assertLeaveRollupsMatch()
+
+        leaves[0].status = 'approved'
+        leaves[0].save()
+        leaves[1].status = 'rejected'
+        leaves[1].save()
+        self.assertLeaveRollupsMatch()
+
+        leaves[2].delete()
+        self.assertLeaveRollupsMatch()
+        self.assertFalse(LeaveTypeYearlyRollup.objects.filter(leave_type=sick).exists())
+
+
+class ReportJobTests(TestCase):
+    """Report jobs are deduplicated, claimed once, requeued when stale and expired after their TTL"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings.enable()
+
+    def tearDown(self):
+        self.settings.disable()
+        shutil.rmtree(self.media_root)
+
+    def test_same_spec_reuses_the_pending_job(self):
+        job, created = submit_report('attendance', 'csv', {'date': '2025-01-06'})
+        self.assertTrue(created)
+        self.assertEqual(submit_report('attendance', 'csv', {'date': '2025-01-06', 'ignored': 1}), (job, False))
+        self.assertTrue(submit_report('attendance', 'pdf', {'date': '2025-01-06'})[1])
+        self.assertTrue(submit_report('attendance', 'csv', {'date': '2025-01-07'})[1])
+
+        ReportJob.objects.filter(pk=job.pk).update(status='failed')
+        self.assertTrue(submit_report('attendance', 'csv', {'date': '2025-01-06'})[1])
+
+    def test_invalid_specs_are_refused(self):
+        with self.assertRaisesMessage(ValueError, "Unknown format 'doc'"):
+            submit_report('attendance', 'doc', {})
+        with self.assertRaisesMessage(ValueError, "Unknown report type 'payroll'"):
+            submit_report('payroll', 'csv', {})
+        with self.assertRaisesMessage(ValueError, 'end_date must not be before start_date'):
+            submit_report('punches', 'csv', {'start_date': '2025-01-07', 'end_date': '2025-01-06'})
+        self.assertFalse(ReportJob.objects.exists())
+
+    def test_jobs_are_claimed_oldest_first_and_once(self):
+        first = submit_report('attendance', 'csv', {'date': '2025-01-06'})[0]
+        second = submit_report('attendance', 'csv', {'date': '2025-01-07'})[0]
+        update = QuerySet.update
+        raced = []
+
+        def another_worker_claims_first(queryset, **changes):
+            # The other worker's UPDATE lands between this worker's SELECT and UPDATE
+            if not raced:
+                raced.append(update(ReportJob.objects.filter(pk=first.pk), status='running'))
+            return update(queryset, **changes)
+
+        with mock.patch.object(QuerySet, 'update', another_worker_claims_first):
+            claimed = claim_next_job()
+        self.assertEqual((claimed.pk, claimed.status), (second.pk, 'running'))
+        self.assertIsNotNone(claimed.started_at)
+        self.assertIsNone(claim_next_job())
+
+    def test_stale_running_jobs_are_requeued(self):
+        stale = submit_report('attendance', 'csv', {'date': '2025-01-06'})[0]
+        live = submit_report('attendance', 'csv', {'date': '2025-01-07'})[0]
+        ReportJob.objects.filter(pk=stale.pk).update(status='running', started_at=django_timezone.now() - timedelta(hours=2))
+        ReportJob.objects.filter(pk=live.pk).update(status='running', started_at=django_timezone.now())
+
+        self.assertEqual(requeue_stale_jobs(60 * 60), 1)
+        stale.refresh_from_db()
+        self.assertEqual((stale.status, stale.started_at), ('queued', None))
+        self.assertEqual(ReportJob.objects.get(pk=live.pk).status, 'running')
+        self.assertEqual(claim_next_job().pk, stale.pk)
+
+    def test_finished_artifact_is_reused_until_it_expires(self):
+        submit_report('attendance', 'csv', {'date': '2025-01-06'})
+        job = run_job(claim_next_job())
+        self.assertEqual(job.status, 'done', job.error)
+        path = job.artifact.path
+        self.assertTrue(os.path.exists(path))
+        self.assertEqual(submit_report('attendance', 'csv', {'date': '2025-01-06'}), (job, False))
+        self.assertEqual(purge_expired_artifacts(), 0)
+
+        ReportJob.objects.filter(pk=job.pk).update(expires_at=django_timezone.now() - timedelta(seconds=1))
+        self.assertEqual(purge_expired_artifacts(), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.artifact.name), ('expired', ''))
+        self.assertFalse(os.path.exists(path))
+        self.assertTrue(submit_report('attendance', 'csv', {'date': '2025-01-06'})[1])
+
+
+    def test_shared_artifact_outlives_the_first_job_to_expire(self):
+        # Header-only exports of two empty ranges are byte for byte the same file
+        for start_date in ('2025-01-06', '2025-02-03'):
+            submit_report('punches', 'csv', {'start_date': start_date, 'end_date': start_date})
+        first, second = run_job(claim_next_job()), run_job(claim_next_job())
+        self.assertEqual(first.artifact.name, second.artifact.name)
+        path = first.artifact.path
+
+        ReportJob.objects.filter(pk=first.pk).update(expires_at=django_timezone.now() - timedelta(seconds=1))
+        self.assertEqual(purge_expired_artifacts(), 1)
+        self.assertTrue(os.path.exists(path))
+        self.assertEqual(ReportJob.objects.get(pk=first.pk).artifact.name, '')
+
+        ReportJob.objects.filter(pk=second.pk).update(expires_at=django_timezone.now() - timedelta(seconds=1))
+        self.assertEqual(purge_expired_artifacts(), 1)
+        self.assertFalse(os.path.exists(path))
+
+class ExportTests(TestCase):
+    """Punch exports stream a header and one row per punch, with times in local time"""
+
+    day = date(2025, 1, 6)
+
+    def setUp(self):
+        self.engineering = Department.objects.create(department_name='Engineering')
+        device = Device.objects.create(device_name='Gate', serial_number='SN1', ip_address='10.0.0.1')
+        first, second = (
+            Employee.objects.create(
+                employee_code=code, first_name=code, last_name='X', email=f'{code}@example.com',
+                department=department, date_of_joining=date(2024, 1, 1),
+            )
+            for code, department in (('E1', self.engineering), ('E2', None))
+        )
+        for employee, day, hour, minute in (
+            (first, self.day, 9, 5), (second, self.day, 9, 30), (first, self.day, 23, 45),
+            (first, self.day - timedelta(days=1), 23, 59), (first, self.day + timedelta(days=1), 0, 0),
+        ):
+            AttendanceLog.objects.create(
+                employee=employee, punch_type='IN', punch_time=ist(day, hour, minute), status='approved', device=device,
+            )
+
+    def test_csv(self):
+        response = stream_csv(punch_rows(self.day, self.day), 'punches_20250106.csv')
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename=punches_20250106.csv')
+        rows = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(rows[0], PUNCH_HEADERS)
+        self.assertEqual(rows[1:], [
+            ['E1', 'E1 X', 'Engineering', 'IN', '2025-01-06 09:05:00', 'Gate', '', '', 'approved'],
+            ['E2', 'E2 X', '', 'IN', '2025-01-06 09:30:00', 'Gate', '', '', 'approved'],
+            ['E1', 'E1 X', 'Engineering', 'IN', '2025-01-06 23:45:00', 'Gate', '', '', 'approved'],
+        ])
+
+        filtered = stream_csv(punch_rows(self.day, self.day, self.engineering.pk), 'punches.csv')
+        self.assertEqual(b''.join(filtered.streaming_content).decode().count('\n'), 3)
+
+    def test_xlsx(self):
+        response = stream_xlsx(punch_rows(self.day, self.day + timedelta(days=1)), 'punches_20250106.xlsx', 'Punches')
+        self.assertEqual(response['Content-Type'], XLSX_CONTENT_TYPE)
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="punches_20250106.xlsx"')
+        workbook = load_workbook(io.BytesIO(b''.join(response.streaming_content)))
+        response.close()
+        sheet = workbook['Punches']
+        rows = list(sheet.values)
+        self.assertEqual(list(rows[0]), PUNCH_HEADERS)
+        self.assertTrue(sheet['A1'].font.bold)
+        self.assertEqual(len(rows), 5)
+        self.assertEqual([row[4] for row in rows[1:]], [
+            '2025-01-06 09:05:00', '2025-01-06 09:30:00', '2025-01-06 23:45:00', '2025-01-07 00:00:00',
+        ])
@@ -6,5 +6,11 @@ urlpatterns = [
     path('export/excel/', views.export_excel, name='export_excel'),
     path('export/pdf/', views.export_pdf, name='export_pdf'),
     path('export/csv/', views.export_csv, name='export_csv'),
+    path('export/punches/csv/', views.export_punches_csv, name='export_punches_csv'),
+    path('export/punches/excel/', views.export_punches_excel, name='export_punches_excel'),
+    path('jobs/submit/', views.submit_report_job, name='submit_report_job'),
+    path('jobs/<int:job_id>/', views.report_job_view, name='report_job'),
+    path('jobs/<int:job_id>/status/', views.report_job_status, name='report_job_status'),
+    path('jobs/<int:job_id>/download/', views.download_report_job, name='download_report_job'),
     path('print/', views.print_report, name='print_report'),
 ]
\ No newline at end of file
@@ -1,37 +1,27 @@
-from django.shortcuts import render
-from attendance.models import AttendanceSummary, AttendanceLog
+from django.shortcuts import render, redirect, get_object_or_404
+from attendance.models import AttendanceLog
+from . import rollups
+from .exports import attendance_report_rows, punch_rows, stream_csv, stream_xlsx
+from attendance.periods import local_today, on_days
+from .jobs import artifact_name, submit_report
+from .models import ReportJob
 from master.models import Employee, Department
-from leave.models import LeaveApplication
 from django.db.models import Count, Q
 from datetime import date, timedelta
-import csv
-from django.http import HttpResponse
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph
-from reportlab.lib import colors
-import openpyxl
-from openpyxl.styles import Font, PatternFill
+from django.http import FileResponse, Http404, HttpResponseBadRequest, JsonResponse
+from django.urls import reverse
+from django.views.decorators.http import require_POST
 from django.contrib.auth.decorators import login_required
 
 @login_required
 def reports_view(request):
     """Reports page with various attendance and leave reports"""
-    today = date.today()
+    today = local_today()
     start_of_month = today.replace(day=1)
     start_of_year = today.replace(month=1, day=1)
 
     # Monthly attendance report
-    monthly_report = AttendanceSummary.objects.filter(
-        date__gte=start_of_month,
-        date__lte=today
-    ).values('employee__department__department_name').annotate(
-        total_days=Count('summary_id'),
-        present_days=Count('summary_id', filter=Q(status='present')),
-        absent_days=Count('summary_id', filter=Q(status='absent')),
-        late_days=Count('summary_id', filter=Q(late_by__gt=0))
-    )
+    monthly_report = rollups.department_report(start_of_month, today)
 
     # Calculate attendance percentage for monthly report
     for dept in monthly_report:
@@ -41,15 +31,7 @@ def reports_view(request):
             dept['attendance_percentage'] = 0
 
     # Employee-wise report
-    employee_report = AttendanceSummary.objects.filter(
-        date__gte=start_of_month,
-        date__lte=today
-    ).values('employee__employee_code', 'employee__first_name', 'employee__last_name').annotate(
-        total_days=Count('summary_id'),
-        present_days=Count('summary_id', filter=Q(status='present')),
-        absent_days=Count('summary_id', filter=Q(status='absent')),
-        late_days=Count('summary_id', filter=Q(late_by__gt=0))
-    )
+    employee_report = rollups.employee_report(start_of_month)
 
     # Calculate attendance percentage for employee report
     for emp in employee_report:
@@ -59,14 +41,7 @@ def reports_view(request):
             emp['attendance_percentage'] = 0
 
     # Leave report
-    leave_report = LeaveApplication.objects.filter(
-        applied_date__year=today.year
-    ).values('leave_type__type_name').annotate(
-        total_applications=Count('leave_id'),
-        approved=Count('leave_id', filter=Q(status='approved')),
-        pending=Count('leave_id', filter=Q(status='pending')),
-        rejected=Count('leave_id', filter=Q(status='rejected'))
-    )
+    leave_report = rollups.leave_report(today.year)
 
     # Calculate approval percentage for leave report
     for leave in leave_report:
@@ -77,8 +52,7 @@ def reports_view(request):
 
     # Device usage report
     device_report = AttendanceLog.objects.filter(
-        punch_time__date__gte=start_of_month,
-        punch_time__date__lte=today
+        **on_days('punch_time', start_of_month, today)
     ).values('device__device_name').annotate(
         total_punches=Count('attendance_id'),
         in_punches=Count('attendance_id', filter=Q(punch_type='IN')),
@@ -91,6 +65,7 @@ def reports_view(request):
         'employee_report': employee_report,
         'leave_report': leave_report,
         'device_report': device_report,
+        'departments': Department.objects.filter(is_active=True),
         'current_month': today.strftime('%B %Y'),
     }
     return render(request, 'reports/reports.html', context)
@@ -98,201 +73,105 @@ def reports_view(request):
 @login_required
 def export_excel(request):
     """Export reports to Excel"""
-    today = date.today()
-    start_of_month = today.replace(day=1)
-
-    # Create workbook
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Attendance Report"
-
-    # Header
-    ws['A1'] = f"Attendance Report - {today.strftime('%B %Y')}"
-    ws['A1'].font = Font(bold=True, size=14)
-
-    # Department-wise report
-    ws['A3'] = "Department-wise Attendance Report"
-    ws['A3'].font = Font(bold=True)
-    headers = ['Department', 'Total Days', 'Present', 'Absent', 'Late', 'Attendance %']
-    for col, header in enumerate(headers, 1):
-        ws.cell(row=4, column=col, value=header).font = Font(bold=True)
-
-    monthly_report = AttendanceSummary.objects.filter(
-        date__gte=start_of_month,
-        date__lte=today
-    ).values('employee__department__department_name').annotate(
-        total_days=Count('summary_id'),
-        present_days=Count('summary_id', filter=Q(status='present')),
-        absent_days=Count('summary_id', filter=Q(status='absent')),
-        late_days=Count('summary_id', filter=Q(late_by__gt=0))
-    )
-
-    row = 5
-    for dept in monthly_report:
-        attendance_pct = round((dept['present_days'] / dept['total_days']) * 100, 1) if dept['total_days'] > 0 else 0
-        ws.cell(row=row, column=1, value=dept['employee__department__department_name'])
-        ws.cell(row=row, column=2, value=dept['total_days'])
-        ws.cell(row=row, column=3, value=dept['present_days'])
-        ws.cell(row=row, column=4, value=dept['absent_days'])
-        ws.cell(row=row, column=5, value=dept['late_days'])
-        ws.cell(row=row, column=6, value=f"{attendance_pct}%")
-        row += 1
-
-    # Employee-wise report
-    row += 2
-    ws.cell(row=row, column=1, value="Employee-wise Attendance Report").font = Font(bold=True)
-    headers = ['Employee', 'Total', 'Present', 'Absent', 'Late', 'Attendance %']
-    for col, header in enumerate(headers, 1):
-        ws.cell(row=row+1, column=col, value=header).font = Font(bold=True)
-
-    employee_report = AttendanceSummary.objects.filter(
-        date__gte=start_of_month,
-        date__lte=today
-    ).values('employee__employee_code', 'employee__first_name', 'employee__last_name').annotate(
-        total_days=Count('summary_id'),
-        present_days=Count('summary_id', filter=Q(status='present')),
-        absent_days=Count('summary_id', filter=Q(status='absent')),
-        late_days=Count('summary_id', filter=Q(late_by__gt=0))
-    )
-
-    row += 2
-    for emp in employee_report:
-        attendance_pct = round((emp['present_days'] / emp['total_days']) * 100, 1) if emp['total_days'] > 0 else 0
-        ws.cell(row=row, column=1, value=f"{emp['employee__employee_code']} - {emp['employee__first_name']}")
-        ws.cell(row=row, column=2, value=emp['total_days'])
-        ws.cell(row=row, column=3, value=emp['present_days'])
-        ws.cell(row=row, column=4, value=emp['absent_days'])
-        ws.cell(row=row, column=5, value=emp['late_days'])
-        ws.cell(row=row, column=6, value=f"{attendance_pct}%")
-        row += 1
-
-    response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-    response['Content-Disposition'] = f'attachment; filename=attendance_report_{today.strftime("%Y%m%d")}.xlsx'
-    wb.save(response)
-    return response
+    today = local_today()
+    return stream_xlsx(attendance_report_rows(today), f'attendance_report_{today.strftime("%Y%m%d")}.xlsx', "Attendance Report")
 
 @login_required
 def export_pdf(request):
-    """Export reports to PDF"""
-    today = date.today()
-    start_of_month = today.replace(day=1)
-
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename=attendance_report_{today.strftime("%Y%m%d")}.pdf'
-
-    doc = SimpleDocTemplate(response, pagesize=letter)
-    elements = []
-    styles = getSampleStyleSheet()
-
-    # Title
-    title = Paragraph(f"Attendance Report - {today.strftime('%B %Y')}", styles['Title'])
-    elements.append(title)
-    elements.append(Paragraph("<br/><br/>", styles['Normal']))
-
-    # Department-wise report
-    dept_data = [['Department', 'Total Days', 'Present', 'Absent', 'Late', 'Attendance %']]
-    monthly_report = AttendanceSummary.objects.filter(
-        date__gte=start_of_month,
-        date__lte=today
-    ).values('employee__department__department_name').annotate(
-        total_days=Count('summary_id'),
-        present_days=Count('summary_id', filter=Q(status='present')),
-        absent_days=Count('summary_id', filter=Q(status='absent')),
-        late_days=Count('summary_id', filter=Q(late_by__gt=0))
-    )
-
-    for dept in monthly_report:
-        attendance_pct = f"{round((dept['present_days'] / dept['total_days']) * 100, 1)}%" if dept['total_days'] > 0 else "0%"
-        dept_data.append([
-            dept['employee__department__department_name'],
-            str(dept['total_days']),
-            str(dept['present_days']),
-            str(dept['absent_days']),
-            str(dept['late_days']),
-            attendance_pct
-        ])
-
-    dept_table = Table(dept_data)
-    dept_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 14),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black)
-    ]))
-    elements.append(dept_table)
-    elements.append(Paragraph("<br/><br/>", styles['Normal']))
-
-    doc.build(elements)
-    return response
+    """Export reports to PDF (rendered by the report worker)"""
+    job, _ = submit_report('attendance', 'pdf', {}, request.user)
+    return redirect('report_job', job_id=job.job_id)
 
 @login_required
 def export_csv(request):
     """Export reports to CSV"""
-    today = date.today()
-    start_of_month = today.replace(day=1)
-
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = f'attachment; filename=attendance_report_{today.strftime("%Y%m%d")}.csv'
-
-    writer = csv.writer(response)
-    writer.writerow([f'Attendance Report - {today.strftime("%B %Y")}'])
-    writer.writerow([])
+    today = local_today()
+    return stream_csv(attendance_report_rows(today), f'attendance_report_{today.strftime("%Y%m%d")}.csv')
+
+def _punch_export_filters(request):
+    """Read start_date, end_date and department from the query string (defaults to this month)"""
+    today = local_today()
+    start_date = date.fromisoformat(request.GET['start_date']) if request.GET.get('start_date') else today.replace(day=1)
+    end_date = date.fromisoformat(request.GET['end_date']) if request.GET.get('end_date') else today
+    department_id = int(request.GET['department']) if request.GET.get('department') else None
+    if end_date < start_date:
+        raise ValueError('end_date must not be before start_date')
+    return start_date, end_date, department_id
 
-    # Department-wise report
-    writer.writerow(['Department-wise Attendance Report'])
-    writer.writerow(['Department', 'Total Days', 'Present', 'Absent', 'Late', 'Attendance %'])
-
-    monthly_report = AttendanceSummary.objects.filter(
-        date__gte=start_of_month,
-        date__lte=today
-    ).values('employee__department__department_name').annotate(
-        total_days=Count('summary_id'),
-        present_days=Count('summary_id', filter=Q(status='present')),
-        absent_days=Count('summary_id', filter=Q(status='absent')),
-        late_days=Count('summary_id', filter=Q(late_by__gt=0))
-    )
+@login_required
+def export_punches_csv(request):
+    """Export raw punches to CSV, streamed row by row"""
+    try:
+        start_date, end_date, department_id = _punch_export_filters(request)
+    except ValueError as e:
+        return HttpResponseBadRequest(str(e))
+    filename = f'punches_{start_date.strftime("%Y%m%d")}_{end_date.strftime("%Y%m%d")}.csv'
+    return stream_csv(punch_rows(start_date, end_date, department_id), filename)
 
-    for dept in monthly_report:
-        attendance_pct = f"{round((dept['present_days'] / dept['total_days']) * 100, 1)}%" if dept['total_days'] > 0 else "0%"
-        writer.writerow([
-            dept['employee__department__department_name'],
-            dept['total_days'],
-            dept['present_days'],
-            dept['absent_days'],
-            dept['late_days'],
-            attendance_pct
-        ])
+@login_required
+def export_punches_excel(request):
+    """Export raw punches to Excel using a write-only workbook"""
+    try:
+        start_date, end_date, department_id = _punch_export_filters(request)
+    except ValueError as e:
+        return HttpResponseBadRequest(str(e))
+    filename = f'punches_{start_date.strftime("%Y%m%d")}_{end_date.strftime("%Y%m%d")}.xlsx'
+    return stream_xlsx(punch_rows(start_date, end_date, department_id), filename, "Punches")
+
+def _job_status(job):
+    data = {
+        'success': True,
+        'job_id': job.job_id,
+        'report_type': job.report_type,
+        'format': job.format,
+        'status': job.status,
+        'error': job.error,
+        'expires_at': job.expires_at.isoformat() if job.expires_at else None,
+        'status_url': reverse('report_job_status', args=[job.job_id]),
+    }
+    if job.status == 'done':
+        data['download_url'] = reverse('download_report_job', args=[job.job_id])
+    return data
 
-    writer.writerow([])
-    writer.writerow(['Employee-wise Attendance Report'])
-    writer.writerow(['Employee', 'Total', 'Present', 'Absent', 'Late', 'Attendance %'])
+@login_required
+@require_POST
+def submit_report_job(request):
+    """Queue a report for the background worker; identical specs share one job"""
+    try:
+        job, created = submit_report(
+            request.POST.get('report_type', 'attendance'),
+            request.POST.get('format', 'pdf'),
+            request.POST.dict(),
+            request.user
+        )
+    except ValueError as e:
+        return JsonResponse({'success': False, 'message': str(e)}, status=400)
+
+    data = _job_status(job)
+    data['deduplicated'] = not created
+    return JsonResponse(data, status=202 if created else 200)
 
-    employee_report = AttendanceSummary.objects.filter(
-        date__gte=start_of_month,
-        date__lte=today
-    ).values('employee__employee_code', 'employee__first_name', 'employee__last_name').annotate(
-        total_days=Count('summary_id'),
-        present_days=Count('summary_id', filter=Q(status='present')),
-        absent_days=Count('summary_id', filter=Q(status='absent')),
-        late_days=Count('summary_id', filter=Q(late_by__gt=0))
-    )
+@login_required
+def report_job_status(request, job_id):
+    """Poll a report job"""
+    job = get_object_or_404(ReportJob, job_id=job_id)
+    return JsonResponse(_job_status(job))
 
-    for emp in employee_report:
-        attendance_pct = f"{round((emp['present_days'] / emp['total_days']) * 100, 1)}%" if emp['total_days'] > 0 else "0%"
-        writer.writerow([
-            f"{emp['employee__employee_code']} - {emp['employee__first_name']}",
-            emp['total_days'],
-            emp['present_days'],
-            emp['absent_days'],
-            emp['late_days'],
-            attendance_pct
-        ])
+@login_required
+def report_job_view(request, job_id):
+    """Waiting page that refreshes until the report is ready, then downloads it"""
+    job = get_object_or_404(ReportJob, job_id=job_id)
+    if job.status == 'done':
+        return redirect('download_report_job', job_id=job.job_id)
+    return render(request, 'reports/report_job.html', {'job': job, 'user_role': 'Admin'})
 
-    return response
+@login_required
+def download_report_job(request, job_id):
+    """Download a finished report artifact"""
+    job = get_object_or_404(ReportJob, job_id=job_id, status='done')
+    if not job.artifact:
+        raise Http404('Report artifact not found')
+    return FileResponse(job.artifact.open('rb'), as_attachment=True, filename=artifact_name(job))
 
 @login_required
 def print_report(request):